@@ -0,0 +1,90 @@
+# Спільні утиліти для бенчмарків
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Фіксовані ID чатів для синтетичного навантаження
+BENCH_MODERATOR_CHAT_ID = -100100
+BENCH_CHANNEL_ID = -100200
+BENCH_OWNER_ID = 1
+
+
+def setup_environment(database_url: str, moderator_chat_id: int = BENCH_MODERATOR_CHAT_ID,
+                      owner_id: int = BENCH_OWNER_ID) -> None:
+    """Налаштування змінних оточення ДО імпорту config та db"""
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCHMARK")
+    os.environ["BOT_OWNER_ID"] = str(owner_id)
+    os.environ["MODERATOR_CHAT_ID"] = str(moderator_chat_id)
+    os.environ["PUBLIC_CHANNEL_ID"] = str(BENCH_CHANNEL_ID)
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DB_ECHO"] = "0"
+    # Бенчмарки ніколи не пишуть трафік
+    os.environ["RECORD_UPDATES_PATH"] = ""
+    # Віртуальні користувачі надсилають апдейти без пауз - ліміт на користувача спотворив би заміри
+    os.environ["THROTTLING"] = "0"
+    # Кожен віртуальний користувач має власного модератора - автопризначення віддало б анкету чужому
+    os.environ["MAX_CLAIMS_PER_MODERATOR"] = "0"
+
+
+def git_revision() -> str:
+    """Поточний коміт (для порівняння результатів між комітами)"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentiles(samples: list) -> dict:
+    """p50/p95/p99 у мілісекундах"""
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    if len(samples) == 1:
+        value = samples[0] * 1000
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49] * 1000, "p95": cuts[94] * 1000, "p99": cuts[98] * 1000}
+
+
+def save_results(name: str, results: dict, output: Optional[str] = None) -> Path:
+    """Збереження результатів у JSON разом з метаданими запуску"""
+    revision = git_revision()
+    payload = {
+        "benchmark": name,
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        **results,
+    }
+
+    if output:
+        path = Path(output)
+    else:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}-{revision}.json"
+
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def load_results(path: str) -> dict:
+    """Завантаження попередніх результатів для порівняння"""
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def format_change(old: float, new: float) -> str:
+    """Відносна зміна метрики у відсотках"""
+    if not old:
+        return "n/a"
+    return f"{(new - old) / old * 100:+.1f}%"
@@ -0,0 +1,228 @@
+# Мікробенчмарки функцій db/requests.py на БД різного розміру
+#
+# Запуск:
+#   python -m benchmarks.db_bench --scales 10000,100000,1000000
+#
+# Кожен масштаб виконується в окремому процесі, бо рушій БД створюється при імпорті db.requests.
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import setup_environment, save_results, load_results, format_change
+from benchmarks.seed import ensure_seeded, TELEGRAM_ID_BASE
+
+# Ліміти на одну функцію: кількість викликів та сумарний час
+MAX_ITERATIONS = 200
+TIME_BUDGET_S = 2.0
+# Скільки існуючих ID анкет вибирати для випадкових викликів
+SAMPLE_SIZE = 2000
+
+
+def classify(scales: list, timings: list) -> tuple:
+    """Нахил log(час)/log(розмір): ~0 - O(1), ~1 - O(n)"""
+    points = [(math.log(n), math.log(t)) for n, t in zip(scales, timings) if t > 0]
+    if len(points) < 2:
+        return 0.0, "n/a"
+
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator if denominator else 0.0
+
+    if slope < 0.3:
+        label = "O(1)"
+    elif slope < 0.7:
+        label = "sublinear"
+    else:
+        label = "O(n)"
+    return slope, label
+
+
+class Targets:
+    """Випадкові, але реально існуючі ID для викликів"""
+
+    def __init__(self, db_path: str, seed: int):
+        self.rng = random.Random(seed)
+        conn = sqlite3.connect(db_path)
+        try:
+            self.max_user_id = conn.execute("SELECT MAX(id) FROM users").fetchone()[0] or 0
+            # Користувачі без анкет йдуть після тих, хто має анкету (активну чи архівну)
+            self.first_free_user_id = conn.execute(
+                "SELECT MAX(user_id) FROM (SELECT MAX(user_id) AS user_id FROM applications "
+                "UNION ALL SELECT MAX(user_id) FROM applications_archive)").fetchone()[0] + 1
+            self.usernames = [row[0] for row in conn.execute(
+                "SELECT username FROM users WHERE username IS NOT NULL ORDER BY RANDOM() LIMIT 1000")]
+            # ID гарячої таблиці не суцільні: частина анкет лежить в архіві
+            sample = [row[0] for row in conn.execute(
+                f"SELECT id FROM applications ORDER BY RANDOM() LIMIT {SAMPLE_SIZE + MAX_ITERATIONS + 1}")]
+        finally:
+            conn.close()
+        # На малих масштабах вільні користувачі закінчуються - далі міряється шлях "вже є анкета"
+        self._free_users = itertools.cycle(range(self.first_free_user_id, self.max_user_id + 1))
+        self._deletable = sample[:MAX_ITERATIONS + 1]
+        self.application_ids = sample[MAX_ITERATIONS + 1:] or sample
+
+    def user_id(self) -> int:
+        return self.rng.randint(1, self.max_user_id)
+
+    def telegram_id(self) -> int:
+        return TELEGRAM_ID_BASE + self.rng.randint(0, self.max_user_id - 1)
+
+    def application_id(self) -> int:
+        return self.rng.choice(self.application_ids)
+
+    def username(self) -> str:
+        return self.rng.choice(self.usernames)
+
+    def free_user_id(self) -> int:
+        return next(self._free_users)
+
+    def deletable_application_id(self) -> int:
+        return self._deletable.pop()
+
+
+def build_cases(requests, targets: Targets) -> dict:
+    """Назва функції -> фабрика корутини з випадковими аргументами"""
+    return {
+        "add_user (існуючий)": lambda: requests.add_user(targets.telegram_id(), "player"),
+        "create_application": lambda: requests.create_application(
+            targets.free_user_id(), "Bench#EUW", 20, "Gold 1", "Дуелянт", ["Jett"], ["eu_london"],
+            "bench", "@bench"),
+        "get_latest_application": lambda: requests.get_latest_application(targets.telegram_id()),
+        "get_pending_applications": lambda: requests.get_pending_applications(),
+        "get_application_by_id": lambda: requests.get_application_by_id(targets.application_id()),
+        "update_application_status": lambda: requests.update_application_status(
+            targets.application_id(), "approved", targets.user_id()),
+        "update_application_channel_message": lambda: requests.update_application_channel_message(
+            targets.application_id(), 1),
+        "get_user_by_id": lambda: requests.get_user_by_id(targets.user_id()),
+        "get_user_by_telegram_id": lambda: requests.get_user_by_telegram_id(targets.telegram_id()),
+        "get_user_by_username": lambda: requests.get_user_by_username(targets.username()),
+        "set_moderator_status": lambda: requests.set_moderator_status(targets.user_id(), False),
+        "get_all_moderators": lambda: requests.get_all_moderators(),
+        "find_riot_id_duplicate": lambda: requests.find_riot_id_duplicate(
+            f"player{targets.application_id()}#euw", targets.telegram_id()),
+        "delete_application": lambda: requests.delete_application(targets.deletable_application_id()),
+    }
+
+
+async def run_worker(db_path: str, seed: int) -> dict:
+    """Замір усіх функцій на одній БД (виконується в дочірньому процесі)"""
+    from db import requests
+
+    # Кешована БД могла бути згенерована до змін схеми
+    await requests.create_tables()
+    targets = Targets(db_path, seed)
+    results = {}
+
+    for name, make_call in build_cases(requests, targets).items():
+        # Прогрів з'єднання та кешу запитів
+        await make_call()
+
+        samples = []
+        deadline = time.perf_counter() + TIME_BUDGET_S
+        while len(samples) < MAX_ITERATIONS and time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await make_call()
+            samples.append(time.perf_counter() - started)
+
+        samples.sort()
+        results[name] = {
+            "iterations": len(samples),
+            "median_ms": samples[len(samples) // 2] * 1000,
+            "min_ms": samples[0] * 1000,
+        }
+
+    await requests.engine.dispose()
+    return results
+
+
+def run_scale(rows: int, args) -> dict:
+    """Копія засіяної БД + дочірній процес з замірами"""
+    seeded = ensure_seeded(rows, seed=args.seed, reseed=args.reseed)
+
+    with tempfile.TemporaryDirectory(prefix="vts-dbbench-") as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copyfile(seeded, db_path)
+
+        env = dict(os.environ)
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.db_bench", "--worker", str(db_path), "--seed", str(args.seed)],
+            env=env, text=True,
+        )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_report(scales: list, functions: dict) -> None:
+    header = f"{'функція':<36}" + "".join(f"{n:>12}" for n in scales) + f"{'нахил':>8}  оцінка"
+    print(header)
+    for name, data in functions.items():
+        timings = "".join(f"{t:>10.3f}ms" for t in data["median_ms"])
+        print(f"{name:<36}{timings}{data['slope']:>8.2f}  {data['complexity']}")
+
+
+def print_comparison(previous: dict, current: dict) -> None:
+    print(f"\nПорівняння з {previous.get('revision')} ({previous.get('created_at')}):")
+    old_functions = previous.get("functions", {})
+    for name, data in current["functions"].items():
+        old = old_functions.get(name)
+        if not old or old.get("scales") != data.get("scales"):
+            continue
+        changes = ", ".join(format_change(o, n) for o, n in zip(old["median_ms"], data["median_ms"]))
+        print(f"  {name:<36} {changes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Мікробенчмарки db/requests.py")
+    parser.add_argument("--scales", type=lambda s: [int(x) for x in s.split(",")], default=[10_000, 100_000, 1_000_000],
+                        help="Розміри таблиці анкет через кому")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reseed", action="store_true", help="Перегенерувати кешовані БД")
+    parser.add_argument("--output", help="Шлях до JSON з результатами")
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        setup_environment(f"sqlite:///{args.worker}")
+        print(json.dumps(asyncio.run(run_worker(args.worker, args.seed))))
+        return
+
+    # Для генерації потрібен config, але не робоча БД
+    setup_environment("sqlite://")
+
+    per_scale = {}
+    for rows in args.scales:
+        print(f"Масштаб {rows} анкет...")
+        per_scale[rows] = run_scale(rows, args)
+
+    functions = {}
+    for name in per_scale[args.scales[0]]:
+        timings = [per_scale[rows][name]["median_ms"] for rows in args.scales]
+        slope, label = classify(args.scales, timings)
+        functions[name] = {"scales": args.scales, "median_ms": timings, "slope": slope, "complexity": label}
+
+    print()
+    print_report(args.scales, functions)
+
+    results = {"params": {"scales": args.scales, "seed": args.seed}, "functions": functions}
+    path = save_results("db", results, args.output)
+    print(f"\nРезультати збережено: {path}")
+
+    if args.compare:
+        print_comparison(load_results(args.compare), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Фейковий Bot API та генератор апдейтів для бенчмарків
+import asyncio
+import itertools
+import time
+from collections import Counter
+from typing import Any, AsyncGenerator, Dict, Optional, Union, get_args
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, Update
+
+FAKE_BOT_TOKEN = "123456:BENCHMARK"
+# ID для чатів, заданих як @username (канал)
+FAKE_CHANNEL_CHAT_ID = -1000000000001
+
+
+class FakeSession(BaseSession):
+    """Сесія без мережі: одразу повертає правдоподібні відповіді Telegram"""
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__()
+        # Штучна затримка відповіді (імітація RTT до Telegram)
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        returning = method.__returning__
+        variants = get_args(returning) or (returning,)
+
+        if Message in variants and getattr(method, "chat_id", None) is not None:
+            return self._make_message(bot, method)
+        if bool in variants:
+            return True
+
+        raise NotImplementedError(f"FakeSession не підтримує метод {type(method).__name__}")
+
+    async def stream_content(self, url: str, headers: Optional[Dict[str, Any]] = None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    def _make_message(self, bot: Bot, method: TelegramMethod) -> Message:
+        """Формування відповіді-повідомлення для send/edit методів"""
+        chat_id = method.chat_id
+        if not isinstance(chat_id, int):
+            chat_id = FAKE_CHANNEL_CHAT_ID
+
+        message_id = getattr(method, "message_id", None) or next(self._message_ids)
+        return Message.model_validate(
+            {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+                "text": getattr(method, "text", None),
+            },
+            context={"bot": bot},
+        )
+
+
+def create_fake_bot(latency: float = 0.0) -> Bot:
+    """Створення бота з фейковою сесією"""
+    return Bot(token=FAKE_BOT_TOKEN, session=FakeSession(latency=latency))
+
+
+class UpdateFactory:
+    """Генератор синтетичних апдейтів Message та CallbackQuery"""
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._callback_ids = itertools.count(1)
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"user{user_id}"}
+
+    @staticmethod
+    def _chat(chat_id: int) -> dict:
+        return {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"}
+
+    def build(self, data: dict) -> Update:
+        """Валідація апдейту з прив'язкою до бота"""
+        return Update.model_validate(data, context={"bot": self.bot})
+
+    def message(self, user_id: int, text: str, chat_id: Union[int, None] = None) -> Update:
+        """Текстове повідомлення від користувача"""
+        return self.build({
+            "update_id": next(self._update_ids),
+            "message": {
+                "message_id": next(self._message_ids),
+                "date": int(time.time()),
+                "chat": self._chat(chat_id or user_id),
+                "from": self._user(user_id),
+                "text": text,
+            },
+        })
+
+    def callback(self, user_id: int, data: str, chat_id: Union[int, None] = None,
+                 message_id: Union[int, None] = None) -> Update:
+        """Натискання інлайн-кнопки під повідомленням бота"""
+        return self.build({
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._callback_ids)),
+                "from": self._user(user_id),
+                "chat_instance": "benchmark",
+                "data": data,
+                "message": {
+                    "message_id": message_id or next(self._message_ids),
+                    "date": int(time.time()),
+                    "chat": self._chat(chat_id or user_id),
+                    "text": "...",
+                },
+            },
+        })
@@ -0,0 +1,284 @@
+# Наскрізний бенчмарк пропускної здатності: анкета + модерація через Dispatcher.feed_update
+#
+# Запуск:
+#   python -m benchmarks.flows --users 200 --concurrency 1,10,50,100
+#   python -m benchmarks.flows --compare benchmarks/results/flows-....json
+import argparse
+import asyncio
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import setup_environment, percentiles, save_results, load_results, format_change, \
+    BENCH_MODERATOR_CHAT_ID
+
+# Ідентифікатори модераторів не перетинаються з користувачами
+MODERATOR_ID_OFFSET = 10 ** 9
+
+
+def application_updates(factory, user_id: int, rng: random.Random) -> list:
+    """Повне проходження ApplicationForm одним користувачем"""
+    from config import RANKS, ROLES, ALL_AGENTS
+    from keyboards.callbacks import FormCallback, FormAction, RankCallback, RoleCallback, AgentCallback, \
+        RegionCallback, ServerCallback
+
+    updates = [
+        factory.message(user_id, "/start"),
+        factory.message(user_id, "Подати анкету"),
+        factory.message(user_id, f"Player{user_id}#EUW"),
+        factory.message(user_id, str(rng.randint(16, 35))),
+        factory.callback(user_id, RankCallback(index=rng.randrange(len(RANKS))).pack()),
+    ]
+    for role_index in rng.sample(range(len(ROLES)), 2):
+        updates.append(factory.callback(user_id, RoleCallback(index=role_index).pack()))
+    updates.append(factory.callback(user_id, FormCallback(action=FormAction.ROLES_CONFIRM).pack()))
+    for agent_index in rng.sample(range(len(ALL_AGENTS)), 3):
+        updates.append(factory.callback(user_id, AgentCallback(index=agent_index).pack()))
+    updates += [
+        factory.callback(user_id, FormCallback(action=FormAction.AGENTS_CONFIRM).pack()),
+        factory.callback(user_id, RegionCallback(code="eu").pack()),
+        factory.callback(user_id, ServerCallback(code="eu_london").pack()),
+        factory.callback(user_id, ServerCallback(code="eu_frankfurt").pack()),
+        factory.callback(user_id, FormCallback(action=FormAction.SERVERS_CONFIRM).pack()),
+        factory.message(user_id, "Граю в рангових щовечора, шукаю стак на 5"),
+        factory.message(user_id, f"@user{user_id}"),
+        factory.callback(user_id, FormCallback(action=FormAction.SEND).pack()),
+    ]
+    return updates
+
+
+def approve_updates(factory, moderator_id: int, application_id: int) -> list:
+    """Схвалення анкети модератором"""
+    from keyboards.callbacks import ModerationCallback, ModerationAction
+
+    data = ModerationCallback(action=ModerationAction.APPROVE, application_id=application_id).pack()
+    return [factory.callback(moderator_id, data, chat_id=BENCH_MODERATOR_CHAT_ID)]
+
+
+def reject_updates(factory, moderator_id: int, application_id: int) -> list:
+    """Відхилення анкети модератором з вибором причини"""
+    from keyboards.callbacks import ModerationCallback, ModerationAction, RejectReasonCallback, RejectionCallback, \
+        RejectionAction
+
+    steps = [
+        ModerationCallback(action=ModerationAction.REJECT, application_id=application_id),
+        RejectReasonCallback(application_id=application_id, reason="bad_id"),
+        RejectionCallback(action=RejectionAction.CONFIRM, application_id=application_id),
+    ]
+    return [factory.callback(moderator_id, step.pack(), chat_id=BENCH_MODERATOR_CHAT_ID) for step in steps]
+
+
+class FlowRunner:
+    """Проганяє віртуальних користувачів через диспетчер і збирає метрики"""
+
+    def __init__(self, dp, bot, factory, seed: int = 42):
+        self.dp = dp
+        self.bot = bot
+        self.factory = factory
+        self.rng = random.Random(seed)
+        self._next_user_id = 1000
+
+    def allocate_users(self, count: int) -> list:
+        user_ids = list(range(self._next_user_id, self._next_user_id + count))
+        self._next_user_id += count
+        return user_ids
+
+    async def prepare_moderators(self, user_ids: list) -> None:
+        """Кожен віртуальний користувач має свого модератора (окремий FSM-контекст)"""
+        from db.requests import add_user, set_moderator_status
+
+        for user_id in user_ids:
+            moderator = await add_user(MODERATOR_ID_OFFSET + user_id, f"mod{user_id}")
+            await set_moderator_status(moderator.id, True)
+
+    async def feed(self, updates: list, latencies: list, counters: dict) -> None:
+        """Послідовна подача апдейтів одного користувача з заміром затримки"""
+        from aiogram.dispatcher.event.bases import UNHANDLED
+
+        for update in updates:
+            started = time.perf_counter()
+            result = await self.dp.feed_update(self.bot, update)
+            latencies.append(time.perf_counter() - started)
+            counters["updates"] += 1
+            if result is UNHANDLED:
+                counters["unhandled"] += 1
+
+    async def run_user(self, user_id: int, approve: bool, latencies: list, counters: dict) -> None:
+        """Анкета від одного користувача + її модерація"""
+        from db.requests import get_latest_application
+
+        await self.feed(application_updates(self.factory, user_id, self.rng), latencies, counters)
+
+        application = await get_latest_application(user_id)
+        if not application:
+            counters["failed_flows"] += 1
+            return
+
+        moderator_id = MODERATOR_ID_OFFSET + user_id
+        if approve:
+            updates = approve_updates(self.factory, moderator_id, application.id)
+        else:
+            updates = reject_updates(self.factory, moderator_id, application.id)
+        await self.feed(updates, latencies, counters)
+
+    async def run_level(self, users: int, concurrency: int) -> dict:
+        """Один рівень навантаження: users користувачів, не більше concurrency одночасно"""
+        user_ids = self.allocate_users(users)
+        await self.prepare_moderators(user_ids)
+
+        latencies = []
+        counters = {"updates": 0, "unhandled": 0, "failed_flows": 0}
+        semaphore = asyncio.Semaphore(concurrency)
+        calls_before = sum(self.bot.session.calls.values())
+
+        async def worker(index: int, user_id: int):
+            async with semaphore:
+                await self.run_user(user_id, index % 2 == 0, latencies, counters)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i, user_id) for i, user_id in enumerate(user_ids)))
+        wall = time.perf_counter() - started
+
+        api_calls = sum(self.bot.session.calls.values()) - calls_before
+        return {
+            "concurrency": concurrency,
+            "users": users,
+            **counters,
+            "wall_s": wall,
+            "updates_per_s": counters["updates"] / wall if wall else 0.0,
+            "latency_ms": {
+                "mean": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+                **percentiles(latencies),
+            },
+            "api_calls_per_update": api_calls / counters["updates"] if counters["updates"] else 0.0,
+        }
+
+    async def measure_allocations(self, users: int) -> dict:
+        """Окремий прохід під tracemalloc: пікові та утримані байти на апдейт"""
+        user_ids = self.allocate_users(users)
+        await self.prepare_moderators(user_ids)
+
+        peaks = []
+        retained = []
+        blocks_before = sys.getallocatedblocks()
+        updates_total = 0
+
+        tracemalloc.start()
+        try:
+            for index, user_id in enumerate(user_ids):
+                updates = application_updates(self.factory, user_id, self.rng)
+                for update in updates:
+                    before, _ = tracemalloc.get_traced_memory()
+                    tracemalloc.reset_peak()
+                    await self.dp.feed_update(self.bot, update)
+                    current, peak = tracemalloc.get_traced_memory()
+                    peaks.append(peak - before)
+                    retained.append(current - before)
+                updates_total += len(updates)
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "updates": updates_total,
+            "peak_alloc_bytes_per_update": sum(peaks) / len(peaks) if peaks else 0.0,
+            "retained_bytes_per_update": sum(retained) / len(retained) if retained else 0.0,
+            "allocated_blocks_per_update": (sys.getallocatedblocks() - blocks_before) / updates_total
+            if updates_total else 0.0,
+        }
+
+
+def print_report(results: dict) -> None:
+    print(f"{'conc':>5} {'updates':>8} {'upd/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'unhandled':>9}")
+    for level in results["levels"]:
+        latency = level["latency_ms"]
+        print(f"{level['concurrency']:>5} {level['updates']:>8} {level['updates_per_s']:>9.1f} "
+              f"{latency['p50']:>8.2f} {latency['p95']:>8.2f} {latency['p99']:>8.2f} {level['unhandled']:>9}")
+
+    allocations = results.get("allocations")
+    if allocations:
+        print(f"\nАлокації на апдейт: пік {allocations['peak_alloc_bytes_per_update'] / 1024:.1f} KiB, "
+              f"утримано {allocations['retained_bytes_per_update']:.0f} B, "
+              f"блоків {allocations['allocated_blocks_per_update']:.1f}")
+
+
+def print_comparison(previous: dict, current: dict) -> None:
+    print(f"\nПорівняння з {previous.get('revision')} ({previous.get('created_at')}):")
+    old_levels = {level["concurrency"]: level for level in previous.get("levels", [])}
+    for level in current["levels"]:
+        old = old_levels.get(level["concurrency"])
+        if not old:
+            continue
+        print(f"  conc={level['concurrency']:>4}: upd/s {format_change(old['updates_per_s'], level['updates_per_s'])}, "
+              f"p95 {format_change(old['latency_ms']['p95'], level['latency_ms']['p95'])}, "
+              f"p99 {format_change(old['latency_ms']['p99'], level['latency_ms']['p99'])}")
+
+
+async def run(args) -> dict:
+    from main import create_dispatcher
+    from db.requests import create_tables, engine
+    from benchmarks.fake_bot import create_fake_bot, UpdateFactory
+
+    await create_tables()
+    dp = create_dispatcher()
+    bot = create_fake_bot(latency=args.api_latency / 1000)
+    runner = FlowRunner(dp, bot, UpdateFactory(bot), seed=args.seed)
+
+    # Прогрів: імпорти, компіляція запитів, пул з'єднань
+    await runner.run_level(users=2, concurrency=1)
+
+    levels = []
+    for concurrency in args.concurrency:
+        level = await runner.run_level(users=max(args.users, concurrency), concurrency=concurrency)
+        levels.append(level)
+
+    allocations = await runner.measure_allocations(args.alloc_users) if args.alloc_users else None
+
+    await bot.session.close()
+    await engine.dispose()
+
+    return {
+        "params": {
+            "users": args.users,
+            "concurrency": args.concurrency,
+            "api_latency_ms": args.api_latency,
+            "seed": args.seed,
+        },
+        "levels": levels,
+        "allocations": allocations,
+        "api_calls": dict(bot.session.calls),
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Бенчмарк потоків анкети та модерації")
+    parser.add_argument("--users", type=int, default=200, help="Кількість віртуальних користувачів на рівень")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 50, 100],
+                        help="Рівні конкурентності через кому")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Штучна затримка Bot API, мс")
+    parser.add_argument("--alloc-users", type=int, default=20, help="Користувачів для заміру алокацій (0 - вимкнути)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Шлях до JSON з результатами")
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="vts-bench-") as tmp:
+        setup_environment(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        results = asyncio.run(run(args))
+
+    print_report(results)
+    path = save_results("flows", results, args.output)
+    print(f"\nРезультати збережено: {path}")
+
+    if args.compare:
+        print_comparison(load_results(args.compare), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# Реплей записаного трафіку апдейтів у Dispatcher з фейковим Bot API
+#
+# Запис: встановіть RECORD_UPDATES_PATH=recordings/saturday.jsonl.gz у .env і запустіть бота.
+# Реплей:
+#   python -m benchmarks.replay recordings/saturday.jsonl.gz --speed 1     # реальний темп
+#   python -m benchmarks.replay recordings/saturday.jsonl.gz --speed 10    # у 10 разів швидше
+#   python -m benchmarks.replay recordings/saturday.jsonl.gz --speed max   # без пауз
+import argparse
+import asyncio
+import gzip
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterator, Optional
+
+from benchmarks.common import setup_environment, percentiles, save_results, BENCH_MODERATOR_CHAT_ID, BENCH_OWNER_ID
+
+
+def read_recording(path: str) -> Iterator[dict]:
+    """Потокове читання записів (включно з мета-рядками)"""
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def read_meta(path: str) -> dict:
+    """Мета-дані першої сесії запису: псевдонім власника та чат модераторів"""
+    for record in read_recording(path):
+        if "meta" in record:
+            return record["meta"]
+        break
+    return {}
+
+
+def update_actor(update: dict) -> Optional[int]:
+    """ID користувача, від якого прийшов апдейт (ключ для збереження порядку)"""
+    for event in update.values():
+        if isinstance(event, dict) and isinstance(event.get("from"), dict):
+            return event["from"].get("id")
+    return None
+
+
+def parse_speed(value: str) -> float:
+    """Множник швидкості; 0 означає максимальну швидкість"""
+    if value == "max":
+        return 0.0
+    speed = float(value.rstrip("x×"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("Швидкість має бути додатною або 'max'")
+    return speed
+
+
+class Replayer:
+    """Подає записані апдейти у диспетчер зі збереженням порядку для кожного користувача"""
+
+    def __init__(self, dp, bot, factory, speed: float):
+        self.dp = dp
+        self.bot = bot
+        self.factory = factory
+        self.speed = speed
+        self.latencies = []
+        self.lags = []
+        self.errors = 0
+        self._queues = {}
+        self._workers = []
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            due, payload = item
+            self.lags.append(max(0.0, time.perf_counter() - due))
+
+            update = self.factory.build(payload)
+            started = time.perf_counter()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception:
+                self.errors += 1
+            self.latencies.append(time.perf_counter() - started)
+
+    def _queue_for(self, actor) -> asyncio.Queue:
+        queue = self._queues.get(actor)
+        if queue is None:
+            queue = self._queues[actor] = asyncio.Queue()
+            self._workers.append(asyncio.create_task(self._worker(queue)))
+        return queue
+
+    async def run(self, records: Iterator[dict]) -> dict:
+        """Розклад подачі за часовими мітками запису з урахуванням швидкості"""
+        started = time.perf_counter()
+        first_ts = None
+        total = 0
+
+        for record in records:
+            if "update" not in record:
+                continue
+            if first_ts is None:
+                first_ts = record["ts"]
+
+            due = started
+            if self.speed:
+                due += (record["ts"] - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            actor = update_actor(record["update"])
+            # Апдейти без автора обробляються незалежно
+            self._queue_for(actor if actor is not None else ("update", total)).put_nowait((due, record["update"]))
+            total += 1
+
+        for queue in self._queues.values():
+            queue.put_nowait(None)
+        await asyncio.gather(*self._workers)
+        wall = time.perf_counter() - started
+
+        return {
+            "updates": total,
+            "users": len(self._queues),
+            "errors": self.errors,
+            "wall_s": wall,
+            "updates_per_s": total / wall if wall else 0.0,
+            "latency_ms": percentiles(self.latencies),
+            "max_lag_ms": max(self.lags) * 1000 if self.lags else 0.0,
+            "lag_ms": percentiles(self.lags),
+        }
+
+
+async def promote_moderators(path: str, moderator_chat_id: int) -> int:
+    """Усі, хто діяв у чаті модераторів під час запису, стають модераторами в БД реплею"""
+    from db.requests import add_user, set_moderator_status
+
+    moderators = set()
+    for record in read_recording(path):
+        update = record.get("update")
+        if not update:
+            continue
+        for event in update.values():
+            if not isinstance(event, dict):
+                continue
+            chat = (event.get("message") or event).get("chat") or {}
+            if chat.get("id") == moderator_chat_id and event.get("from"):
+                moderators.add(event["from"]["id"])
+
+    for telegram_id in moderators:
+        user = await add_user(telegram_id)
+        await set_moderator_status(user.id, True)
+    return len(moderators)
+
+
+async def run(args, moderator_chat_id: int) -> dict:
+    from main import create_dispatcher
+    from db.requests import create_tables, engine
+    from benchmarks.fake_bot import create_fake_bot, UpdateFactory
+
+    await create_tables()
+    promoted = await promote_moderators(args.recording, moderator_chat_id)
+
+    dp = create_dispatcher()
+    bot = create_fake_bot(latency=args.api_latency / 1000)
+    replayer = Replayer(dp, bot, UpdateFactory(bot), args.speed)
+    results = await replayer.run(read_recording(args.recording))
+
+    await bot.session.close()
+    await engine.dispose()
+
+    return {
+        "params": {
+            "recording": str(args.recording),
+            "speed": args.speed or "max",
+            "api_latency_ms": args.api_latency,
+        },
+        "moderators": promoted,
+        **results,
+        "api_calls": dict(bot.session.calls),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Реплей записаного трафіку апдейтів")
+    parser.add_argument("recording", help="Файл запису (.jsonl.gz)")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1, 10, 10x або max")
+    parser.add_argument("--db", help="Знімок БД, на якому виконувати реплей (копіюється)")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="Штучна затримка Bot API, мс")
+    parser.add_argument("--output", help="Шлях до JSON з результатами")
+    args = parser.parse_args()
+
+    meta = read_meta(args.recording)
+    moderator_chat_id = meta.get("moderator_chat_id") or BENCH_MODERATOR_CHAT_ID
+
+    with tempfile.TemporaryDirectory(prefix="vts-replay-") as tmp:
+        db_path = Path(tmp) / "replay.db"
+        if args.db:
+            shutil.copyfile(args.db, db_path)
+        setup_environment(f"sqlite:///{db_path}", moderator_chat_id=moderator_chat_id,
+                          owner_id=meta.get("owner_id") or BENCH_OWNER_ID)
+        results = asyncio.run(run(args, moderator_chat_id))
+
+    latency = results["latency_ms"]
+    print(f"Апдейтів: {results['updates']} від {results['users']} користувачів, помилок: {results['errors']}")
+    print(f"Пропускна здатність: {results['updates_per_s']:.1f} апд/с за {results['wall_s']:.1f} с")
+    print(f"Затримка: p50 {latency['p50']:.2f} мс, p95 {latency['p95']:.2f} мс, p99 {latency['p99']:.2f} мс")
+    print(f"Максимальне відставання від розкладу: {results['max_lag_ms']:.1f} мс")
+
+    path = save_results("replay", results, args.output)
+    print(f"\nРезультати збережено: {path}")
+
+
+if __name__ == "__main__":
+    main()
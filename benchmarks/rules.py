@@ -0,0 +1,111 @@
+# Бенчмарк автоперевірки анкет (services/moderation_rules.py)
+#
+# Запуск:
+#   python -m benchmarks.rules
+#   python -m benchmarks.rules --rows 100000 --budget-us 200
+#
+# Звіряє вердикти з еталонними анкетами, перевіряє анкети тестової БД і завершується з кодом 1,
+# якщо вердикт розійшовся з очікуваним або p99 перевірки вийшов за бюджет.
+import argparse
+import sqlite3
+import statistics
+import sys
+import time
+
+from benchmarks.common import setup_environment, save_results
+from benchmarks.seed import ensure_seeded
+
+
+def load_samples(path, limit: int) -> list:
+    """Поля анкет (Riot ID, біо, контакт) з гарячої таблиці та архіву"""
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT riot_id, bio, contact_info FROM applications "
+            "UNION ALL SELECT riot_id, bio, contact_info FROM applications_archive LIMIT ?",
+            (limit,)
+        ).fetchall()
+
+
+# Еталонні анкети: (Riot ID, біо, контакт, очікувані коди автоматичного відхилення)
+REFERENCE_CASES = [
+    ("Player#EUW", "Граю вечорами, мій discord.gg/abcd", "https://t.me/player", []),
+    ("Player#EUW", "https://www.youtube.com/@player", "@player", []),
+    ("Player#EUW", "discord.gg/a https://bit.ly/b www.site.com", "@player", ["rules"]),
+    ("Player#EUW", "discord.gg/abcd www.site.com", "https://t.me/player", ["rules"]),
+    ("Гравець#УКР", "Шукаю команду", "@player", []),
+    ("Гравець#1", "Шукаю команду", "@player", []),
+    ("Nickname#tag", "Шукаю команду", "@player", ["bad_id"]),
+    ("Гравець#УКРАЇНА", "Шукаю команду", "@player", ["bad_id"]),
+]
+
+
+def check_reference_cases() -> list:
+    """Розбіжності вердиктів з еталонними анкетами (порожній список - все збігається)"""
+    from services.moderation_rules import moderation_rules
+
+    failures = []
+    for riot_id, bio, contact_info, expected in REFERENCE_CASES:
+        verdict = moderation_rules.evaluate(riot_id, bio, contact_info)
+        if verdict.reject != expected:
+            failures.append(f"{riot_id} | {bio} | {contact_info}: {verdict.reject} замість {expected}")
+    return failures
+
+
+def measure(samples: list, repeats: int) -> dict:
+    """Час перевірки однієї анкети, мікросекунди"""
+    from services.moderation_rules import moderation_rules
+
+    timings, rejected, tagged = [], 0, 0
+    for _ in range(repeats):
+        for riot_id, bio, contact_info in samples:
+            started = time.perf_counter()
+            verdict = moderation_rules.evaluate(riot_id, bio, contact_info)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+            rejected += bool(verdict.reject)
+            tagged += bool(verdict.tags)
+
+    timings.sort()
+    return {
+        "applications": len(timings),
+        "median_us": statistics.median(timings),
+        "p99_us": timings[int(len(timings) * 0.99)],
+        "max_us": timings[-1],
+        "rejected_share": rejected / len(timings),
+        "tagged_share": tagged / len(timings),
+        "terms": moderation_rules.matcher.size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк автоперевірки анкет")
+    parser.add_argument("--rows", type=int, default=10_000, help="Розмір тестової БД")
+    parser.add_argument("--repeats", type=int, default=3, help="Проходів по всіх анкетах")
+    parser.add_argument("--budget-us", type=float, default=200, help="Бюджет на p99 перевірки однієї анкети, мкс")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Шлях до JSON з результатами")
+    args = parser.parse_args()
+
+    path = ensure_seeded(args.rows, seed=args.seed)
+    setup_environment(f"sqlite:///{path}")
+    failures = check_reference_cases()
+    for failure in failures:
+        print(f"❌ Еталонна анкета: {failure}")
+    if failures:
+        sys.exit(1)
+
+    results = measure(load_samples(path, args.rows), args.repeats)
+    results["params"] = {"rows": args.rows, "repeats": args.repeats, "budget_us": args.budget_us}
+
+    print(f"Перевірено {results['applications']} анкет: медіана {results['median_us']:.1f} мкс, "
+          f"p99 {results['p99_us']:.1f} мкс, максимум {results['max_us']:.1f} мкс")
+    print(f"Відхилено б автоматично: {results['rejected_share']:.1%}, з позначками: {results['tagged_share']:.1%}")
+    print(f"\nРезультати збережено: {save_results('rules', results, args.output)}")
+
+    if results["p99_us"] > args.budget_us:
+        print(f"\n❌ p99 {results['p99_us']:.1f} мкс > {args.budget_us} мкс")
+        sys.exit(1)
+    print("\n✅ Перевірка в межах бюджету")
+
+
+if __name__ == "__main__":
+    main()
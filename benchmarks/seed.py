@@ -0,0 +1,182 @@
+# Генератор реалістичних користувачів та анкет для бенчмарків БД
+#
+# Запуск:
+#   python -m benchmarks.seed --rows 100000 --db benchmarks/data/seed-100000.db
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from benchmarks.common import setup_environment
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# Частка користувачів без анкети (для create_application в бенчмарку)
+FREE_USERS_RATIO = 0.1
+BATCH_SIZE = 10_000
+TELEGRAM_ID_BASE = 100_000_000
+
+STATUS_WEIGHTS = {"approved": 60, "pending": 10, "rejected": 30}
+REGION_WEIGHTS = {"eu": 45, "na": 20, "ap": 12, "latam": 8, "br": 7, "kr": 5, "cn": 3}
+# Поля анкети, що зберігаються в архіві
+ARCHIVE_FIELDS = ("user_id", "status", "riot_id", "age", "rank", "role", "agents", "server", "bio",
+                  "contact_info", "created_at")
+POPULAR_AGENTS = {"Jett", "Reyna", "Sage", "Omen", "Sova", "Killjoy", "Raze", "Chamber", "Clove"}
+
+
+def seed_path(rows: int) -> Path:
+    """Шлях до кешованої БД певного розміру"""
+    return DATA_DIR / f"seed-{rows}.db"
+
+
+class RowGenerator:
+    """Генерація рядків з розподілами на основі config.RANKS, ALL_AGENTS та REGIONS"""
+
+    def __init__(self, seed: int):
+        from config import RANKS, ROLES, ALL_AGENTS, REGIONS, REGION_SHORT_CODES
+        from db.requests import normalize_riot_id
+
+        self.normalize_riot_id = normalize_riot_id
+        self.rng = random.Random(seed)
+        self.now = datetime.now(timezone.utc)
+        self.roles = ROLES
+
+        # Ранги: дзвоноподібний розподіл з піком біля Gold/Platinum
+        self.ranks = RANKS
+        peak = RANKS.index("Gold 3")
+        self.rank_weights = [math.exp(-((i - peak) / 6) ** 2) for i in range(len(RANKS))]
+
+        self.agents = ALL_AGENTS
+        self.agent_weights = [3 if agent in POPULAR_AGENTS else 1 for agent in ALL_AGENTS]
+
+        self.regions = [list(REGIONS[name].values()) for name in REGION_SHORT_CODES]
+        self.region_weights = [REGION_WEIGHTS.get(code, 1) for code in REGION_SHORT_CODES.values()]
+
+        self.statuses = list(STATUS_WEIGHTS)
+        self.status_weights = list(STATUS_WEIGHTS.values())
+
+    def user(self, index: int) -> dict:
+        created_at = self.now - timedelta(seconds=self.rng.randint(0, 365 * 86400))
+        return {
+            "id": index + 1,
+            "telegram_id": TELEGRAM_ID_BASE + index,
+            # Частина користувачів без username
+            "username": f"player{index}" if self.rng.random() < 0.85 else None,
+            "is_moderator": False,
+            "created_at": created_at,
+        }
+
+    def _sample(self, population: list, weights: list, k: int) -> list:
+        picked = []
+        while len(picked) < k:
+            item = self.rng.choices(population, weights)[0]
+            if item not in picked:
+                picked.append(item)
+        return picked
+
+    def application(self, index: int, user_id: int) -> dict:
+        rng = self.rng
+        created_at = self.now - timedelta(seconds=rng.randint(0, 180 * 86400))
+        servers = rng.choices(self.regions, self.region_weights)[0]
+        riot_id = f"Player{index}#{rng.choice(['EUW', 'UA1', 'NA1', 'GG', 'TR'])}"
+        return {
+            "id": index + 1,
+            "user_id": user_id,
+            "status": rng.choices(self.statuses, self.status_weights)[0],
+            "riot_id": riot_id,
+            "riot_id_norm": self.normalize_riot_id(riot_id),
+            "age": rng.randint(14, 40),
+            "rank": rng.choices(self.ranks, self.rank_weights)[0],
+            "role": ", ".join(rng.sample(self.roles, rng.randint(1, 2))),
+            "agents": json.dumps(self._sample(self.agents, self.agent_weights, rng.randint(1, 5))),
+            "server": json.dumps(rng.sample(servers, min(len(servers), rng.randint(1, 3)))),
+            "bio": rng.choice(["Не вказано", "Граю щовечора, шукаю стак", "Тільки рангова, мікрофон є",
+                               "Fun games, no toxicity", "Шукаю команду на турнір"]),
+            "contact_info": f"@player{index}",
+            "channel_message_id": index + 1 if rng.random() < 0.6 else None,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+    @staticmethod
+    def archived(row: dict) -> dict:
+        """Рядок applications_archive з рядка анкети"""
+        archived = {name: row[name] for name in ARCHIVE_FIELDS}
+        archived["application_id"] = row["id"]
+        archived["archived_at"] = row["updated_at"]
+        return archived
+
+
+def seed_database(path: Path, rows: int, seed: int = 42) -> dict:
+    """Створення БД з rows анкетами та відповідною кількістю користувачів"""
+    from sqlalchemy import create_engine, insert, event
+    from db.models import Base, User, Application, ArchivedApplication
+    from db.requests import ACTIVE_STATUSES
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    engine = create_engine(f"sqlite:///{path}")
+
+    @event.listens_for(engine, "connect")
+    def _fast_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+    Base.metadata.create_all(engine)
+    generator = RowGenerator(seed)
+    users_count = rows + int(rows * FREE_USERS_RATIO)
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        for start in range(0, users_count, BATCH_SIZE):
+            batch = [generator.user(i) for i in range(start, min(start + BATCH_SIZE, users_count))]
+            conn.execute(insert(User), batch)
+
+        for start in range(0, rows, BATCH_SIZE):
+            # Перші rows користувачів мають по одній анкеті, решта - вільні
+            batch = [generator.application(i, i + 1) for i in range(start, min(start + BATCH_SIZE, rows))]
+            # Неактивні анкети одразу лягають в архів, як після модерації
+            active = [row for row in batch if row["status"] in ACTIVE_STATUSES]
+            archived = [generator.archived(row) for row in batch if row["status"] not in ACTIVE_STATUSES]
+            conn.execute(insert(Application), active)
+            if archived:
+                conn.execute(insert(ArchivedApplication), archived)
+
+    engine.dispose()
+    return {"users": users_count, "applications": rows, "seconds": time.perf_counter() - started}
+
+
+def ensure_seeded(rows: int, seed: int = 42, reseed: bool = False) -> Path:
+    """Повертає шлях до кешованої БД, генеруючи її за потреби"""
+    path = seed_path(rows)
+    if reseed or not path.exists():
+        stats = seed_database(path, rows, seed)
+        print(f"Згенеровано {stats['users']} користувачів та {stats['applications']} анкет "
+              f"за {stats['seconds']:.1f} с -> {path}")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерація тестової БД")
+    parser.add_argument("--rows", type=int, default=10_000, help="Кількість анкет")
+    parser.add_argument("--db", help="Шлях до файлу БД (за замовчуванням benchmarks/data/seed-<rows>.db)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = Path(args.db) if args.db else seed_path(args.rows)
+    setup_environment(f"sqlite:///{path}")
+    stats = seed_database(path, args.rows, args.seed)
+    print(f"Згенеровано {stats['users']} користувачів та {stats['applications']} анкет "
+          f"за {stats['seconds']:.1f} с -> {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# Бенчмарк часу старту бота: імпорт модулів та перевірка схеми БД
+#
+# Запуск:
+#   python -m benchmarks.startup
+#   python -m benchmarks.startup --import-budget-ms 3000 --schema-budget-ms 20
+#
+# Завершується з кодом 1, якщо старт вийшов за бюджет (для перевірки перед деплоєм).
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import setup_environment, save_results, load_results, format_change
+from benchmarks.seed import ensure_seeded
+
+# Пакети бота (решта модулів - стандартна бібліотека та залежності)
+PROJECT_PACKAGES = {"main", "config", "db", "handlers", "keyboards", "middlewares", "services", "templates"}
+
+
+def parse_importtime(stderr: str) -> dict:
+    """Рядки `-X importtime` у {модуль: (власний час, кумулятивний час)} у мікросекундах"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, self_us, cumulative_us, name = (part.strip() for part in line.replace("import time:", "|", 1).split("|"))
+        modules[name] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def measure_imports(runs: int) -> dict:
+    """Медіана часу `import main` у свіжих процесах (байткод уже скомпільовано першим запуском)"""
+    command = [sys.executable, "-X", "importtime", "-c", "import main"]
+    subprocess.run(command, env=os.environ, capture_output=True, check=True)
+
+    totals, samples = [], []
+    for _ in range(runs):
+        result = subprocess.run(command, env=os.environ, capture_output=True, text=True, check=True)
+        modules = parse_importtime(result.stderr)
+        totals.append(modules["main"][1] / 1000)
+        samples.append(modules)
+
+    median_run = samples[totals.index(sorted(totals)[len(totals) // 2])]
+    project = {name: cumulative / 1000 for name, (_, cumulative) in median_run.items()
+               if name.split(".")[0] in PROJECT_PACKAGES}
+    heaviest = sorted(((self_us / 1000, name) for name, (self_us, _) in median_run.items()), reverse=True)
+    return {
+        "total_ms": statistics.median(totals),
+        "runs_ms": totals,
+        "project_ms": dict(sorted(project.items(), key=lambda item: -item[1])),
+        "heaviest_self_ms": {name: value for value, name in heaviest[:10]},
+    }
+
+
+async def measure_schema(repeats: int) -> dict:
+    """create_tables(): перший запуск на БД без версії схеми та повторні старти"""
+    from db.requests import create_tables, engine
+
+    started = time.perf_counter()
+    await create_tables()
+    first_ms = (time.perf_counter() - started) * 1000
+
+    repeated = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await create_tables()
+        repeated.append((time.perf_counter() - started) * 1000)
+
+    await engine.dispose()
+    return {"first_ms": first_ms, "restart_ms": statistics.median(repeated)}
+
+
+def print_report(results: dict) -> None:
+    imports = results["imports"]
+    print(f"Імпорт main: {imports['total_ms']:.0f} мс (медіана з {len(imports['runs_ms'])})")
+    print("\nМодулі бота (кумулятивно):")
+    for name, value in list(imports["project_ms"].items())[:15]:
+        print(f"  {name:<40}{value:>10.1f} мс")
+    print("\nНайважчі модулі (власний час):")
+    for name, value in imports["heaviest_self_ms"].items():
+        print(f"  {name:<40}{value:>10.1f} мс")
+
+    schema = results["schema"]
+    print(f"\nПеревірка схеми на {results['params']['rows']} анкет: "
+          f"перший запуск {schema['first_ms']:.0f} мс, перезапуск {schema['restart_ms']:.1f} мс")
+
+
+def print_comparison(previous: dict, current: dict) -> None:
+    print(f"\nПорівняння з {previous.get('revision')} ({previous.get('created_at')}):")
+    print(f"  імпорт: {format_change(previous['imports']['total_ms'], current['imports']['total_ms'])}, "
+          f"перезапуск схеми: {format_change(previous['schema']['restart_ms'], current['schema']['restart_ms'])}")
+
+
+def check_budget(results: dict, args) -> list:
+    """Перевищення бюджету старту (порожній список - все гаразд)"""
+    failures = []
+    if results["imports"]["total_ms"] > args.import_budget_ms:
+        failures.append(f"імпорт {results['imports']['total_ms']:.0f} мс > {args.import_budget_ms} мс")
+    if results["schema"]["restart_ms"] > args.schema_budget_ms:
+        failures.append(f"перевірка схеми {results['schema']['restart_ms']:.1f} мс > {args.schema_budget_ms} мс")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк часу старту бота")
+    parser.add_argument("--rows", type=int, default=10_000, help="Розмір тестової БД для перевірки схеми")
+    parser.add_argument("--runs", type=int, default=5, help="Кількість замірів імпорту")
+    parser.add_argument("--import-budget-ms", type=float, default=4000, help="Бюджет на `import main`, мс")
+    parser.add_argument("--schema-budget-ms", type=float, default=50, help="Бюджет на create_tables() при перезапуску, мс")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Шлях до JSON з результатами")
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння")
+    args = parser.parse_args()
+
+    seeded = ensure_seeded(args.rows, seed=args.seed)
+    with tempfile.TemporaryDirectory(prefix="vts-startup-") as tmp:
+        db_path = Path(tmp) / "bench.db"
+        shutil.copyfile(seeded, db_path)
+        setup_environment(f"sqlite:///{db_path}")
+        imports = measure_imports(args.runs)
+        schema = asyncio.run(measure_schema(args.runs))
+
+    results = {
+        "params": {"rows": args.rows, "runs": args.runs, "import_budget_ms": args.import_budget_ms,
+                   "schema_budget_ms": args.schema_budget_ms},
+        "imports": imports,
+        "schema": schema,
+    }
+    print_report(results)
+    path = save_results("startup", results, args.output)
+    print(f"\nРезультати збережено: {path}")
+
+    if args.compare:
+        print_comparison(load_results(args.compare), results)
+
+    failures = check_budget(results, args)
+    if failures:
+        print("\n❌ Старт перевищує бюджет: " + "; ".join(failures))
+        sys.exit(1)
+    print("\n✅ Старт в межах бюджету")
+
+
+if __name__ == "__main__":
+    main()
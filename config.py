@@ -15,7 +15,71 @@ BOT_OWNER_ID = int(os.getenv('BOT_OWNER_ID', 0))
 if BOT_OWNER_ID == 0:
     raise ValueError("BOT_OWNER_ID не встановлено в .env файлі!")
 
-DATABASE_URL = "sqlite:///database.db"
+DATABASE_URL = os.getenv('DATABASE_URL', "sqlite:///database.db")
+DB_ECHO = os.getenv('DB_ECHO', '0') == '1'  # Виводити SQL-запити в лог
+
+# Запис вхідних апдейтів для реплею навантаження (порожньо - вимкнено)
+RECORD_UPDATES_PATH = os.getenv('RECORD_UPDATES_PATH', '')
+# Сіль для псевдонімізації ID користувачів у записі
+RECORD_UPDATES_SALT = os.getenv('RECORD_UPDATES_SALT', BOT_TOKEN)
+
+# Планувальник фонових завдань
+SCHEDULER_WORKERS = int(os.getenv('SCHEDULER_WORKERS', 2))  # Одночасно виконуваних завдань
+SCHEDULER_RETRY_BACKOFF = 30      # Затримка першого повтору, секунди (далі подвоюється)
+SCHEDULER_MAX_BACKOFF = 3600      # Максимальна затримка повтору, секунди
+
+# Автоматичне зняття з публікації застарілих анкет (0 - вимкнено)
+APPLICATION_TTL_DAYS = int(os.getenv('APPLICATION_TTL_DAYS', 30))
+# За скільки днів до зняття попереджати власника анкети
+APPLICATION_EXPIRY_WARNING_DAYS = int(os.getenv('APPLICATION_EXPIRY_WARNING_DAYS', 3))
+EXPIRY_CHECK_INTERVAL = int(os.getenv('EXPIRY_CHECK_INTERVAL', 3600))  # Секунди між перевірками
+EXPIRY_BATCH_SIZE = 100       # Анкет в одній транзакції
+CHANNEL_RATE = 1.0            # Запитів до каналу за секунду (публікація, редагування, видалення)
+USER_NOTIFY_RATE = 20.0       # Особистих повідомлень за секунду
+
+# Розсилка власника всім користувачам (/broadcast)
+BROADCAST_RATE = 25.0         # Повідомлень за секунду (глобальний ліміт Telegram - близько 30)
+BROADCAST_WORKERS = 10        # Одночасних запитів на відправку
+BROADCAST_BATCH_SIZE = 50     # Доставок, що записуються однією транзакцією (і крок звіту про прогрес)
+
+# Дайджест: схвалені анкети публікуються в канал спільними повідомленнями
+DIGEST_MODE = os.getenv('DIGEST_MODE', '0') == '1'
+DIGEST_INTERVAL = int(os.getenv('DIGEST_INTERVAL_MINUTES', 30)) * 60  # Секунди між дайджестами
+DIGEST_MAX_ITEMS = int(os.getenv('DIGEST_MAX_ITEMS', 10))  # Публікувати одразу при накопиченні стількох анкет
+MESSAGE_MAX_LENGTH = 4096     # Ліміт довжини повідомлення Telegram
+# Мова карток анкет у публічному каналі (uk або en)
+CHANNEL_LOCALE = os.getenv('CHANNEL_LOCALE', 'uk')
+
+# Захист від флуду: ліміт апдейтів на користувача (модератори не обмежуються)
+THROTTLING = os.getenv('THROTTLING', '1') == '1'
+THROTTLE_MESSAGE_RATE = 1.0   # Повідомлень за секунду в середньому
+THROTTLE_MESSAGE_BURST = 5    # Повідомлень поспіль без обмеження
+THROTTLE_CALLBACK_RATE = 3.0  # Натискань кнопок за секунду в середньому
+THROTTLE_CALLBACK_BURST = 10  # Натискань поспіль без обмеження
+THROTTLE_EVICT_INTERVAL = 300  # Секунди між очищеннями неактивних користувачів
+
+# Плавний перезапуск: стан FSM та незавершені апдейти передаються наступному процесу
+HANDOFF_PATH = os.getenv('HANDOFF_PATH', 'handoff.json.gz')
+HANDOFF_DRAIN_TIMEOUT = 10    # Секунди очікування апдейтів, що обробляються, при зупинці
+
+# Журнал модерації: записи накопичуються в пам'яті та пишуться пакетами
+AUDIT_FLUSH_INTERVAL = 5      # Секунди між записами пакета
+AUDIT_BATCH_SIZE = 100        # Запис одразу при накопиченні стількох подій
+
+# Розподіл анкет між модераторами: оренда анкети та черга за часом очікування
+CLAIM_LEASE_MINUTES = int(os.getenv('CLAIM_LEASE_MINUTES', 10))  # Скільки анкета закріплена за модератором
+MODERATOR_ACTIVE_MINUTES = 30  # Модератор вважається активним стільки хвилин після останньої дії
+# Більше анкет одному модератору автоматично не призначається (0 - без автопризначення, лише взяття вручну)
+MAX_CLAIMS_PER_MODERATOR = int(os.getenv('MAX_CLAIMS_PER_MODERATOR', 3))
+CLAIM_CHECK_INTERVAL = 60      # Секунди між поверненнями прострочених оренд у чергу
+
+# Оновлення username користувачів: зміни з апдейтів пишуться пакетами
+USERNAME_FLUSH_INTERVAL = 30  # Секунди між записами пакета
+USERNAME_CACHE_SIZE = 50000   # Користувачів, чий останній username пам'ятається в процесі
+
+# Повернення вільного місця у файлі БД після перенесення анкет в архів
+VACUUM_INTERVAL = 6 * 3600    # Секунди між запусками
+VACUUM_PAGES = 2000           # Сторінок за один запуск (обмежує тривалість блокування)
 
 # Обмеження для бази даних
 MAX_RIOT_ID_LENGTH = 50       # Максимальна довжина Riot ID
@@ -40,6 +104,17 @@ REJECTION_REASONS = {
     "custom": "💬 Своя причина"
 }
 
+# Автоперевірка анкет перед модерацією (1 - увімкнено)
+MODERATION_RULES = os.getenv('MODERATION_RULES', '1') == '1'
+# Заборонені терміни (без урахування регістру, шукаються як підрядки в Riot ID, біо та контакті).
+# Ключ - код причини з REJECTION_REASONS для автоматичного відхилення або None - лише позначка для модераторів
+MODERATION_TERMS = {
+    "rules": ["casino", "казино", "free vp", "безкоштовні vp", "продам акаунт", "продаю акаунт", "sell account"],
+    None: ["boost", "буст", "купл", "продам", "реклам", "заробіт"],
+}
+# Файл з додатковими термінами: рядки "<код причини або tag> <термін>" (# - коментар)
+MODERATION_TERMS_PATH = os.getenv('MODERATION_TERMS_PATH', '')
+
 # Список всіх агентів Valorant (станом на 2025)
 ALL_AGENTS = sorted([
     # Дуеліанти
@@ -1,5 +1,5 @@
 # Моделі бази даних
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
 from config import MAX_RIOT_ID_LENGTH, MAX_RANK_LENGTH, MAX_ROLE_LENGTH, MAX_BIO_LENGTH, MAX_CONTACT_LENGTH, MAX_USERNAME_LENGTH, MAX_STATUS_LENGTH
@@ -15,17 +15,30 @@ class User(Base):
     telegram_id = Column(Integer, unique=True, nullable=False)
     username = Column(String(MAX_USERNAME_LENGTH))
     is_moderator = Column(Boolean, default=False)
+    locale = Column(String(5), nullable=True)  # Мова карток анкет (None - мова за замовчуванням)
+    is_blocked = Column(Boolean, default=False)  # Користувач заблокував бота (не отримує розсилок)
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
 
 class Application(Base):
     """Модель анкети"""
     __tablename__ = 'applications'
+    __table_args__ = (
+        # Пошук дублікатів Riot ID одним індексним запитом
+        Index('ix_applications_riot_id_norm_status', 'riot_id_norm', 'status'),
+        # Вибірка застарілих опублікованих анкет для зняття з публікації
+        Index('ix_applications_status_updated_at', 'status', 'updated_at'),
+        # Активна анкета користувача (гаряча таблиця мала, тож індекс дешевий)
+        Index('ix_applications_user_id', 'user_id'),
+        # Анкети поста в каналі (редагування дайджесту, обхід постів при resync)
+        Index('ix_applications_channel_message_id', 'channel_message_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
-    status = Column(String(MAX_STATUS_LENGTH), default='pending')  # pending, approved, rejected
+    status = Column(String(MAX_STATUS_LENGTH), default='pending')  # pending, approved (решта - в архіві)
     riot_id = Column(String(MAX_RIOT_ID_LENGTH), nullable=False)
+    riot_id_norm = Column(String(MAX_RIOT_ID_LENGTH))  # Нормалізований Riot ID (casefold, без зайвих пробілів)
     age = Column(Integer, nullable=False)
     rank = Column(String(MAX_RANK_LENGTH), nullable=False)
     role = Column(String(MAX_ROLE_LENGTH), nullable=False)
@@ -35,5 +48,111 @@ class Application(Base):
     contact_info = Column(String(MAX_CONTACT_LENGTH), nullable=False)
     moderator_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     channel_message_id = Column(Integer, nullable=True)
+    channel_content_hash = Column(String(32), nullable=True)  # Хеш тексту поста в каналі (для пропуску незмінених)
+    expiry_warned_at = Column(DateTime, nullable=True)  # Коли власника попереджено про зняття з публікації
+    publish_queued_at = Column(DateTime, nullable=True)  # Схвалена анкета чекає на найближчий дайджест
+    version = Column(Integer, default=0)  # Лічильник змін статусу (умовне оновлення при модерації)
+    moderation_message_id = Column(Integer, nullable=True)  # Картка анкети в чаті модераторів
+    claimed_by = Column(Integer, ForeignKey('users.id'), nullable=True)  # Модератор, що взяв анкету в роботу
+    claim_expires_at = Column(DateTime, nullable=True)  # Кінець оренди: після нього анкета повертається в чергу
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
\ No newline at end of file
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+
+class ArchivedApplication(Base):
+    """Архів неактивних анкет: лише поля картки, без службових колонок гарячої таблиці"""
+    __tablename__ = 'applications_archive'
+    __table_args__ = (
+        Index('ix_applications_archive_user_id', 'user_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, nullable=False)  # ID анкети в applications на момент архівації
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    status = Column(String(MAX_STATUS_LENGTH), nullable=False)  # rejected, deleted, expired
+    riot_id = Column(String(MAX_RIOT_ID_LENGTH), nullable=False)
+    age = Column(Integer, nullable=False)
+    rank = Column(String(MAX_RANK_LENGTH), nullable=False)
+    role = Column(String(MAX_ROLE_LENGTH), nullable=False)
+    agents = Column(Text, nullable=False)  # JSON строка, як в applications
+    server = Column(Text, nullable=False)  # JSON строка, як в applications
+    bio = Column(String(MAX_BIO_LENGTH))
+    contact_info = Column(String(MAX_CONTACT_LENGTH), nullable=False)
+    moderator_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class ServerName(Base):
+    """Назви серверів для повнотекстового пошуку (синхронізуються з config.REGIONS)"""
+    __tablename__ = 'server_names'
+
+    code = Column(String(50), primary_key=True)
+    name = Column(String(100), nullable=False)
+
+
+class Job(Base):
+    """Відкладене або періодичне завдання планувальника"""
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)  # Ім'я зареєстрованого обробника
+    key = Column(String(200), unique=True, nullable=True)  # Унікальний ключ (без дублікатів завдання)
+    payload = Column(Text, nullable=False, default='{}')  # Аргументи обробника як JSON строка
+    run_at = Column(DateTime, nullable=False, index=True)
+    interval = Column(Integer, nullable=True)  # Період у секундах для повторюваних завдань
+    attempts = Column(Integer, default=0)
+    max_retries = Column(Integer, default=5)
+    last_error = Column(Text, nullable=True)
+    failed_at = Column(DateTime, nullable=True)  # Вичерпано спроби (завдання більше не запускається)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class ModerationEvent(Base):
+    """Журнал рішень щодо анкет (лише додавання записів)"""
+    __tablename__ = 'moderation_events'
+    __table_args__ = (
+        Index('ix_moderation_events_application_id', 'application_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    application_id = Column(Integer, nullable=False)  # Без FK: анкета могла переїхати в архів
+    actor_id = Column(Integer, ForeignKey('users.id'), nullable=True)  # NULL - дія системи
+    action = Column(String(20), nullable=False)  # approve, reject, auto_reject, delete, expire
+    reasons = Column(Text, nullable=True)  # Причини відхилення як JSON список
+    created_at = Column(DateTime, nullable=False)
+
+
+class Broadcast(Base):
+    """Розсилка власника всім користувачам"""
+    __tablename__ = 'broadcasts'
+
+    id = Column(Integer, primary_key=True)
+    text = Column(Text, nullable=False)
+    chat_id = Column(Integer, nullable=False)  # Чат власника для звіту про прогрес
+    message_id = Column(Integer, nullable=True)  # Повідомлення з прогресом
+    status = Column(String(MAX_STATUS_LENGTH), default='draft')  # draft, running, done, cancelled
+    cursor = Column(Integer, default=0)  # users.id останнього обробленого отримувача
+    total = Column(Integer, default=0)
+    sent = Column(Integer, default=0)
+    blocked = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime, nullable=True)
+
+
+class BroadcastDelivery(Base):
+    """Результат доставки розсилки окремому користувачу"""
+    __tablename__ = 'broadcast_deliveries'
+
+    broadcast_id = Column(Integer, ForeignKey('broadcasts.id'), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    status = Column(String(MAX_STATUS_LENGTH), nullable=False)  # sent, blocked, failed
+
+
+class StatCounter(Base):
+    """Агрегований лічильник статистики (оновлюється разом зі змінами анкет)"""
+    __tablename__ = 'stats_counters'
+
+    name = Column(String(20), primary_key=True)  # Група: status, reason, rank, role, server, latency
+    key = Column(String(100), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -1,42 +1,327 @@
 # Функції для роботи з базою даних
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy import select, inspect, text, update, delete, insert, literal, bindparam, exists, Integer, func
+import hashlib
 import json
+import re
+from collections import Counter
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 import logging
-from db.models import User, Application, Base
-from config import DATABASE_URL
+from db.models import User, Application, ArchivedApplication, Job, ModerationEvent, StatCounter, Broadcast, \
+    BroadcastDelivery, Base
+from db.search import setup_search, build_match_query, SEARCH_SQL, SEARCH_ACTIVE_SQL, SEARCH_ARCHIVE_SQL, \
+    FTS_TABLE_DDL, ARCHIVE_FTS_TABLE_DDL, FTS_TRIGGERS_DDL
+from db.stats import setup_stats, rebuild_stats, bump_statement, application_deltas, latency_bucket, \
+    moderation_latency, reason_code, STATUS, REASON, LATENCY
+from config import DATABASE_URL, DB_ECHO, REGIONS
+from templates.cards import get_cards
 
 # Налаштування логування для цього модуля
 logger = logging.getLogger(__name__)
 
 # Створюємо асинхронний рушій БД
-engine = create_async_engine(DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), echo=True)
+engine = create_async_engine(DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"), echo=DB_ECHO)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
-async def create_tables():
-    """Створення таблиць в базі даних"""
+# Розмір пакета при заповненні нових колонок для існуючих рядків
+MIGRATION_BATCH_SIZE = 5000
+# Анкет за одну транзакцію перенесення в архів
+ARCHIVE_BATCH_SIZE = 500
+
+# Статуси анкет, що залишаються в гарячій таблиці applications
+ACTIVE_STATUSES = ('pending', 'approved')
+# Статуси анкет, що переносяться в applications_archive
+ARCHIVED_STATUSES = ('rejected', 'deleted', 'expired')
+
+# Рядків за один запит при експорті
+EXPORT_BATCH_SIZE = 1000
+
+# Збільшити при зміні міграцій даних, які не змінюють самих моделей
+SCHEMA_REVISION = 1
+
+# Користувачів у кеші останньої анкети
+LATEST_CACHE_SIZE = 10000
+
+# Колонки, що переносяться в applications_archive
+_ARCHIVE_COLUMNS = ('riot_id', 'age', 'rank', 'role', 'agents', 'server', 'bio', 'contact_info',
+                    'moderator_id', 'created_at')
+
+
+def normalize_riot_id(riot_id: str) -> str:
+    """Нормалізація Riot ID для порівняння: casefold та згортання пробілів"""
+    collapsed = " ".join(riot_id.split())
+    return re.sub(r"\s*#\s*", "#", collapsed).casefold()
+
+
+def _migrate_schema(conn) -> None:
+    """Додавання нових колонок та індексів до вже існуючих таблиць"""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Міграція: додано колонку {table.name}.{column.name}")
+
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+    _backfill_riot_id_norm(conn)
+    _backfill_version(conn)
+    _fix_moderator_ids(conn)
+    _archive_inactive(conn)
+
+
+def _backfill_riot_id_norm(conn) -> None:
+    """Заповнення riot_id_norm для анкет, створених до появи колонки"""
+    while True:
+        rows = conn.execute(
+            select(Application.id, Application.riot_id)
+            .where(Application.riot_id_norm.is_(None))
+            .limit(MIGRATION_BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        conn.execute(
+            # updated_at зберігаємо явно, інакше onupdate скине вік анкети
+            update(Application.__table__).where(Application.id == bindparam("row_id"))
+            .values(riot_id_norm=bindparam("norm"), updated_at=Application.__table__.c.updated_at),
+            [{"row_id": row.id, "norm": normalize_riot_id(row.riot_id)} for row in rows]
+        )
+
+
+def _backfill_version(conn) -> None:
+    """Початкова версія для анкет, створених до появи колонки version"""
+    applications = Application.__table__
+    conn.execute(
+        update(applications).where(applications.c.version.is_(None))
+        .values(version=0, updated_at=applications.c.updated_at)
+    )
+
+
+def _fix_moderator_ids(conn) -> None:
+    """Заміна telegram_id, що раніше записувався в moderator_id, на users.id"""
+    applications = Application.__table__
+    moderator = select(User.id).where(User.telegram_id == applications.c.moderator_id)
+    result = conn.execute(
+        update(applications)
+        .where(
+            applications.c.moderator_id.is_not(None) &
+            ~exists().where(User.id == applications.c.moderator_id) &
+            exists(moderator)
+        )
+        .values(moderator_id=moderator.scalar_subquery(), updated_at=applications.c.updated_at)
+    )
+    if result.rowcount:
+        logger.info(f"Міграція: виправлено moderator_id у {result.rowcount} анкетах")
+
+
+def _archive_statement(condition, status: Optional[str] = None, moderator_id: Optional[int] = None):
+    """INSERT ... SELECT анкет, що відповідають condition, в архів (status=None - зберегти поточний)"""
+    source = Application.__table__.c
+    overrides = {} if moderator_id is None else {'moderator_id': literal(moderator_id, Integer)}
+    columns = [overrides.get(name, source[name]) for name in _ARCHIVE_COLUMNS]
+    return insert(ArchivedApplication).from_select(
+        ['application_id', 'user_id', 'status', *_ARCHIVE_COLUMNS, 'archived_at'],
+        select(
+            source.id, source.user_id, source.status if status is None else literal(status),
+            *columns, literal(datetime.now(timezone.utc), ArchivedApplication.archived_at.type)
+        ).where(condition)
+    )
+
+
+def _archive_inactive(conn) -> None:
+    """Перенесення в архів неактивних анкет, що залишились з часів до появи архіву"""
+    moved = 0
+    while True:
+        ids = conn.execute(
+            select(Application.id)
+            .where(Application.status.not_in(ACTIVE_STATUSES))
+            .limit(MIGRATION_BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+        condition = Application.id.in_(ids)
+        conn.execute(_archive_statement(condition))
+        conn.execute(delete(Application.__table__).where(condition))
+        moved += len(ids)
+
+    if moved:
+        logger.info(f"Міграція: {moved} неактивних анкет перенесено в архів")
+
+
+async def _enable_incremental_vacuum() -> None:
+    """Увімкнення auto_vacuum=INCREMENTAL (для існуючої БД потребує одноразового VACUUM)"""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        mode = (await conn.execute(text("PRAGMA auto_vacuum"))).scalar()
+        if mode != 2:
+            await conn.execute(text("PRAGMA auto_vacuum=INCREMENTAL"))
+            await conn.execute(text("VACUUM"))
+            logger.info("Міграція: увімкнено інкрементальний VACUUM")
+
+
+async def incremental_vacuum(pages: int) -> int:
+    """Повернення не більше pages вільних сторінок файлу БД; повертає кількість звільнених"""
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        before = (await conn.execute(text("PRAGMA freelist_count"))).scalar()
+        # Прагма звільняє по сторінці на кожен крок, а execute робить лише один крок;
+        # executescript виконує її до кінця
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+        after = (await conn.execute(text("PRAGMA freelist_count"))).scalar()
+        return before - after
+
+
+def schema_version() -> int:
+    """Відбиток схеми (моделі, FTS, назви серверів) для PRAGMA user_version"""
+    parts = [str(SCHEMA_REVISION), FTS_TABLE_DDL, ARCHIVE_FTS_TABLE_DDL, *FTS_TRIGGERS_DDL, json.dumps(REGIONS, ensure_ascii=False)]
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{column.name} {column.type}" for column in table.columns)
+        parts.extend(sorted(f"{index.name} {','.join(column.name for column in index.columns)}"
+                            for index in table.indexes))
+    digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=4).digest()
+    # user_version - знакове 32-бітне число, 0 означає "ще не перевірялась"
+    return int.from_bytes(digest, "big") & 0x7FFFFFFF or 1
+
+
+async def create_tables() -> bool:
+    """Створення таблиць та міграції. Повертає False, якщо схема БД вже актуальна"""
+    version = schema_version()
+    # Звичайний перезапуск: одне читання заголовка БД замість інспекції всіх таблиць
+    async with engine.connect() as conn:
+        if (await conn.execute(text("PRAGMA user_version"))).scalar() == version:
+            return False
+
+    await _enable_incremental_vacuum()
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_migrate_schema)
+        await conn.run_sync(setup_search)
+        await conn.run_sync(setup_stats)
+        # Записується в тій самій транзакції: перервана міграція повториться при наступному запуску
+        await conn.execute(text(f"PRAGMA user_version = {version}"))
+    return True
+
+
+async def _bump_counters(session: AsyncSession, deltas: Counter) -> None:
+    """Оновлення лічильників статистики в поточній транзакції"""
+    statement, rows = bump_statement(deltas)
+    if rows:
+        await session.execute(statement, rows)
 
 
 async def add_user(telegram_id: int, username: str = None) -> User:
-    """Додавання нового користувача"""
+    """Додавання користувача або оновлення існуючого одним запитом (INSERT ... ON CONFLICT DO UPDATE)"""
+    statement = sqlite_insert(User).values(telegram_id=telegram_id, username=username)
+    statement = statement.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            # None - username невідомий (виклик без нього), тому збережений не затираємо
+            'username': func.coalesce(statement.excluded.username, User.username),
+            # Користувач знову написав боту - отже розблокував його
+            'is_blocked': False,
+        }
+    ).returning(User)
     async with AsyncSessionLocal() as session:
-        # Перевіряємо чи існує користувач
-        result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-        user = result.scalar_one_or_none()
+        result = await session.execute(statement, execution_options={"populate_existing": True})
+        user = result.scalar_one()
+        await session.commit()
+        return user
 
-        if not user:
-            user = User(telegram_id=telegram_id, username=username)
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
 
-        return user
+async def update_usernames(usernames: dict) -> int:
+    """Пакетне оновлення username ({telegram_id: username}) лише для вже зареєстрованих користувачів.
+
+    Рядки без змін не перезаписуються. Повертає кількість фактично змінених рядків."""
+    if not usernames:
+        return 0
+    users = User.__table__
+    statement = (
+        update(users)
+        .where(users.c.telegram_id == bindparam("user_telegram_id"))
+        .where(users.c.username.is_distinct_from(bindparam("new_username")))
+        .values(username=bindparam("new_username"))
+    )
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(statement, [
+            {"user_telegram_id": telegram_id, "new_username": username}
+            for telegram_id, username in usernames.items()
+        ])
+        await session.commit()
+    return result.rowcount
+
+
+class LatestApplication:
+    """Зведення останньої анкети користувача для кешу"""
+
+    __slots__ = ('id', 'user_id', 'status', 'channel_message_id', '_application', '_cards')
+
+    def __init__(self, application: Application):
+        self.id = application.id
+        self.user_id = application.user_id
+        self.status = application.status
+        self.channel_message_id = application.channel_message_id
+        # Вміст анкети після створення не змінюється, тому картка рендериться один раз на мову
+        self._application = application
+        self._cards = {}
+
+    def card(self, locale: Optional[str] = None) -> str:
+        """Картка анкети (як у каналі) мовою locale"""
+        card = self._cards.get(locale)
+        if card is None:
+            card = self._cards[locale] = get_cards(locale).channel_card(self._application)
+        return card
+
+
+# telegram_id -> (users.id, остання анкета або None, якщо активної анкети немає)
+_latest_applications: dict = {}
+# users.id -> telegram_id: зміни анкет знають лише users.id власника
+_latest_owners: dict = {}
+# Лічильник змін: результат запиту, під час якого анкети змінювались, в кеш не потрапляє
+_latest_generation = 0
+
+
+def _remember_latest(telegram_id: int, user_id: int, latest: Optional[LatestApplication]) -> None:
+    if len(_latest_applications) >= LATEST_CACHE_SIZE:
+        # Витісняємо найстаріший запис (словник зберігає порядок вставки)
+        evicted, (evicted_user_id, _) = next(iter(_latest_applications.items()))
+        del _latest_applications[evicted]
+        _latest_owners.pop(evicted_user_id, None)
+    _latest_applications[telegram_id] = (user_id, latest)
+    _latest_owners[user_id] = telegram_id
+
+
+def _update_latest(user_id: int, application_id: Optional[int] = None, **values) -> None:
+    """Запис зміни анкети в кеш: оновлення полів закешованої анкети або (без values) видалення запису"""
+    global _latest_generation
+    _latest_generation += 1
+    telegram_id = _latest_owners.get(user_id)
+    if telegram_id is None:
+        return
+    _, latest = _latest_applications[telegram_id]
+    if values and latest is not None and latest.id == application_id:
+        for name, value in values.items():
+            setattr(latest, name, value)
+    else:
+        del _latest_owners[user_id]
+        del _latest_applications[telegram_id]
+
+
+def _store_latest(application: Application) -> None:
+    """Нова анкета стає останньою анкетою свого власника"""
+    global _latest_generation
+    _latest_generation += 1
+    telegram_id = _latest_owners.get(application.user_id)
+    if telegram_id is not None:
+        _latest_applications[telegram_id] = (application.user_id, LatestApplication(application))
 
 
 async def create_application(user_id: int, riot_id: str, age: int, rank: str,
@@ -58,6 +343,7 @@ async def create_application(user_id: int, riot_id: str, age: int, rank: str,
         application = Application(
             user_id=user_id,
             riot_id=riot_id,
+            riot_id_norm=normalize_riot_id(riot_id),
             age=age,
             rank=rank,
             role=role,
@@ -69,32 +355,40 @@ async def create_application(user_id: int, riot_id: str, age: int, rank: str,
         )
 
         session.add(application)
+        deltas = application_deltas(rank, role, application.server, 1)
+        deltas[(STATUS, "created")] += 1
+        await _bump_counters(session, deltas)
         await session.commit()
         await session.refresh(application)
-        return application
 
+    _store_latest(application)
+    return application
 
-async def get_user_applications(telegram_id: int) -> list:
-    """Отримання анкет користувача по telegram_id"""
-    async with AsyncSessionLocal() as session:
-        # Спочатку знаходимо user_id по telegram_id
-        user_result = await session.execute(select(User).where(User.telegram_id == telegram_id))
-        user = user_result.scalar_one_or_none()
 
-        if not user:
-            return []
+async def get_latest_application(telegram_id: int) -> Optional[LatestApplication]:
+    """Остання анкета користувача по telegram_id (з кешу або одним запитом)"""
+    cached = _latest_applications.get(telegram_id)
+    if cached is not None:
+        return cached[1]
 
+    generation = _latest_generation
+    async with AsyncSessionLocal() as session:
         result = await session.execute(
-            select(Application).where(Application.user_id == user.id).order_by(Application.created_at.desc())
+            select(User.id, Application)
+            .outerjoin(Application, Application.user_id == User.id)
+            .where(User.telegram_id == telegram_id)
+            .order_by(Application.created_at.desc())
+            .limit(1)
         )
-        applications = result.scalars().all()
-
-        # Приводимо всі дати к UTC для консистентности
-        for app in applications:
-            if app.created_at.tzinfo is None:
-                app.created_at = app.created_at.replace(tzinfo=timezone.utc)
+        row = result.one_or_none()
 
-        return applications
+    if row is None:
+        # Користувача ще немає - нічого не кешуємо, його анкету створять вже після add_user
+        return None
+    latest = LatestApplication(row.Application) if row.Application is not None else None
+    if generation == _latest_generation:
+        _remember_latest(telegram_id, row.id, latest)
+    return latest
 
 
 async def get_pending_applications() -> list:
@@ -113,51 +407,281 @@ async def get_pending_applications() -> list:
         return applications
 
 
-async def update_application_status(application_id: int, status: str, moderator_id: int = None) -> bool:
-    """Оновлення статусу анкети"""
+async def update_application_status(application_id: int, status: str, moderator_id: int = None,
+                                    expected_version: Optional[int] = None) -> bool:
+    """Рішення щодо анкети на модерації (moderator_id - users.id модератора).
+
+    Оновлення умовне: False, якщо анкета вже не на модерації (її опрацював інший модератор
+    або це повторне натискання) чи її версія відрізняється від expected_version"""
+    condition = (Application.id == application_id) & (Application.status == 'pending')
+    if expected_version is not None:
+        condition &= Application.version == expected_version
+
+    now = datetime.now(timezone.utc)
     async with AsyncSessionLocal() as session:
-        result = await session.execute(select(Application).where(Application.id == application_id))
-        application = result.scalar_one_or_none()
+        result = await session.execute(
+            update(Application)
+            .where(condition)
+            .values(status=status, moderator_id=moderator_id, updated_at=now, version=Application.version + 1,
+                    claimed_by=None, claim_expires_at=None)
+            .returning(Application.created_at, Application.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one_or_none()
+        if row is None:
+            return False
 
-        if application:
-            application.status = status
-            application.moderator_id = moderator_id
-            application.updated_at = datetime.now(timezone.utc)
-            await session.commit()
-            return True
-        return False
+        await _bump_counters(session, Counter({
+            (STATUS, status): 1,
+            (LATENCY, latency_bucket(moderation_latency(row.created_at, now))): 1,
+        }))
+        await session.commit()
 
-async def update_application_channel_message(application_id: int, channel_message_id: int) -> bool:
+    _update_latest(row.user_id, application_id, status=status)
+    return True
+
+async def update_application_channel_message(application_id: int, channel_message_id: int,
+                                             content_hash: Optional[str] = None) -> bool:
     """Оновлення ID повідомлення в каналі"""
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(Application).where(Application.id == application_id))
         application = result.scalar_one_or_none()
 
-        if application:
-            application.channel_message_id = channel_message_id
+        if not application:
+            return False
+        application.channel_message_id = channel_message_id
+        application.channel_content_hash = content_hash
+        await session.commit()
+
+    _update_latest(application.user_id, application_id, channel_message_id=channel_message_id)
+    return True
+
+async def set_moderation_message(application_id: int, message_id: int) -> None:
+    """ID картки анкети в чаті модераторів"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Application)
+            .where(Application.id == application_id)
+            .values(moderation_message_id=message_id, updated_at=Application.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def claim_application(application_id: int, moderator_id: int, expires_at: datetime) -> bool:
+    """Оренда анкети на модерації модератором (users.id) до expires_at.
+
+    Вдається, якщо анкета ще на модерації та вільна, її оренда минула або вона вже у цього модератора"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Application)
+            .where(
+                (Application.id == application_id) &
+                (Application.status == 'pending') &
+                (Application.claimed_by.is_(None) |
+                 (Application.claimed_by == moderator_id) |
+                 (Application.claim_expires_at <= datetime.now(timezone.utc)))
+            )
+            .values(claimed_by=moderator_id, claim_expires_at=expires_at, updated_at=Application.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def release_expired_claims(now: datetime) -> list:
+    """Повернення в чергу анкет з минулою орендою: рядки (id, created_at, moderation_message_id)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Application)
+            .where((Application.status == 'pending') & (Application.claim_expires_at <= now))
+            .values(claimed_by=None, claim_expires_at=None, updated_at=Application.updated_at)
+            .returning(Application.id, Application.created_at, Application.moderation_message_id)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await session.commit()
+        return rows
+
+
+async def queue_publication(application_id: int) -> None:
+    """Постановка схваленої анкети в чергу дайджесту"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Application)
+            .where(Application.id == application_id)
+            .values(publish_queued_at=datetime.now(timezone.utc), updated_at=Application.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def count_queued_publications() -> int:
+    """Кількість анкет у черзі дайджесту"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count()).select_from(Application)
+            .where((Application.status == 'approved') & Application.publish_queued_at.is_not(None))
+        )
+        return result.scalar()
+
+
+async def get_queued_publications(limit: int) -> list:
+    """Анкети черги дайджесту в порядку схвалення"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application)
+            .where((Application.status == 'approved') & Application.publish_queued_at.is_not(None))
+            .order_by(Application.publish_queued_at, Application.id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+
+async def mark_published(application_ids: list, channel_message_id: int, content_hash: str) -> None:
+    """Запис повідомлення дайджесту, в якому опубліковано анкети"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Application)
+            .where(Application.id.in_(application_ids))
+            .values(channel_message_id=channel_message_id, channel_content_hash=content_hash,
+                    publish_queued_at=None, updated_at=Application.updated_at)
+            .returning(Application.id, Application.user_id)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await session.commit()
+
+    for row in rows:
+        _update_latest(row.user_id, row.id, channel_message_id=channel_message_id)
+
+
+async def set_channel_content_hash(application_ids: list, content_hash: str) -> None:
+    """Хеш нового тексту поста після його редагування"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Application)
+            .where(Application.id.in_(application_ids))
+            .values(channel_content_hash=content_hash, updated_at=Application.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def count_channel_messages() -> int:
+    """Кількість постів у каналі з опублікованими анкетами"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(func.count(Application.channel_message_id.distinct()))
+            .where(Application.status == 'approved')
+        )
+        return result.scalar()
+
+
+async def get_channel_message_ids(after: int, limit: int) -> list:
+    """ID постів з опублікованими анкетами, більші за after (сторінка для обходу каналу)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application.channel_message_id)
+            .where((Application.status == 'approved') & (Application.channel_message_id > after))
+            .group_by(Application.channel_message_id)
+            .order_by(Application.channel_message_id)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+
+async def get_channel_entries(channel_message_ids: list, exclude_ids: list) -> dict:
+    """Опубліковані анкети в повідомленнях каналу, крім exclude_ids: {ID повідомлення: [анкети]}"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application)
+            .where(
+                Application.channel_message_id.in_(channel_message_ids) &
+                (Application.status == 'approved') &
+                Application.id.not_in(exclude_ids)
+            )
+            .order_by(Application.id)
+        )
+        entries = {}
+        for application in result.scalars():
+            entries.setdefault(application.channel_message_id, []).append(application)
+        return entries
+
+
+async def archive_applications(application_ids: list, status: str, only_status: Optional[str] = None,
+                               moderator_id: Optional[int] = None, reasons: Optional[list] = None,
+                               auto: bool = False) -> int:
+    """Перенесення анкет в архів пакетами: INSERT ... SELECT та DELETE в одній транзакції на пакет.
+
+    auto - відхилення автоперевіркою: рахується окремо, без часу модерації та причин модераторів"""
+    source = Application.__table__.c
+    moved = 0
+    async with AsyncSessionLocal() as session:
+        for start in range(0, len(application_ids), ARCHIVE_BATCH_SIZE):
+            condition = Application.id.in_(application_ids[start:start + ARCHIVE_BATCH_SIZE])
+            if only_status is not None:
+                condition &= Application.status == only_status
+
+            await session.execute(_archive_statement(condition, status, moderator_id))
+            result = await session.execute(
+                delete(Application.__table__).where(condition)
+                .returning(source.user_id, source.status, source.rank, source.role, source.server,
+                           source.created_at)
+            )
+            rows = result.all()
+
+            now = datetime.now(timezone.utc)
+            deltas = Counter()
+            for row in rows:
+                deltas.update(application_deltas(row.rank, row.role, row.server, -1))
+                if auto:
+                    deltas[(STATUS, 'auto_rejected')] += 1
+                    continue
+                deltas[(STATUS, status)] += 1
+                if status == 'rejected' and row.status == 'pending':
+                    deltas[(LATENCY, latency_bucket(moderation_latency(row.created_at, now)))] += 1
+                for reason in reasons or []:
+                    deltas[(REASON, reason_code(reason))] += 1
+            await _bump_counters(session, deltas)
+
             await session.commit()
+            for row in rows:
+                _update_latest(row.user_id)
+            moved += len(rows)
+    return moved
+
+
+async def delete_application(application_id: int, status: str = 'deleted', moderator_id: Optional[int] = None,
+                             reasons: Optional[list] = None, only_status: Optional[str] = None,
+                             auto: bool = False) -> bool:
+    """Прибирання анкети з гарячої таблиці в архів зі статусом status (deleted або rejected).
+
+    only_status - переносити лише анкету з таким поточним статусом (відхилення - лише з модерації);
+    auto - відхилення автоперевіркою, не враховується в статистиці модераторів"""
+    try:
+        if await archive_applications([application_id], status, only_status=only_status,
+                                      moderator_id=moderator_id, reasons=reasons, auto=auto):
+            logger.info(f"Анкета #{application_id} перенесена в архів зі статусом {status}")
             return True
+        logger.warning(f"Анкету #{application_id} не перенесено в архів: її немає або статус вже змінено")
+        return False
+    except Exception as e:
+        logger.error(f"Помилка при видаленні анкети #{application_id}: {e}")
         return False
 
-async def delete_application(application_id: int) -> bool:
-    """Повне видалення анкети з бази даних"""
-    async with AsyncSessionLocal() as session:
-        try:
-            result = await session.execute(select(Application).where(Application.id == application_id))
-            application = result.scalar_one_or_none()
 
-            if application:
-                await session.delete(application)
-                await session.commit()
-                logger.info(f"Анкета #{application_id} повністю видалена з бази даних")
-                return True
-            else:
-                logger.warning(f"Спроба видалити неіснуючу анкету #{application_id}")
-                return False
-        except Exception as e:
-            logger.error(f"Помилка при видаленні анкети #{application_id}: {e}")
-            await session.rollback()
-            return False
+async def get_latest_archived_application(telegram_id: int) -> Optional[ArchivedApplication]:
+    """Остання архівна анкета користувача (для пояснення, чому активної анкети немає)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(ArchivedApplication)
+            .join(User, User.id == ArchivedApplication.user_id)
+            .where(User.telegram_id == telegram_id)
+            .order_by(ArchivedApplication.archived_at.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
 
 
 async def get_application_by_id(application_id: int) -> Application:
@@ -193,6 +717,23 @@ async def get_user_by_username(username: str) -> User:
         return result.scalar_one_or_none()
 
 
+async def get_user_locale(telegram_id: int) -> Optional[str]:
+    """Мова карток, обрана користувачем"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(User.locale).where(User.telegram_id == telegram_id))
+        return result.scalar_one_or_none()
+
+
+async def set_user_locale(telegram_id: int, locale: str) -> bool:
+    """Збереження мови карток користувача"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(User).where(User.telegram_id == telegram_id).values(locale=locale)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
 async def set_moderator_status(user_id: int, is_moderator: bool) -> bool:
     """Встановлення статусу модератора"""
     async with AsyncSessionLocal() as session:
@@ -210,4 +751,372 @@ async def get_all_moderators() -> list:
     """Отримання всіх модераторів"""
     async with AsyncSessionLocal() as session:
         result = await session.execute(select(User).where(User.is_moderator == True))
-        return result.scalars().all()
\ No newline at end of file
+        return result.scalars().all()
+
+
+async def find_riot_id_duplicate(riot_id: str, telegram_id: int) -> Optional[Application]:
+    """Активна анкета з тим самим Riot ID від іншого Telegram акаунта"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application)
+            .join(User, User.id == Application.user_id)
+            .where(
+                (Application.riot_id_norm == normalize_riot_id(riot_id)) &
+                (Application.status.in_(['pending', 'approved'])) &
+                (User.telegram_id != telegram_id)
+            )
+            # 'approved' < 'pending': спочатку показуємо вже опубліковану анкету
+            .order_by(Application.status)
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+
+
+async def get_applications_to_warn(cutoff: datetime, limit: int) -> list:
+    """Опубліковані анкети, старші за cutoff, власників яких ще не попереджено"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application.id, User.telegram_id)
+            .join(User, User.id == Application.user_id)
+            .where(
+                (Application.status == 'approved') &
+                (Application.updated_at < cutoff) &
+                (Application.expiry_warned_at.is_(None))
+            )
+            .order_by(Application.updated_at)
+            .limit(limit)
+        )
+        return result.all()
+
+
+async def mark_expiry_warned(application_ids: list) -> None:
+    """Позначка, що власників анкет попереджено про зняття з публікації"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Application)
+            .where(Application.id.in_(application_ids))
+            # Попередження не продовжує публікацію: updated_at не змінюємо
+            .values(expiry_warned_at=datetime.now(timezone.utc), updated_at=Application.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def get_expired_applications(cutoff: datetime, warned_before: Optional[datetime], limit: int) -> list:
+    """Опубліковані анкети, старші за cutoff (і попереджені не пізніше warned_before)"""
+    condition = (Application.status == 'approved') & (Application.updated_at < cutoff)
+    if warned_before is not None:
+        condition &= Application.expiry_warned_at <= warned_before
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Application.id, Application.channel_message_id, User.telegram_id)
+            .join(User, User.id == Application.user_id)
+            .where(condition)
+            .order_by(Application.updated_at)
+            .limit(limit)
+        )
+        return result.all()
+
+
+async def expire_applications(application_ids: list) -> int:
+    """Зняття анкет з публікації: перенесення в архів зі статусом expired"""
+    return await archive_applications(application_ids, 'expired', only_status='approved')
+
+
+async def extend_application(application_id: int, telegram_id: int) -> bool:
+    """Продовження публікації анкети її власником"""
+    async with AsyncSessionLocal() as session:
+        owner_id = select(User.id).where(User.telegram_id == telegram_id).scalar_subquery()
+        result = await session.execute(
+            update(Application)
+            .where(
+                (Application.id == application_id) &
+                (Application.user_id == owner_id) &
+                (Application.status == 'approved')
+            )
+            .values(updated_at=datetime.now(timezone.utc), expiry_warned_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def search_applications(query: str, statuses: Optional[list] = None,
+                              limit: int = 5, offset: int = 0) -> tuple:
+    """Повнотекстовий пошук анкет: активні, потім архівні, кожні за релевантністю.
+
+    Архівні анкети повертаються як ArchivedApplication. Повертає (анкети сторінки, чи є наступна сторінка)."""
+    match_query = build_match_query(query)
+    if not match_query:
+        return [], False
+
+    params = {"query": match_query, "limit": limit + 1, "offset": offset}
+    parts = []
+    for sql, alias, source_statuses in ((SEARCH_ACTIVE_SQL, "a", ACTIVE_STATUSES),
+                                        (SEARCH_ARCHIVE_SQL, "r", ARCHIVED_STATUSES)):
+        wanted = [status for status in source_statuses if not statuses or status in statuses]
+        if not wanted:
+            continue
+        status_filter = ""
+        if statuses:
+            placeholders = ", ".join(f":{alias}_status_{i}" for i in range(len(wanted)))
+            status_filter = f"AND {alias}.status IN ({placeholders})"
+            params.update({f"{alias}_status_{i}": status for i, status in enumerate(wanted)})
+        parts.append(sql.format(status_filter=status_filter))
+    if not parts:
+        return [], False
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text(SEARCH_SQL.format(parts=" UNION ALL ".join(parts))), params)
+        keys = [(bool(row.archived), row.id) for row in result]
+        has_more = len(keys) > limit
+        keys = keys[:limit]
+        if not keys:
+            return [], False
+
+        found = {}
+        for archived, model in ((False, Application), (True, ArchivedApplication)):
+            ids = [row_id for is_archived, row_id in keys if is_archived == archived]
+            if ids:
+                result = await session.execute(select(model).where(model.id.in_(ids)))
+                found.update({(archived, row.id): row for row in result.scalars()})
+        return [found[key] for key in keys if key in found], has_more
+
+
+async def stream_applications(statuses: Optional[list] = None, since: Optional[datetime] = None,
+                              until: Optional[datetime] = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """Анкети (активні, потім архів) для експорту, по одній, сторінками за ID.
+
+    Кожна сторінка читається окремою короткою транзакцією, тому довгий експорт
+    не тримає блокування БД і в пам'яті одночасно лише batch_size рядків."""
+    sources = (
+        (Application, Application.id, Application.updated_at, ACTIVE_STATUSES),
+        (ArchivedApplication, ArchivedApplication.application_id, ArchivedApplication.archived_at,
+         ARCHIVED_STATUSES),
+    )
+    for model, application_id, updated_at, source_statuses in sources:
+        wanted = [status for status in source_statuses if not statuses or status in statuses]
+        if not wanted:
+            continue
+
+        condition = model.status.in_(wanted)
+        if since is not None:
+            condition &= model.created_at >= since
+        if until is not None:
+            condition &= model.created_at < until
+
+        statement = (
+            select(application_id.label("id"), model.status, User.telegram_id, User.username,
+                   model.riot_id, model.age, model.rank, model.role, model.agents, model.server,
+                   model.bio, model.contact_info, model.created_at, updated_at.label("updated_at"),
+                   model.id.label("cursor"))
+            .join(User, User.id == model.user_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        )
+        last_id = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(statement.where(condition & (model.id > last_id)))
+                rows = result.all()
+            for row in rows:
+                yield row
+            if len(rows) < batch_size:
+                break
+            last_id = rows[-1].cursor
+
+
+async def add_job(name: str, payload: dict, run_at: datetime, key: Optional[str] = None,
+                  interval: Optional[int] = None, max_retries: int = 5) -> Job:
+    """Збереження завдання планувальника (для вже існуючого key повертає наявне, невдале - перезапускає)"""
+    async with AsyncSessionLocal() as session:
+        if key is not None:
+            result = await session.execute(select(Job).where(Job.key == key))
+            existing = result.scalar_one_or_none()
+            if existing and existing.failed_at is None:
+                return existing
+            if existing:
+                # Завдання вичерпало спроби - ключ знову вільний, запускаємо з новими даними
+                existing.name = name
+                existing.payload = json.dumps(payload)
+                existing.run_at = run_at
+                existing.interval = interval
+                existing.max_retries = max_retries
+                existing.attempts = 0
+                existing.last_error = None
+                existing.failed_at = None
+                await session.commit()
+                return existing
+
+        job = Job(
+            name=name,
+            key=key,
+            payload=json.dumps(payload),
+            run_at=run_at,
+            interval=interval,
+            max_retries=max_retries
+        )
+        session.add(job)
+        await session.commit()
+        return job
+
+
+async def get_pending_jobs() -> list:
+    """Всі завдання, які ще мають виконатися"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job).where(Job.failed_at.is_(None)).order_by(Job.run_at))
+        return result.scalars().all()
+
+
+async def get_job_by_key(key: str) -> Optional[Job]:
+    """Незавершене завдання за ключем (None, якщо його немає або воно вичерпало спроби)"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job).where(Job.key == key, Job.failed_at.is_(None)))
+        return result.scalar_one_or_none()
+
+
+async def get_jobs(limit: int = 20) -> list:
+    """Найближчі та невдалі завдання для перегляду власником"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job).order_by(Job.failed_at.is_(None), Job.run_at).limit(limit))
+        return result.scalars().all()
+
+
+async def update_job(job_id: int, **values) -> None:
+    """Оновлення стану завдання (наступний запуск, спроби, помилка)"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(Job).where(Job.id == job_id).values(**values))
+        await session.commit()
+
+
+async def delete_job(job_id: int) -> None:
+    """Видалення виконаного завдання"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Job).where(Job.id == job_id))
+        await session.commit()
+
+
+async def delete_job_by_key(key: str) -> Optional[int]:
+    """Скасування завдання за ключем; повертає ID видаленого завдання"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(Job.id).where(Job.key == key))
+        job_id = result.scalar_one_or_none()
+        if job_id is not None:
+            await session.execute(delete(Job).where(Job.id == job_id))
+            await session.commit()
+        return job_id
+
+
+async def add_moderation_events(events: list) -> None:
+    """Пакетний запис подій журналу модерації одним executemany"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(insert(ModerationEvent), events)
+        await session.commit()
+
+
+async def create_broadcast(text: str, chat_id: int) -> Broadcast:
+    """Чернетка розсилки (запускається після підтвердження власником)"""
+    async with AsyncSessionLocal() as session:
+        broadcast = Broadcast(text=text, chat_id=chat_id)
+        session.add(broadcast)
+        await session.commit()
+        return broadcast
+
+
+async def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    """Розсилка за ID"""
+    async with AsyncSessionLocal() as session:
+        return await session.get(Broadcast, broadcast_id)
+
+
+async def start_broadcast(broadcast_id: int, message_id: int) -> bool:
+    """Запуск чернетки; False, якщо її вже запущено або скасовано (повторне натискання)"""
+    async with AsyncSessionLocal() as session:
+        total = select(func.count()).select_from(User).where(User.is_blocked.is_not(True)).scalar_subquery()
+        result = await session.execute(
+            update(Broadcast)
+            .where((Broadcast.id == broadcast_id) & (Broadcast.status == 'draft'))
+            .values(status='running', message_id=message_id, total=total)
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def cancel_broadcast(broadcast_id: int) -> bool:
+    """Скасування чернетки або зупинка розсилки, що виконується"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Broadcast)
+            .where((Broadcast.id == broadcast_id) & Broadcast.status.in_(['draft', 'running']))
+            .values(status='cancelled', finished_at=datetime.now(timezone.utc))
+        )
+        await session.commit()
+        return result.rowcount > 0
+
+
+async def get_broadcast_recipients(after: int, limit: int) -> list:
+    """Наступна сторінка отримувачів (keyset за users.id), без тих, хто заблокував бота"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(User.id, User.telegram_id)
+            .where((User.id > after) & User.is_blocked.is_not(True))
+            .order_by(User.id)
+            .limit(limit)
+        )
+        return result.all()
+
+
+async def record_broadcast_deliveries(broadcast_id: int, deliveries: list, cursor: int) -> None:
+    """Результати пакета доставок, лічильники та курсор однією транзакцією.
+
+    deliveries - пари (users.id, статус: sent, blocked або failed)"""
+    counts = Counter(status for _, status in deliveries)
+    blocked_ids = [user_id for user_id, status in deliveries if status == 'blocked']
+    async with AsyncSessionLocal() as session:
+        if deliveries:
+            await session.execute(
+                sqlite_insert(BroadcastDelivery).on_conflict_do_nothing(),
+                [{"broadcast_id": broadcast_id, "user_id": user_id, "status": status}
+                 for user_id, status in deliveries]
+            )
+        if blocked_ids:
+            await session.execute(update(User).where(User.id.in_(blocked_ids)).values(is_blocked=True))
+        await session.execute(
+            update(Broadcast)
+            .where(Broadcast.id == broadcast_id)
+            .values(
+                cursor=cursor,
+                sent=Broadcast.sent + counts['sent'],
+                blocked=Broadcast.blocked + counts['blocked'],
+                failed=Broadcast.failed + counts['failed'],
+            )
+        )
+        await session.commit()
+
+
+async def finish_broadcast(broadcast_id: int) -> None:
+    """Позначка завершення розсилки (скасована залишається скасованою)"""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(Broadcast)
+            .where((Broadcast.id == broadcast_id) & (Broadcast.status == 'running'))
+            .values(status='done', finished_at=datetime.now(timezone.utc))
+        )
+        await session.commit()
+
+
+async def get_stats() -> dict:
+    """Всі лічильники статистики: {група: {ключ: значення}}"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(StatCounter.name, StatCounter.key, StatCounter.value))
+        stats = {}
+        for name, key, value in result:
+            stats.setdefault(name, {})[key] = value
+        return stats
+
+
+async def rebuild_statistics() -> None:
+    """Перерахунок лічильників статистики з таблиць"""
+    async with engine.begin() as conn:
+        await conn.run_sync(rebuild_stats)
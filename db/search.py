@@ -0,0 +1,112 @@
+# Повнотекстовий пошук анкет (SQLite FTS5)
+import logging
+import re
+from typing import Optional
+
+from sqlalchemy import text
+
+from config import REGIONS
+
+logger = logging.getLogger(__name__)
+
+# Назви серверів анкети через пробіл (server зберігається як JSON-масив кодів)
+_SERVERS_SQL = (
+    "(SELECT group_concat(name, ' ') FROM server_names "
+    "WHERE code IN (SELECT value FROM json_each({row}.server)))"
+)
+
+_FTS_COLUMNS = "riot_id, bio, contact_info, role, servers, tokenize = 'unicode61 remove_diacritics 2'"
+
+FTS_TABLE_DDL = f"CREATE VIRTUAL TABLE IF NOT EXISTS applications_fts USING fts5({_FTS_COLUMNS})"
+# Окремий індекс архіву: rowid - applications_archive.id, а не ID анкети
+ARCHIVE_FTS_TABLE_DDL = f"CREATE VIRTUAL TABLE IF NOT EXISTS applications_archive_fts USING fts5({_FTS_COLUMNS})"
+
+
+def _fts_insert(table: str) -> str:
+    return (
+        f"INSERT INTO {table}(rowid, riot_id, bio, contact_info, role, servers) "
+        f"VALUES (new.id, new.riot_id, new.bio, new.contact_info, new.role, {_SERVERS_SQL.format(row='new')});"
+    )
+
+
+# Тригери тримають індекси синхронними з applications та applications_archive; зміна статусу індекс не чіпає
+FTS_TRIGGERS_DDL = [
+    f"CREATE TRIGGER IF NOT EXISTS applications_fts_ai AFTER INSERT ON applications BEGIN "
+    f"{_fts_insert('applications_fts')} END",
+    "CREATE TRIGGER IF NOT EXISTS applications_fts_ad AFTER DELETE ON applications BEGIN "
+    "DELETE FROM applications_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS applications_fts_au "
+    "AFTER UPDATE OF riot_id, bio, contact_info, role, server ON applications BEGIN "
+    f"DELETE FROM applications_fts WHERE rowid = old.id; {_fts_insert('applications_fts')} END",
+    f"CREATE TRIGGER IF NOT EXISTS applications_archive_fts_ai AFTER INSERT ON applications_archive BEGIN "
+    f"{_fts_insert('applications_archive_fts')} END",
+    "CREATE TRIGGER IF NOT EXISTS applications_archive_fts_ad AFTER DELETE ON applications_archive BEGIN "
+    "DELETE FROM applications_archive_fts WHERE rowid = old.id; END",
+]
+
+# Ваги колонок для bm25: riot_id, bio, contact_info, role, servers
+_BM25_WEIGHTS = "10.0, 1.0, 5.0, 2.0, 2.0"
+
+# Частини пошуку: (0, applications.id) для активних анкет, (1, applications_archive.id) для архіву
+SEARCH_ACTIVE_SQL = (
+    f"SELECT 0 AS archived, a.id AS id, bm25(applications_fts, {_BM25_WEIGHTS}) AS score "
+    "FROM applications_fts JOIN applications a ON a.id = applications_fts.rowid "
+    "WHERE applications_fts MATCH :query {status_filter}"
+)
+SEARCH_ARCHIVE_SQL = (
+    f"SELECT 1 AS archived, r.id AS id, bm25(applications_archive_fts, {_BM25_WEIGHTS}) AS score "
+    "FROM applications_archive_fts JOIN applications_archive r ON r.id = applications_archive_fts.rowid "
+    "WHERE applications_archive_fts MATCH :query {status_filter}"
+)
+# bm25 двох різних індексів не порівнюється між собою: спершу активні анкети, потім архів
+SEARCH_SQL = "SELECT archived, id FROM ({parts}) ORDER BY archived, score LIMIT :limit OFFSET :offset"
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """Безпечний FTS5-запит: кожне слово як префікс у лапках, всі слова обов'язкові"""
+    tokens = re.findall(r"\w+", query.casefold())
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens[:10])
+
+
+def _sync_server_names(conn) -> bool:
+    """Оновлення таблиці server_names з config.REGIONS; True якщо назви змінилися"""
+    expected = {code: name for servers in REGIONS.values() for name, code in servers.items()}
+    current = dict(conn.execute(text("SELECT code, name FROM server_names")).all())
+    if current == expected:
+        return False
+
+    conn.execute(text("DELETE FROM server_names"))
+    conn.execute(
+        text("INSERT INTO server_names(code, name) VALUES (:code, :name)"),
+        [{"code": code, "name": name} for code, name in expected.items()]
+    )
+    return True
+
+
+def rebuild_search_index(conn) -> None:
+    """Повна перебудова FTS-індексів з таблиць applications та applications_archive"""
+    for fts_table, table in (("applications_fts", "applications"), ("applications_archive_fts", "applications_archive")):
+        conn.execute(text(f"DELETE FROM {fts_table}"))
+        conn.execute(text(
+            f"INSERT INTO {fts_table}(rowid, riot_id, bio, contact_info, role, servers) "
+            f"SELECT a.id, a.riot_id, a.bio, a.contact_info, a.role, {_SERVERS_SQL.format(row='a')} "
+            f"FROM {table} a"
+        ))
+    logger.info("FTS-індекси анкет перебудовано")
+
+
+def setup_search(conn) -> None:
+    """Створення FTS-таблиць та тригерів; перебудова індексів лише за потреби"""
+    existing = {row[0] for row in conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE name IN ('applications_fts', 'applications_archive_fts')"
+    ))}
+    conn.execute(text(FTS_TABLE_DDL))
+    conn.execute(text(ARCHIVE_FTS_TABLE_DDL))
+    for ddl in FTS_TRIGGERS_DDL:
+        conn.execute(text(ddl))
+
+    names_changed = _sync_server_names(conn)
+    if len(existing) < 2 or names_changed:
+        rebuild_search_index(conn)
@@ -0,0 +1,153 @@
+# Агреговані лічильники для /stats, що оновлюються разом зі змінами анкет
+#
+# Кожен лічильник - рядок (name, key, value) у stats_counters. Час до модерації
+# зберігається як гістограма з логарифмічними кошиками (ключ - номер кошика):
+# будь-який квантиль відновлюється з відносною похибкою не більше LATENCY_ACCURACY.
+import json
+import math
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.sqlite import insert
+
+from db.models import Application, ArchivedApplication, ModerationEvent, StatCounter
+from config import REJECTION_REASONS
+
+# Назви груп лічильників
+STATUS = "status"      # created, approved, rejected, auto_rejected, deleted, expired
+REASON = "reason"      # код з REJECTION_REASONS (лише рішення модераторів)
+RANK = "rank"          # активні анкети за рангом
+ROLE = "role"          # активні анкети за роллю
+SERVER = "server"      # активні анкети за кодом сервера
+LATENCY = "latency"    # кошики часу від подачі до рішення модератора
+
+# Події автоперевірки; до появи auto_reject вони писалися як reject без модератора
+AUTO_REJECT_EVENT = (ModerationEvent.action == "auto_reject") | \
+    ((ModerationEvent.action == "reject") & ModerationEvent.actor_id.is_(None))
+
+LATENCY_ACCURACY = 0.02
+_GAMMA = (1 + LATENCY_ACCURACY) / (1 - LATENCY_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+
+_REASON_CODES = {text: code for code, text in REJECTION_REASONS.items()}
+
+
+def latency_bucket(seconds: float) -> int:
+    """Номер логарифмічного кошика для тривалості в секундах"""
+    return math.ceil(math.log(max(seconds, 1.0)) / _LOG_GAMMA)
+
+
+def bucket_value(bucket: int) -> float:
+    """Представницьке значення кошика (відносна похибка <= LATENCY_ACCURACY)"""
+    return 2 * _GAMMA ** bucket / (_GAMMA + 1)
+
+
+def histogram_quantile(histogram: dict, q: float) -> float:
+    """Квантиль q з гістограми {номер кошика: кількість}"""
+    buckets = sorted((int(bucket), count) for bucket, count in histogram.items() if count > 0)
+    total = sum(count for _, count in buckets)
+    if not total:
+        return 0.0
+
+    rank = q * (total - 1)
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        if seen > rank:
+            return bucket_value(bucket)
+    return bucket_value(buckets[-1][0])
+
+
+def reason_code(reason: str) -> str:
+    """Код причини за її текстом (власні причини модераторів - custom)"""
+    return _REASON_CODES.get(reason, "custom")
+
+
+def moderation_latency(created_at: datetime, decided_at: datetime) -> float:
+    """Секунди від подачі анкети до рішення (SQLite повертає дати без часового поясу)"""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    if decided_at.tzinfo is None:
+        decided_at = decided_at.replace(tzinfo=timezone.utc)
+    return (decided_at - created_at).total_seconds()
+
+
+def application_deltas(rank: str, role: str, server: str, sign: int) -> Counter:
+    """Зміна лічильників розподілу активних анкет (sign=1 - додано, -1 - прибрано)"""
+    deltas = Counter({(RANK, rank): sign})
+    for role_name in role.split(", "):
+        deltas[(ROLE, role_name)] += sign
+    try:
+        servers = json.loads(server)
+    except (json.JSONDecodeError, TypeError):
+        servers = []
+    for code in servers:
+        deltas[(SERVER, code)] += sign
+    return deltas
+
+
+def bump_statement(deltas: Counter):
+    """Один upsert-запит (executemany) для всіх змінених лічильників"""
+    statement = insert(StatCounter)
+    statement = statement.on_conflict_do_update(
+        index_elements=[StatCounter.name, StatCounter.key],
+        set_={"value": StatCounter.value + statement.excluded.value}
+    )
+    rows = [{"name": name, "key": str(key), "value": value} for (name, key), value in deltas.items() if value]
+    return statement, rows
+
+
+def rebuild_stats(conn) -> None:
+    """Повний перерахунок лічильників з таблиць (для першого запуску та після імпорту)"""
+    deltas = Counter()
+
+    for row in conn.execute(select(Application.rank, Application.role, Application.server)):
+        deltas.update(application_deltas(row.rank, row.role, row.server, 1))
+
+    active = dict(conn.execute(select(Application.status, func.count()).group_by(Application.status)).all())
+    archived = dict(conn.execute(
+        select(ArchivedApplication.status, func.count()).group_by(ArchivedApplication.status)).all())
+    # Зняті з публікації та видалені після схвалення (мають модератора) колись були схвалені
+    approved_deleted = conn.execute(
+        select(func.count()).select_from(ArchivedApplication)
+        .where((ArchivedApplication.status == 'deleted') & ArchivedApplication.moderator_id.is_not(None))
+    ).scalar()
+
+    deltas[(STATUS, "created")] = sum(active.values()) + sum(archived.values())
+    deltas[(STATUS, "approved")] = active.get('approved', 0) + archived.get('expired', 0) + approved_deleted
+    for status in ("rejected", "deleted", "expired"):
+        deltas[(STATUS, status)] = archived.get(status, 0)
+    # Автоматичні відхилення - окремий лічильник, поза рівнем схвалення модераторів
+    auto_rejected = conn.execute(
+        select(func.count()).select_from(ModerationEvent).where(AUTO_REJECT_EVENT)
+    ).scalar()
+    deltas[(STATUS, "auto_rejected")] = auto_rejected
+    deltas[(STATUS, "rejected")] -= min(auto_rejected, deltas[(STATUS, "rejected")])
+
+    # Причини та час модерації відомі лише з журналу модерації (auto_reject в них не входить)
+    submitted_at = func.coalesce(Application.created_at, ArchivedApplication.created_at)
+    events = conn.execute(
+        select(ModerationEvent.action, ModerationEvent.reasons, ModerationEvent.created_at,
+               submitted_at.label("submitted_at"))
+        .outerjoin(Application, Application.id == ModerationEvent.application_id)
+        .outerjoin(ArchivedApplication, ArchivedApplication.application_id == ModerationEvent.application_id)
+        .where(ModerationEvent.action.in_(("approve", "reject")) & ~AUTO_REJECT_EVENT)
+    )
+    for event in events:
+        if event.action == "reject" and event.reasons:
+            for reason in json.loads(event.reasons):
+                deltas[(REASON, reason_code(reason))] += 1
+        if event.submitted_at is not None:
+            deltas[(LATENCY, latency_bucket(moderation_latency(event.submitted_at, event.created_at)))] += 1
+
+    conn.execute(delete(StatCounter))
+    statement, rows = bump_statement(deltas)
+    if rows:
+        conn.execute(statement, rows)
+
+
+def setup_stats(conn) -> None:
+    """Початкове заповнення лічильників для БД, створеної до їх появи"""
+    if conn.execute(select(StatCounter.name).limit(1)).first() is None:
+        rebuild_stats(conn)
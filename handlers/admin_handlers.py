@@ -1,25 +1,50 @@
 # Обробники для модераторів
 import logging
-from aiogram import F, Router
-from aiogram.types import Message, CallbackQuery
-from aiogram.exceptions import TelegramBadRequest
-from aiogram.filters import Command
+from aiogram import F
+from aiogram.types import Message, CallbackQuery, FSInputFile
+from aiogram.exceptions import TelegramBadRequest, TelegramAPIError
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import json
 import html
+import os
+from typing import Optional
 
 from db.requests import get_application_by_id, update_application_channel_message, get_user_by_telegram_id, \
     get_all_moderators, set_moderator_status, get_user_by_username, get_user_by_id, update_application_status, \
-    delete_application
-from db.models import User
-from keyboards.inline import get_rejection_reasons_keyboard, get_custom_reason_keyboard
-from handlers.user_handlers import format_application_for_channel, format_application_preview
-from config import PUBLIC_CHANNEL_ID, REJECTION_REASONS, BOT_OWNER_ID, MODERATOR_CHAT_ID
+    delete_application, find_riot_id_duplicate, get_jobs, get_stats, rebuild_statistics, get_job_by_key, \
+    create_broadcast, start_broadcast, cancel_broadcast, get_broadcast, set_moderation_message
+from db.models import User, Application
+from keyboards.inline import get_rejection_reasons_keyboard, get_custom_reason_keyboard, \
+    get_broadcast_confirm_keyboard, get_broadcast_progress_keyboard, get_moderation_keyboard
+from keyboards.callbacks import ModerationCallback, ModerationAction, RejectReasonCallback, RejectionCallback, \
+    RejectionAction, SearchPageCallback, SearchScope, BroadcastCallback, BroadcastAction
+from handlers.routing import CallbackRouter
+from services.audit import audit_log
+from services.assignment import assignment, moderator_name
+from services.moderation_rules import moderation_rules, format_verdict_tags
+from handlers.search import save_query, get_saved_query, render_search_page, SERVER_NAMES
+from db.stats import histogram_quantile, STATUS, REASON, RANK, ROLE, SERVER, LATENCY
+from handlers.user_handlers import format_application_preview, format_duplicate_warning
+from services.channel import format_application_for_channel, queue_for_digest, content_hash, RESYNC_JOB
+from services.scheduler import scheduler
+from services.broadcast import schedule_broadcast, format_progress
+from config import PUBLIC_CHANNEL_ID, REJECTION_REASONS, BOT_OWNER_ID, MODERATOR_CHAT_ID, DIGEST_MODE, \
+    CLAIM_LEASE_MINUTES, MODERATION_RULES
 
 logger = logging.getLogger(__name__)
 
-router = Router()
+router = CallbackRouter()
+
+# Скільки найчастіших значень показувати в кожному розділі /stats
+STATS_TOP = 10
+
+ALREADY_HANDLED = "ℹ️ Цю анкету вже опрацьовано"
+CLAIMED_BY_OTHER = "🔒 Цю анкету вже взяв в роботу інший модератор"
+
+# Анкети, рішення щодо яких зараз виконується в цьому процесі (захист від подвійного натискання)
+_moderating: set = set()
 
 
 def is_moderator_chat(chat_id: int) -> bool:
@@ -27,10 +52,38 @@ def is_moderator_chat(chat_id: int) -> bool:
     return MODERATOR_CHAT_ID and chat_id == MODERATOR_CHAT_ID
 
 
+# Модератори за Telegram ID; None - кеш ще не завантажено, перевірка йде в БД
+_moderators: Optional[dict] = None
+
+
+async def warm_moderator_cache() -> None:
+    """Завантаження модераторів у пам'ять при старті бота"""
+    global _moderators
+    _moderators = {moderator.telegram_id: moderator for moderator in await get_all_moderators()}
+
+
+def _cache_moderator(user: User, is_moderator: bool) -> None:
+    """Оновлення кешу після зміни прав модератора"""
+    user.is_moderator = is_moderator
+    if _moderators is None:
+        return
+    if is_moderator:
+        _moderators[user.telegram_id] = user
+    else:
+        _moderators.pop(user.telegram_id, None)
+
+
+async def get_moderator(telegram_id: int) -> Optional[User]:
+    """Запис модератора за Telegram ID (None, якщо користувач не модератор)"""
+    if _moderators is not None:
+        return _moderators.get(telegram_id)
+    user = await get_user_by_telegram_id(telegram_id)
+    return user if user and user.is_moderator else None
+
+
 async def is_moderator(telegram_id: int) -> bool:
     """Перевірка, чи є користувач модератором"""
-    user = await get_user_by_telegram_id(telegram_id)
-    return user and user.is_moderator
+    return await get_moderator(telegram_id) is not None
 
 
 async def is_owner(telegram_id: int) -> bool:
@@ -58,12 +111,19 @@ async def cmd_start_moderator(message: Message):
             "/add_moderator - додати модератора\n"
             "/remove_moderator - видалити модератора\n"
             "/list_moderators - список модераторів\n"
+            "/jobs - фонові завдання\n"
+            "/stats - статистика модерації\n"
+            "/export - вивантаження анкет\n"
+            "/resync_channel - оновити пости в каналі\n"
+            "/broadcast - розсилка всім користувачам\n"
             "/check_my_rights - перевірити права\n\n"
         )
     elif await is_moderator(message.from_user.id):
         welcome_text += (
             "🛡️ Ви є модератором. Доступні команди:\n"
-            "/check_my_rights - перевірити права\n\n"
+            "/check_my_rights - перевірити права\n"
+            "/search - пошук анкет\n"
+            "/next - взяти в роботу анкету, що чекає найдовше\n\n"
         )
     else:
         welcome_text += "❌ У вас немає прав модератора. Зверніться до адміністратора."
@@ -83,6 +143,8 @@ async def cmd_help_moderator(message: Message):
         "📖 Довідка по командам модератора:\n\n"
         "Для модераторів:\n"
         "• /check_my_rights - перевірити свої права\n"
+        "• /search <текст> - пошук анкет (включно з тими, що на модерації)\n"
+        "• /next - взяти в роботу анкету, що чекає найдовше\n"
         "• Модерація анкет - через інлайн-кнопки під повідомленнями\n\n"
     )
 
@@ -92,78 +154,130 @@ async def cmd_help_moderator(message: Message):
             "• /add_moderator @username - додати модератора\n"
             "• /remove_moderator @username - видалити модератора\n"
             "• /list_moderators - список модераторів\n"
+            "• /jobs - стан фонових завдань\n"
+            "• /stats - статистика модерації (/stats rebuild - перерахувати)\n"
+            "• /export [csv|jsonl] [статуси] [з YYYY-MM-DD] [по YYYY-MM-DD] - вивантаження анкет\n"
+            "• /resync_channel - перерендерити опубліковані пости (після зміни шаблону чи REGIONS)\n"
+            "• /broadcast <текст> - розсилка всім користувачам бота\n"
         )
 
     await message.answer(help_text)
 
 
-@router.callback_query(F.data.startswith("app_"))
-async def approve_application(callback: CallbackQuery):
+@router.callback_query(ModerationCallback.filter(F.action == ModerationAction.APPROVE))
+async def approve_application(callback: CallbackQuery, callback_data: ModerationCallback):
     """Схвалення анкети"""
-    if not await is_moderator(callback.from_user.id):
+    moderator = await get_moderator(callback.from_user.id)
+    if not moderator:
         await callback.answer("❌ Недостатньо прав!", show_alert=True)
         return
 
+    application_id = callback_data.application_id
+    if application_id in _moderating:
+        await callback.answer(ALREADY_HANDLED)
+        return
+
+    _moderating.add(application_id)
     try:
-        application_id = int(callback.data.replace("app_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
+        await _approve(callback, application_id, moderator)
+    finally:
+        _moderating.discard(application_id)
+
+
+async def _approve(callback: CallbackQuery, application_id: int, moderator: User) -> None:
+    """Схвалення з публікацією та сповіщенням; Telegram-виклики лише для першого рішення"""
+    application = await get_application_by_id(application_id)
+    if not application or application.status != 'pending':
+        await callback.answer(ALREADY_HANDLED)
         return
 
-    success = await update_application_status(application_id, "approved", callback.from_user.id)
+    # Рішення приймає лише модератор, що орендує анкету (або будь-хто, якщо вона вільна)
+    if not await assignment.claim(application_id, moderator):
+        await callback.answer(CLAIMED_BY_OTHER, show_alert=True)
+        return
 
-    if success:
-        logger.info(f"Анкета #{application_id} схвалено модератором {callback.from_user.id}")
-        application = await get_application_by_id(application_id)
-        if application:
-            if PUBLIC_CHANNEL_ID:
-                application_text = format_application_for_channel(application)
-
-                try:
-                    message = await callback.bot.send_message(
-                        PUBLIC_CHANNEL_ID,
-                        application_text,
-                        parse_mode="HTML"
-                    )
-                    # Зберігаємо ID повідомлення в каналі
-                    await update_application_channel_message(application_id, message.message_id)
-                    logger.info(f"Анкета #{application_id} опублікована в канал {PUBLIC_CHANNEL_ID}")
-                except Exception as e:
-                    logger.error(f"Помилка при публікації анкети #{application_id} в канал: {e}", exc_info=True)
-
-            # Сповіщаємо користувача
-            user = await get_user_by_id(application.user_id)
-            if user:
-                try:
-                    await callback.bot.send_message(
-                        user.telegram_id,
-                        "✅ Вашу анкету схвалено та опубліковано в каналі!"
-                    )
-                except Exception as e:
-                    logger.warning(f"Помилка при сповіщенні користувача {user.telegram_id} про схвалення анкети: {e}")
+    # Умовне оновлення: з двох одночасних рішень (у різних процесах) спрацює лише одне
+    success = await update_application_status(application_id, "approved", moderator.id,
+                                              expected_version=application.version)
+    if not success:
+        await callback.answer(ALREADY_HANDLED)
+        return
 
-        await callback.message.edit_text(
-            f"✅ Анкету #{application_id} схвалено та опубліковано!",
-            reply_markup=None
-        )
-    else:
-        await callback.answer("❌ Помилка при схваленні анкети!", show_alert=True)
+    assignment.release(application_id)
+    audit_log.record(application_id, "approve", moderator.id)
+    logger.info(f"Анкета #{application_id} схвалено модератором {callback.from_user.id}")
+    # Що сталося з публікацією: queued - чекає дайджесту, published - пост у каналі,
+    # failed - відправка в канал не вдалася, None - канал не налаштовано
+    publication = None
+    if PUBLIC_CHANNEL_ID and DIGEST_MODE:
+        # Анкета вийде в найближчому дайджесті
+        await queue_for_digest(application_id)
+        publication = "queued"
+        logger.info(f"Анкету #{application_id} додано в чергу дайджесту")
+    elif PUBLIC_CHANNEL_ID:
+        application_text = format_application_for_channel(application)
 
+        try:
+            message = await callback.bot.send_message(
+                PUBLIC_CHANNEL_ID,
+                application_text,
+                parse_mode="HTML"
+            )
+            # Зберігаємо ID повідомлення в каналі
+            await update_application_channel_message(
+                application_id, message.message_id, content_hash(application_text)
+            )
+            publication = "published"
+            logger.info(f"Анкета #{application_id} опублікована в канал {PUBLIC_CHANNEL_ID}")
+        except Exception as e:
+            publication = "failed"
+            logger.error(f"Помилка при публікації анкети #{application_id} в канал: {e}", exc_info=True)
+
+    # Сповіщаємо користувача
+    user = await get_user_by_id(application.user_id)
+    if user:
+        if publication == "queued":
+            user_text = "✅ Вашу анкету схвалено! Вона з'явиться в каналі з найближчою добіркою анкет."
+        elif publication == "published":
+            user_text = "✅ Вашу анкету схвалено та опубліковано в каналі!"
+        else:
+            user_text = "✅ Вашу анкету схвалено!"
+        try:
+            await callback.bot.send_message(user.telegram_id, user_text)
+        except Exception as e:
+            logger.warning(f"Помилка при сповіщенні користувача {user.telegram_id} про схвалення анкети: {e}")
+
+    if publication == "queued":
+        moderator_text = f"✅ Анкету #{application_id} схвалено та додано в чергу дайджесту"
+    elif publication == "published":
+        moderator_text = f"✅ Анкету #{application_id} схвалено та опубліковано!"
+    elif publication == "failed":
+        moderator_text = (f"⚠️ Анкету #{application_id} схвалено, але опублікувати в каналі не вдалося "
+                          f"(подробиці - в логах)")
+    else:
+        moderator_text = f"✅ Анкету #{application_id} схвалено"
+    await callback.message.edit_text(moderator_text, reply_markup=None)
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("rej_"))
-async def start_rejection(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(ModerationCallback.filter(F.action == ModerationAction.REJECT))
+async def start_rejection(callback: CallbackQuery, callback_data: ModerationCallback, state: FSMContext):
     """Початок процесу відхилення анкети"""
     # Перевірка прав модератора
-    if not await is_moderator(callback.from_user.id):
+    moderator = await get_moderator(callback.from_user.id)
+    if not moderator:
         await callback.answer("❌ Недостатньо прав!", show_alert=True)
         return
 
-    try:
-        application_id = int(callback.data.replace("rej_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
+    application_id = callback_data.application_id
+    application = await get_application_by_id(application_id)
+    if application_id in _moderating or not application or application.status != 'pending':
+        await callback.answer(ALREADY_HANDLED)
+        return
+
+    # Вибір причин займає час - анкета на цей час закріплюється за модератором
+    if not await assignment.claim(application_id, moderator):
+        await callback.answer(CLAIMED_BY_OTHER, show_alert=True)
         return
 
     # Зберігаємо дані в FSM
@@ -181,19 +295,11 @@ async def start_rejection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("reason_"), RejectionStates.waiting_for_reasons)
-async def select_rejection_reason(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(RejectReasonCallback.filter(), RejectionStates.waiting_for_reasons)
+async def select_rejection_reason(callback: CallbackQuery, callback_data: RejectReasonCallback, state: FSMContext):
     """Вибір причини відхилення"""
-    try:
-        parts = callback.data.split("_", 2)
-        if len(parts) < 3:
-            await callback.answer("❌ Помилка формату даних!", show_alert=True)
-            return
-        application_id = int(parts[1])
-        reason_code = parts[2]
-    except (ValueError, IndexError):
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
-        return
+    application_id = callback_data.application_id
+    reason_code = callback_data.reason
 
     # Отримуємо поточні дані з FSM
     data = await state.get_data()
@@ -243,7 +349,7 @@ async def select_rejection_reason(callback: CallbackQuery, state: FSMContext):
 
 @router.message(RejectionStates.waiting_for_custom_reason)
 async def process_custom_reason(message: Message, state: FSMContext):
-    """Обробка введеної своєї причини з повним видаленням анкети"""
+    """Обробка введеної своєї причини з перенесенням анкети в архів"""
     custom_reason = message.text.strip()
 
     if not custom_reason:
@@ -259,14 +365,34 @@ async def process_custom_reason(message: Message, state: FSMContext):
         await state.clear()
         return
 
-    # Отримуємо анкету перед видаленням для сповіщення користувача
-    application = await get_application_by_id(application_id)
-    if not application:
-        await message.answer("❌ Анкету не знайдено!")
+    if application_id in _moderating:
+        await message.answer(ALREADY_HANDLED)
         await state.clear()
         return
 
-    # Сповіщаємо користувача перед видаленням
+    _moderating.add(application_id)
+    try:
+        # Отримуємо анкету перед архівацією для сповіщення користувача
+        application = await get_application_by_id(application_id)
+        moderator = await get_user_by_telegram_id(message.from_user.id)
+        moderator_id = moderator.id if moderator else None
+        # Поки обиралась причина, оренда могла минути, а анкету - взяти інший модератор
+        claimed = application is None or moderator is None or await assignment.claim(application_id, moderator)
+        # Переносимо в архів лише анкету, що ще на модерації
+        success = claimed and application is not None and await delete_application(
+            application_id, status='rejected', moderator_id=moderator_id, reasons=[custom_reason],
+            only_status='pending'
+        )
+    finally:
+        _moderating.discard(application_id)
+
+    if not success:
+        await message.answer(ALREADY_HANDLED if claimed else CLAIMED_BY_OTHER)
+        await state.clear()
+        return
+    assignment.release(application_id)
+
+    # Сповіщаємо користувача лише після успішного відхилення
     user = await get_user_by_id(application.user_id)
     if user:
         try:
@@ -278,45 +404,36 @@ async def process_custom_reason(message: Message, state: FSMContext):
         except Exception as e:
             logger.warning(f"Помилка при сповіщенні користувача {user.telegram_id} про відхилення анкети: {e}")
 
-    # Повністю видаляємо анкету з бази даних
-    success = await delete_application(application_id)
+    audit_log.record(application_id, "reject", moderator_id, [custom_reason])
+    logger.info(
+        f"Анкета #{application_id} відхилено модератором {message.from_user.id} з причиною: {custom_reason[:50]}")
 
-    if success:
-        logger.info(
-            f"Анкета #{application_id} відхилено та видалено модератором {message.from_user.id} з причиною: {custom_reason[:50]}")
-
-        # Оновлюємо оригінальне повідомлення
-        if message_id:
-            try:
-                await message.bot.edit_message_text(
-                    chat_id=message.chat.id,
-                    message_id=message_id,
-                    text=f"❌ Анкету #{application_id} відхилено та видалено!\n<b>Причина:</b> {html.escape(custom_reason)}",
-                    parse_mode="HTML"
-                )
-            except Exception as e:
-                logger.warning(f"Помилка при оновленні повідомлення {message_id} в чаті {message.chat.id}: {e}")
+    # Оновлюємо оригінальне повідомлення
+    if message_id:
+        try:
+            await message.bot.edit_message_text(
+                chat_id=message.chat.id,
+                message_id=message_id,
+                text=f"❌ Анкету #{application_id} відхилено!\n<b>Причина:</b> {html.escape(custom_reason)}",
+                parse_mode="HTML"
+            )
+        except Exception as e:
+            logger.warning(f"Помилка при оновленні повідомлення {message_id} в чаті {message.chat.id}: {e}")
 
-        await message.answer(
-            f"❌ Анкету #{application_id} відхилено та видалено!\n"
-            f"<b>Причина:</b> {html.escape(custom_reason)}",
-            parse_mode="HTML"
-        )
-    else:
-        await message.answer("❌ Помилка при відхиленні анкети!")
+    await message.answer(
+        f"❌ Анкету #{application_id} відхилено!\n"
+        f"<b>Причина:</b> {html.escape(custom_reason)}",
+        parse_mode="HTML"
+    )
 
     # Очищаємо стан
     await state.clear()
 
 
-@router.callback_query(F.data.startswith("cancel_custom_"))
-async def cancel_custom_reason(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(RejectionCallback.filter(F.action == RejectionAction.BACK_TO_REASONS))
+async def cancel_custom_reason(callback: CallbackQuery, callback_data: RejectionCallback, state: FSMContext):
     """Скасування введення своєї причини"""
-    try:
-        application_id = int(callback.data.replace("cancel_custom_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
-        return
+    application_id = callback_data.application_id
 
     # Повертаємося до вибору причин
     await state.set_state(RejectionStates.waiting_for_reasons)
@@ -329,14 +446,10 @@ async def cancel_custom_reason(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("conf_rej_"), RejectionStates.waiting_for_reasons)
-async def confirm_rejection(callback: CallbackQuery, state: FSMContext):
-    """Підтвердження відхилення анкети з повним видаленням"""
-    try:
-        application_id = int(callback.data.replace("conf_rej_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
-        return
+@router.callback_query(RejectionCallback.filter(F.action == RejectionAction.CONFIRM), RejectionStates.waiting_for_reasons)
+async def confirm_rejection(callback: CallbackQuery, callback_data: RejectionCallback, state: FSMContext):
+    """Підтвердження відхилення анкети з перенесенням в архів"""
+    application_id = callback_data.application_id
 
     data = await state.get_data()
     current_application_id = data.get("application_id")
@@ -350,13 +463,32 @@ async def confirm_rejection(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ Оберіть хоча б одну причину!", show_alert=True)
         return
 
-    # Отримуємо анкету перед видаленням для сповіщення користувача
-    application = await get_application_by_id(application_id)
-    if not application:
-        await callback.answer("❌ Анкету не знайдено!", show_alert=True)
+    if application_id in _moderating:
+        await callback.answer(ALREADY_HANDLED)
+        return
+
+    _moderating.add(application_id)
+    try:
+        # Отримуємо анкету перед архівацією для сповіщення користувача
+        application = await get_application_by_id(application_id)
+        moderator = await get_user_by_telegram_id(callback.from_user.id)
+        moderator_id = moderator.id if moderator else None
+        # Поки обирались причини, оренда могла минути, а анкету - взяти інший модератор
+        claimed = application is None or moderator is None or await assignment.claim(application_id, moderator)
+        # Переносимо в архів лише анкету, що ще на модерації
+        success = claimed and application is not None and await delete_application(
+            application_id, status='rejected', moderator_id=moderator_id, reasons=reasons, only_status='pending'
+        )
+    finally:
+        _moderating.discard(application_id)
+
+    if not success:
+        await state.clear()
+        await callback.answer(ALREADY_HANDLED if claimed else CLAIMED_BY_OTHER, show_alert=not claimed)
         return
+    assignment.release(application_id)
 
-    # Сповіщаємо користувача перед видаленням
+    # Сповіщаємо користувача лише після успішного відхилення
     user = await get_user_by_id(application.user_id)
     if user:
         reasons_text = "\n• ".join(reasons)
@@ -369,48 +501,147 @@ async def confirm_rejection(callback: CallbackQuery, state: FSMContext):
         except Exception as e:
             logger.warning(f"Помилка при сповіщенні користувача {user.telegram_id}: {e}")
 
-    # Повністю видаляємо анкету з бази даних
-    success = await delete_application(application_id)
-
-    if success:
-        reasons_text = ", ".join(reasons)
-        logger.info(f"Анкета #{application_id} відхилено та видалено модератором {callback.from_user.id}")
+    audit_log.record(application_id, "reject", moderator_id, reasons)
+    reasons_text = ", ".join(reasons)
+    logger.info(f"Анкета #{application_id} відхилено модератором {callback.from_user.id}")
 
-        await callback.message.edit_text(
-            f"❌ Анкету #{application_id} відхилено та повністю видалено!\n"
-            f"<b>Причини:</b> {', '.join(reasons)}",
-            parse_mode="HTML",
-            reply_markup=None
-        )
-    else:
-        await callback.answer("❌ Помилка при відхиленні анкети!", show_alert=True)
+    await callback.message.edit_text(
+        f"❌ Анкету #{application_id} відхилено!\n"
+        f"<b>Причини:</b> {', '.join(reasons)}",
+        parse_mode="HTML",
+        reply_markup=None
+    )
 
     # Очищаємо стан
     await state.clear()
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("cancel_rejection_"))
-async def cancel_rejection_process(callback: CallbackQuery, state: FSMContext):
-    """Скасування процесу відхилення"""
+async def format_moderation_card(application: Application) -> Optional[str]:
+    """Текст картки анкети для чату модераторів (None - дані анкети пошкоджено)"""
+    try:
+        agents_data = json.loads(application.agents)
+        servers_data = json.loads(application.server)
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+    application_data = {
+        'riot_id': application.riot_id,
+        'age': application.age,
+        'rank': application.rank,
+        'roles': application.role.split(', '),
+        'agents': agents_data,
+        'servers': servers_data,
+        'bio': application.bio,
+        'contact_info': application.contact_info
+    }
+    moderation_text = f"🆕 Нова анкета на модерацію:\n\n{format_application_preview(application_data)}"
+    if MODERATION_RULES:
+        moderation_text += format_verdict_tags(
+            moderation_rules.evaluate(application.riot_id, application.bio, application.contact_info)
+        )
+
+    applicant = await get_user_by_id(application.user_id)
+    duplicate = await find_riot_id_duplicate(application.riot_id, applicant.telegram_id) if applicant else None
+    if duplicate:
+        moderation_text += format_duplicate_warning(duplicate)
+    return moderation_text
+
+
+@router.callback_query(ModerationCallback.filter(F.action == ModerationAction.CLAIM))
+async def claim_application_callback(callback: CallbackQuery, callback_data: ModerationCallback):
+    """Взяття анкети в роботу (оренда на CLAIM_LEASE_MINUTES)"""
+    moderator = await get_moderator(callback.from_user.id)
+    if not moderator:
+        await callback.answer("❌ Недостатньо прав!", show_alert=True)
+        return
+
+    application_id = callback_data.application_id
+    if not await assignment.claim(application_id, moderator):
+        application = await get_application_by_id(application_id)
+        if not application or application.status != 'pending':
+            await callback.answer(ALREADY_HANDLED)
+        else:
+            await callback.answer(CLAIMED_BY_OTHER, show_alert=True)
+        return
+
     try:
-        application_id = int(callback.data.replace("cancel_rejection_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
+        await callback.message.edit_reply_markup(
+            reply_markup=get_moderation_keyboard(application_id, moderator_name(moderator))
+        )
+    except TelegramBadRequest:
+        # Кнопки не змінилися (модератор продовжив власну оренду)
+        pass
+    await callback.answer(f"✅ Анкета ваша на {CLAIM_LEASE_MINUTES} хв")
+
+
+@router.message(Command("next"))
+async def next_application_command(message: Message):
+    """Взяття в роботу анкети, що чекає найдовше"""
+    if not is_moderator_chat(message.chat.id):
+        return
+
+    moderator = await get_moderator(message.from_user.id)
+    if not moderator:
+        await message.answer("❌ Ця команда доступна тільки модераторам!")
         return
 
+    application = None
+    while application is None:
+        application_id = await assignment.next_for(moderator)
+        if application_id is None:
+            await message.answer("📭 Черга модерації порожня")
+            return
+        application = await get_application_by_id(application_id)
+        if application is None:
+            # Анкету видалили або перенесли в архів, поки її брали в роботу
+            assignment.release(application_id)
+
+    holder = moderator_name(moderator)
+    waiting = assignment.oldest_wait()
+    summary = (f"👤 Анкета #{application_id} ваша на {CLAIM_LEASE_MINUTES} хв. "
+               f"У черзі ще {assignment.queue_size()}"
+               + (f", найдовше чекає {format_duration(waiting)}" if waiting is not None else ""))
+
+    if application.moderation_message_id:
+        try:
+            await message.bot.edit_message_reply_markup(
+                chat_id=message.chat.id,
+                message_id=application.moderation_message_id,
+                reply_markup=get_moderation_keyboard(application_id, holder)
+            )
+            await message.answer(summary, reply_to_message_id=application.moderation_message_id)
+            return
+        except TelegramBadRequest:
+            # Картку видалено з чату - надсилаємо нову
+            pass
+
+    moderation_text = await format_moderation_card(application)
+    if moderation_text is None:
+        await message.answer("❌ Помилка при завантаженні даних анкети!")
+        return
+    card = await message.answer(
+        f"{moderation_text}\n\n👤 Призначено: {html.escape(holder)}",
+        parse_mode="HTML",
+        reply_markup=get_moderation_keyboard(application_id, holder)
+    )
+    await set_moderation_message(application_id, card.message_id)
+    await message.answer(summary)
+
+
+@router.callback_query(RejectionCallback.filter(F.action == RejectionAction.CANCEL))
+async def cancel_rejection_process(callback: CallbackQuery, callback_data: RejectionCallback, state: FSMContext):
+    """Скасування процесу відхилення"""
+    application_id = callback_data.application_id
+
     # Очищаємо стан
     await state.clear()
 
     # Повертаємося до оригінального стану модерації
     application = await get_application_by_id(application_id)
     if application:
-        from keyboards.inline import get_moderation_keyboard
-
-        try:
-            agents_data = json.loads(application.agents)
-            servers_data = json.loads(application.server)
-        except (json.JSONDecodeError, TypeError) as e:
+        moderation_text = await format_moderation_card(application)
+        if moderation_text is None:
             await callback.message.edit_text(
                 "❌ Помилка при завантаженні даних анкети!",
                 reply_markup=None
@@ -418,22 +649,13 @@ async def cancel_rejection_process(callback: CallbackQuery, state: FSMContext):
             await callback.answer()
             return
 
-        application_data = {
-            'riot_id': application.riot_id,
-            'age': application.age,
-            'rank': application.rank,
-            'roles': application.role.split(', '),
-            'agents': agents_data,
-            'servers': servers_data,
-            'bio': application.bio,
-            'contact_info': application.contact_info
-        }
-        moderation_text = f"🆕 Нова анкета на модерацію:\n\n{format_application_preview(application_data)}"
-
+        # Анкета лишається за модератором, що скасував відхилення, до кінця оренди
+        moderator = await get_moderator(callback.from_user.id)
+        holder = moderator_name(moderator) if moderator and assignment.holder(application.id) == moderator.id else None
         await callback.message.edit_text(
             moderation_text,
             parse_mode="HTML",
-            reply_markup=get_moderation_keyboard(application.id)
+            reply_markup=get_moderation_keyboard(application.id, holder)
         )
     else:
         await callback.message.edit_text(
@@ -444,6 +666,45 @@ async def cancel_rejection_process(callback: CallbackQuery, state: FSMContext):
     await callback.answer("✅ Процес відхилення скасовано")
 
 
+@router.message(Command("search"))
+async def cmd_search_moderator(message: Message, command: CommandObject):
+    """Пошук активних анкет (включно з тими, що на модерації) для модераторів"""
+    if not is_moderator_chat(message.chat.id):
+        return
+
+    if not await is_moderator(message.from_user.id):
+        await message.answer("❌ Недостатньо прав!")
+        return
+
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(
+            "🔎 Використання: /search <Riot ID, контакт, біо або сервер>\n\n"
+            "Наприклад: /search Player123#EUW"
+        )
+        return
+
+    text, keyboard = await render_search_page(query, save_query(query), 0, SearchScope.MODERATOR)
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+
+
+@router.callback_query(SearchPageCallback.filter(F.scope == SearchScope.MODERATOR))
+async def search_page_moderator(callback: CallbackQuery, callback_data: SearchPageCallback):
+    """Гортання результатів модераторського пошуку"""
+    if not await is_moderator(callback.from_user.id):
+        await callback.answer("❌ Недостатньо прав!", show_alert=True)
+        return
+
+    query = get_saved_query(callback_data.token)
+    if query is None:
+        await callback.answer("⌛ Результати пошуку застаріли, повторіть /search", show_alert=True)
+        return
+
+    text, keyboard = await render_search_page(query, callback_data.token, callback_data.page, SearchScope.MODERATOR)
+    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    await callback.answer()
+
+
 # Команди для власника бота
 @router.message(Command("add_moderator"))
 async def add_moderator_command(message: Message):
@@ -493,6 +754,7 @@ async def add_moderator_command(message: Message):
     success = await set_moderator_status(user.id, True)
 
     if success:
+        _cache_moderator(user, True)
         logger.info(
             f"Модератор додано: {user.telegram_id} (@{user.username or 'немає username'}) власником {message.from_user.id} (@{message.from_user.username or 'немає username'})")
         await message.answer(f"✅ Користувач {user.username or user_identifier} тепер модератор!")
@@ -557,6 +819,8 @@ async def remove_moderator_command(message: Message):
     success = await set_moderator_status(user.id, False)
 
     if success:
+        _cache_moderator(user, False)
+        assignment.forget_moderator(user.id)
         logger.info(
             f"Модератор видалено: {user.telegram_id} (@{user.username or 'немає username'}) власником {message.from_user.id} (@{message.from_user.username or 'немає username'})")
         await message.answer(f"✅ Користувач {user.username or user_identifier} більше не модератор!")
@@ -597,6 +861,264 @@ async def list_moderators_command(message: Message):
     await message.answer(moderators_text)
 
 
+@router.message(Command("jobs"))
+async def list_jobs_command(message: Message):
+    """Стан фонових завдань планувальника"""
+    # У модераторському чаті дозволяємо команду тільки власнику
+    if is_moderator_chat(message.chat.id) and not await is_owner(message.from_user.id):
+        return
+
+    if not await is_owner(message.from_user.id):
+        await message.answer("❌ Ця команда доступна тільки власнику бота!")
+        return
+
+    jobs = await get_jobs()
+
+    if not jobs:
+        await message.answer("📭 Фонових завдань немає.")
+        return
+
+    jobs_text = "🗓 Фонові завдання:\n\n"
+    for job in jobs:
+        if job.failed_at:
+            state = f"❌ зупинено після {job.attempts} спроб"
+        else:
+            state = f"⏳ {job.run_at:%Y-%m-%d %H:%M} UTC"
+            if job.interval:
+                state += f", кожні {job.interval // 60} хв"
+        jobs_text += f"#{job.id} {html.escape(job.key or job.name)} - {state}\n"
+        if job.last_error:
+            jobs_text += f"   ⚠️ {html.escape(job.last_error[:100])}\n"
+
+    await message.answer(jobs_text, parse_mode="HTML")
+
+
+@router.message(Command("export"))
+async def export_command(message: Message, command: CommandObject):
+    """Вивантаження анкет стисненим файлом"""
+    # У модераторському чаті дозволяємо команду тільки власнику
+    if is_moderator_chat(message.chat.id) and not await is_owner(message.from_user.id):
+        return
+
+    if not await is_owner(message.from_user.id):
+        await message.answer("❌ Ця команда доступна тільки власнику бота!")
+        return
+
+    # Модуль експорту потрібен рідко - імпортується при першому виклику
+    from services.export import parse_export_args, write_export, EXPORT_MAX_FILE_SIZE
+
+    try:
+        args = parse_export_args(command.args)
+    except ValueError as e:
+        await message.answer(
+            f"❌ {e}\n\n"
+            "Використання: /export [csv|jsonl] [статуси через кому] [з YYYY-MM-DD] [по YYYY-MM-DD]\n"
+            "Приклад: /export jsonl approved,rejected 2024-01-01 2024-01-31"
+        )
+        return
+
+    await message.answer("⏳ Готую експорт...")
+    try:
+        path, count = await write_export(args)
+    except Exception as e:
+        logger.error(f"Помилка при підготовці експорту: {e}", exc_info=True)
+        await message.answer("❌ Не вдалося підготувати експорт, подробиці - в логах.")
+        return
+
+    try:
+        size = os.path.getsize(path)
+        if size > EXPORT_MAX_FILE_SIZE:
+            await message.answer(
+                f"❌ Файл експорту завеликий ({size / 1024 / 1024:.1f} МБ, Telegram приймає до "
+                f"{EXPORT_MAX_FILE_SIZE // 1024 // 1024} МБ). Звузьте вибірку статусами або датами."
+            )
+            return
+
+        filename = f"applications-{message.date:%Y%m%d-%H%M}.{args.fmt}.gz"
+        await message.answer_document(
+            FSInputFile(path, filename=filename),
+            caption=f"📦 Анкет у файлі: {count}"
+        )
+        logger.info(f"Власник {message.from_user.id} вивантажив {count} анкет ({args.fmt})")
+    except TelegramAPIError as e:
+        logger.error(f"Не вдалося надіслати файл експорту: {e}")
+        await message.answer(f"❌ Не вдалося надіслати файл експорту: {e}")
+    finally:
+        os.remove(path)
+
+
+@router.message(Command("resync_channel"))
+async def resync_channel_command(message: Message):
+    """Оновлення всіх опублікованих постів за поточним шаблоном"""
+    # У модераторському чаті дозволяємо команду тільки власнику
+    if is_moderator_chat(message.chat.id) and not await is_owner(message.from_user.id):
+        return
+
+    if not await is_owner(message.from_user.id):
+        await message.answer("❌ Ця команда доступна тільки власнику бота!")
+        return
+
+    if not PUBLIC_CHANNEL_ID:
+        await message.answer("❌ Публічний канал не налаштовано.")
+        return
+
+    if await get_job_by_key(RESYNC_JOB):
+        await message.answer("⏳ Оновлення постів вже виконується, прогрес - у попередньому повідомленні.")
+        return
+
+    progress = await message.answer("🔄 Оновлення постів у каналі заплановано...")
+    await scheduler.schedule(
+        RESYNC_JOB, {"chat_id": message.chat.id, "message_id": progress.message_id}, key=RESYNC_JOB
+    )
+    logger.info(f"Власник {message.from_user.id} запустив оновлення постів у каналі")
+
+
+@router.message(Command("broadcast"))
+async def broadcast_command(message: Message, command: CommandObject):
+    """Підготовка розсилки всім користувачам (відправка після підтвердження)"""
+    # У модераторському чаті дозволяємо команду тільки власнику
+    if is_moderator_chat(message.chat.id) and not await is_owner(message.from_user.id):
+        return
+
+    if not await is_owner(message.from_user.id):
+        await message.answer("❌ Ця команда доступна тільки власнику бота!")
+        return
+
+    text = (command.args or "").strip()
+    if not text:
+        await message.answer("📣 Використання: /broadcast <текст повідомлення>")
+        return
+
+    broadcast = await create_broadcast(text, message.chat.id)
+    # Текст надсилається як є, без HTML-розмітки
+    await message.answer(
+        f"📣 Розсилка #{broadcast.id}. Повідомлення для всіх користувачів:\n\n{text}",
+        parse_mode=None,
+        reply_markup=get_broadcast_confirm_keyboard(broadcast.id)
+    )
+
+
+@router.callback_query(BroadcastCallback.filter(F.action == BroadcastAction.CONFIRM))
+async def confirm_broadcast(callback: CallbackQuery, callback_data: BroadcastCallback):
+    """Запуск розсилки"""
+    if not await is_owner(callback.from_user.id):
+        await callback.answer("❌ Недостатньо прав!", show_alert=True)
+        return
+
+    broadcast_id = callback_data.broadcast_id
+    # Умовний перехід draft -> running: повторне натискання не запустить розсилку вдруге
+    if not await start_broadcast(broadcast_id, callback.message.message_id):
+        await callback.answer("Цю розсилку вже запущено або скасовано", show_alert=True)
+        return
+
+    await schedule_broadcast(broadcast_id)
+    broadcast = await get_broadcast(broadcast_id)
+    await callback.message.edit_text(
+        format_progress(broadcast), reply_markup=get_broadcast_progress_keyboard(broadcast_id)
+    )
+    await callback.answer("✅ Розсилку запущено")
+    logger.info(f"Власник {callback.from_user.id} запустив розсилку #{broadcast_id} ({broadcast.total} отримувачів)")
+
+
+@router.callback_query(BroadcastCallback.filter(F.action.in_({BroadcastAction.CANCEL, BroadcastAction.STOP})))
+async def stop_broadcast(callback: CallbackQuery, callback_data: BroadcastCallback):
+    """Скасування чернетки або зупинка розсилки, що виконується"""
+    if not await is_owner(callback.from_user.id):
+        await callback.answer("❌ Недостатньо прав!", show_alert=True)
+        return
+
+    broadcast_id = callback_data.broadcast_id
+    if not await cancel_broadcast(broadcast_id):
+        await callback.answer("Розсилку вже завершено або скасовано", show_alert=True)
+        return
+
+    if callback_data.action == BroadcastAction.CANCEL:
+        await callback.message.edit_text(f"❌ Розсилку #{broadcast_id} скасовано")
+        await callback.answer()
+    else:
+        # Підсумок з прогресом покаже саме завдання розсилки перед наступним пакетом
+        await callback.answer("⏹ Розсилку буде зупинено")
+    logger.info(f"Власник {callback.from_user.id} скасував розсилку #{broadcast_id}")
+
+
+def format_duration(seconds: float) -> str:
+    """Тривалість у найбільших зручних одиницях"""
+    minutes = int(seconds // 60)
+    if minutes < 1:
+        return f"{int(seconds)} с"
+    if minutes < 60:
+        return f"{minutes} хв"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours} год {minutes} хв"
+    days, hours = divmod(hours, 24)
+    return f"{days} дн {hours} год"
+
+
+def format_top(counters: dict, names: dict = None) -> str:
+    """Найчастіші значення розподілу, по одному на рядок"""
+    top = sorted(((value, key) for key, value in counters.items() if value > 0), reverse=True)[:STATS_TOP]
+    if not top:
+        return "   немає даних\n"
+    names = names or {}
+    return "".join(f"   • {html.escape(names.get(key, key))}: {value}\n" for value, key in top)
+
+
+def format_stats(stats: dict) -> str:
+    """Текст /stats з лічильників"""
+    statuses = stats.get(STATUS, {})
+    approved = statuses.get("approved", 0)
+    rejected = statuses.get("rejected", 0)
+    # Рівень схвалення - лише для рішень модераторів, автоматичні відхилення рахуються окремо
+    decided = approved + rejected
+    approval_rate = f"{approved / decided * 100:.1f}%" if decided else "—"
+
+    latency = stats.get(LATENCY, {})
+    if latency:
+        latency_text = (f"медіана {format_duration(histogram_quantile(latency, 0.5))}, "
+                        f"90% - до {format_duration(histogram_quantile(latency, 0.9))}")
+    else:
+        latency_text = "немає даних"
+
+    reason_names = dict(REJECTION_REASONS)
+    reason_names["custom"] = "Своя причина"
+
+    return (
+        "📊 <b>Статистика модерації</b>\n\n"
+        f"📝 Подано анкет: {statuses.get('created', 0)}\n"
+        f"✅ Схвалено: {approved}\n"
+        f"❌ Відхилено: {rejected}\n"
+        f"🤖 Відхилено автоперевіркою: {statuses.get('auto_rejected', 0)}\n"
+        f"📈 Рівень схвалення: {approval_rate}\n"
+        f"🗑️ Видалено користувачами: {statuses.get('deleted', 0)}\n"
+        f"⌛ Знято з публікації: {statuses.get('expired', 0)}\n"
+        f"⏱ Час до рішення: {latency_text}\n\n"
+        f"❌ <b>Причини відхилення:</b>\n{format_top(stats.get(REASON, {}), reason_names)}\n"
+        f"🏆 <b>Активні анкети за рангом:</b>\n{format_top(stats.get(RANK, {}))}\n"
+        f"🎯 <b>За роллю:</b>\n{format_top(stats.get(ROLE, {}))}\n"
+        f"🌍 <b>За сервером:</b>\n{format_top(stats.get(SERVER, {}), SERVER_NAMES)}"
+    )
+
+
+@router.message(Command("stats"))
+async def stats_command(message: Message, command: CommandObject):
+    """Статистика модерації з агрегованих лічильників"""
+    # У модераторському чаті дозволяємо команду тільки власнику
+    if is_moderator_chat(message.chat.id) and not await is_owner(message.from_user.id):
+        return
+
+    if not await is_owner(message.from_user.id):
+        await message.answer("❌ Ця команда доступна тільки власнику бота!")
+        return
+
+    if (command.args or "").strip() == "rebuild":
+        await rebuild_statistics()
+        logger.info(f"Статистику перераховано власником {message.from_user.id}")
+        await message.answer("✅ Статистику перераховано з таблиць.")
+
+    await message.answer(format_stats(await get_stats()), parse_mode="HTML")
+
+
 @router.message(Command("check_my_rights"))
 async def check_my_rights_command(message: Message):
     """Перевірка своїх прав"""
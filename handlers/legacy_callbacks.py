@@ -0,0 +1,86 @@
+# Обробка кнопок у старому форматі callback_data (до переходу на CallbackData-схеми)
+#
+# Картки модерації та повідомлення "Моя анкета", надіслані до оновлення, лишаються в чатах
+# зі старими рядками на кшталт app_12 чи del_12. Ці обробники підключаються останніми: вони
+# перемальовують повідомлення з новою клавіатурою, щоб наступне натискання пішло вже в нові обробники.
+import logging
+import re
+from typing import Optional
+
+from aiogram import F
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import CallbackQuery
+
+from db.requests import get_application_by_id, get_user_by_id
+from handlers.admin_handlers import get_moderator, format_moderation_card, ALREADY_HANDLED
+from handlers.routing import CallbackRouter
+from keyboards.inline import get_moderation_keyboard, get_application_management_keyboard
+from services.assignment import assignment, moderator_name
+
+logger = logging.getLogger(__name__)
+router = CallbackRouter()
+
+# Старі кнопки під карткою модерації та в процесі відхилення: ID анкети - перша група
+LEGACY_MODERATION = r"^(?:app|rej|conf_rej|cancel_rejection|cancel_custom|reason)_(\d+)(?:_\w+)?$"
+LEGACY_DELETE = r"^del_(\d+)$"
+# Старі кнопки форми анкети (стан форми після перезапуску бота вже втрачено)
+LEGACY_FORM = r"^(?:r|role|a|reg|s)_.+$|^(?:cancel_app|roles_confirm|back_regions|confirm_app)$"
+
+BUTTONS_UPDATED = "🔄 Кнопки оновлено, повторіть дію"
+
+
+async def _holder_name(application_id: int) -> Optional[str]:
+    """Підпис модератора, що орендує анкету (None - анкета вільна)"""
+    holder_id = assignment.holder(application_id)
+    holder = await get_user_by_id(holder_id) if holder_id else None
+    return moderator_name(holder) if holder else None
+
+
+@router.callback_query(F.data.regexp(LEGACY_MODERATION).as_("legacy"))
+async def legacy_moderation_button(callback: CallbackQuery, legacy: re.Match):
+    """Стара картка модерації: перемальовується з актуальною клавіатурою"""
+    if not await get_moderator(callback.from_user.id):
+        await callback.answer("❌ Недостатньо прав!", show_alert=True)
+        return
+
+    application_id = int(legacy.group(1))
+    application = await get_application_by_id(application_id)
+    if not application or application.status != 'pending':
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await callback.answer(ALREADY_HANDLED)
+        return
+
+    moderation_text = await format_moderation_card(application)
+    if moderation_text is None:
+        await callback.answer("❌ Помилка при завантаженні даних анкети!", show_alert=True)
+        return
+    try:
+        await callback.message.edit_text(
+            moderation_text,
+            parse_mode="HTML",
+            reply_markup=get_moderation_keyboard(application_id, await _holder_name(application_id))
+        )
+    except TelegramBadRequest as e:
+        logger.debug(f"Не вдалося перемалювати стару картку анкети #{application_id}: {e}")
+    await callback.answer(BUTTONS_UPDATED)
+
+
+@router.callback_query(F.data.regexp(LEGACY_DELETE).as_("legacy"))
+async def legacy_delete_button(callback: CallbackQuery, legacy: re.Match):
+    """Стара кнопка видалення в "Моя анкета": замінюється новою"""
+    application_id = int(legacy.group(1))
+    application = await get_application_by_id(application_id)
+    if not application:
+        await callback.message.edit_reply_markup(reply_markup=None)
+        await callback.answer("❌ Анкету не знайдено!", show_alert=True)
+        return
+
+    await callback.message.edit_reply_markup(reply_markup=get_application_management_keyboard(application_id))
+    await callback.answer(BUTTONS_UPDATED)
+
+
+@router.callback_query(F.data.regexp(LEGACY_FORM))
+async def legacy_form_button(callback: CallbackQuery):
+    """Стара кнопка незавершеної форми: заповнення потрібно почати заново"""
+    await callback.message.edit_reply_markup(reply_markup=None)
+    await callback.answer("⌛ Ця форма застаріла, почніть заповнення анкети заново", show_alert=True)
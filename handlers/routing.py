@@ -0,0 +1,74 @@
+# Роутер з індексом обробників callback-запитів за префіксом
+from typing import Any, Dict, List, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters.callback_data import CallbackQueryFilter
+from aiogram.types import TelegramObject
+
+# Роздільник CallbackData за замовчуванням
+CALLBACK_SEPARATOR = ":"
+
+
+def _handler_prefix(handler: HandlerObject) -> Optional[str]:
+    """Префікс CallbackData, на який зареєстровано обробник (None - без фільтра схеми)"""
+    for filter_object in handler.filters or []:
+        if isinstance(filter_object.callback, CallbackQueryFilter):
+            return filter_object.callback.callback_data.__prefix__
+    return None
+
+
+class PrefixCallbackObserver(TelegramEventObserver):
+    """Спостерігач callback-запитів, що перевіряє лише обробники з потрібним префіксом"""
+
+    def __init__(self, router: Router, event_name: str) -> None:
+        super().__init__(router=router, event_name=event_name)
+        # Префікс -> обробники в порядку реєстрації (разом з обробниками без префікса)
+        self._candidates: Dict[str, List[HandlerObject]] = {}
+        # Обробники без фільтра схеми (наприклад, F.data == ...)
+        self._fallback: List[HandlerObject] = []
+
+    def register(self, callback, *filters, flags=None, **kwargs):
+        result = super().register(callback, *filters, flags=flags, **kwargs)
+        self._rebuild_index()
+        return result
+
+    def _rebuild_index(self) -> None:
+        """Перебудова таблиці префіксів (лише під час реєстрації обробників)"""
+        prefixes = [_handler_prefix(handler) for handler in self.handlers]
+        self._fallback = [handler for handler, prefix in zip(self.handlers, prefixes) if prefix is None]
+        self._candidates = {
+            prefix: [handler for handler, other in zip(self.handlers, prefixes) if other in (prefix, None)]
+            for prefix in set(prefixes) if prefix is not None
+        }
+
+    async def trigger(self, event: TelegramObject, **kwargs: Any) -> Any:
+        data = getattr(event, "data", None) or ""
+        prefix = data.partition(CALLBACK_SEPARATOR)[0]
+
+        for handler in self._candidates.get(prefix, self._fallback):
+            kwargs["handler"] = handler
+            result, data = await handler.check(event, **kwargs)
+            if result:
+                kwargs.update(data)
+                try:
+                    wrapped_inner = self.outer_middleware.wrap_middlewares(
+                        self._resolve_middlewares(),
+                        handler.call,
+                    )
+                    return await wrapped_inner(event, kwargs)
+                except SkipHandler:
+                    continue
+
+        return UNHANDLED
+
+
+class CallbackRouter(Router):
+    """Router, у якого callback-запити вибираються за таблицею префіксів за O(1)"""
+
+    def __init__(self, *, name: Optional[str] = None) -> None:
+        super().__init__(name=name)
+        self.callback_query = PrefixCallbackObserver(router=self, event_name="callback_query")
+        self.observers["callback_query"] = self.callback_query
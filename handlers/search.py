@@ -0,0 +1,89 @@
+# Спільна логіка пошуку анкет для користувачів та модераторів
+import html
+import itertools
+import json
+from collections import OrderedDict
+from typing import Optional
+
+from db.models import ArchivedApplication
+from db.requests import search_applications
+from keyboards.callbacks import SearchScope
+from keyboards.inline import get_search_pagination_keyboard
+from config import REGIONS
+
+SEARCH_PAGE_SIZE = 5
+# Скільки останніх запитів пам'ятати для гортання сторінок
+MAX_SAVED_QUERIES = 1000
+
+STATUS_LABELS = {
+    'pending': "⏳ на модерації",
+    'approved': "✅ опублікована",
+    'rejected': "❌ відхилена, в архіві",
+    'deleted': "🗑 видалена, в архіві",
+    'expired': "⌛ застаріла, в архіві",
+}
+
+SERVER_NAMES = {code: name for servers in REGIONS.values() for name, code in servers.items()}
+
+# Текст запиту не вміщується в callback_data, тому кнопки посилаються на нього за номером
+_saved_queries: "OrderedDict[int, str]" = OrderedDict()
+_query_tokens = itertools.count(1)
+
+
+def save_query(query: str) -> int:
+    """Запам'ятовує запит і повертає його номер для кнопок пагінації"""
+    token = next(_query_tokens)
+    _saved_queries[token] = query
+    if len(_saved_queries) > MAX_SAVED_QUERIES:
+        _saved_queries.popitem(last=False)
+    return token
+
+
+def get_saved_query(token: int) -> Optional[str]:
+    """Запит за номером (None, якщо він вже витіснений або бот перезапускався)"""
+    return _saved_queries.get(token)
+
+
+def format_search_result(index: int, application, show_status: bool) -> str:
+    """Один рядок результатів пошуку"""
+    try:
+        servers = json.loads(application.server)
+    except (json.JSONDecodeError, TypeError):
+        servers = []
+    server_names = ", ".join(SERVER_NAMES.get(code, code) for code in servers)
+
+    header = f"{index}. 🎮 <b>{html.escape(application.riot_id)}</b>"
+    if show_status:
+        # В архіві власний ID рядка, модераторам показуємо ID анкети
+        application_id = application.application_id if isinstance(application, ArchivedApplication) \
+            else application.id
+        header += f" (#{application_id}, {STATUS_LABELS.get(application.status, application.status)})"
+
+    return (
+        f"{header}\n"
+        f"   🏆 {html.escape(application.rank)} • 🎯 {html.escape(application.role)}\n"
+        f"   🌍 {html.escape(server_names)}\n"
+        f"   📞 {html.escape(application.contact_info)}"
+    )
+
+
+async def render_search_page(query: str, token: int, page: int, scope: SearchScope) -> tuple:
+    """Текст та клавіатура сторінки результатів"""
+    statuses = None if scope == SearchScope.MODERATOR else ['approved']
+    applications, has_next = await search_applications(
+        query, statuses=statuses, limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE
+    )
+
+    if not applications:
+        text = f"🔎 За запитом «{html.escape(query)}» нічого не знайдено."
+        if page == 0:
+            return text, None
+        return text, get_search_pagination_keyboard(scope, token, page, False)
+
+    first_index = page * SEARCH_PAGE_SIZE + 1
+    results = "\n\n".join(
+        format_search_result(first_index + i, application, scope == SearchScope.MODERATOR)
+        for i, application in enumerate(applications)
+    )
+    text = f"🔎 Результати за запитом «{html.escape(query)}» (сторінка {page + 1}):\n\n{results}"
+    return text, get_search_pagination_keyboard(scope, token, page, has_next)
@@ -1,26 +1,41 @@
 # Обробники для звичайних користувачів
 import logging
-from aiogram import F, Router
+from aiogram import F
 from aiogram.types import Message, CallbackQuery
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import re
 import html
-import json
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 
-from db.requests import add_user, create_application, get_user_applications, delete_application, get_application_by_id
+from db.requests import add_user, create_application, get_latest_application, delete_application, get_application_by_id, \
+    find_riot_id_duplicate, extend_application, get_latest_archived_application, get_user_locale, set_user_locale, \
+    set_moderation_message
 from db.models import Application
 from keyboards.reply import get_main_menu, get_cancel_keyboard
 from keyboards.inline import *
-from config import RANKS, ALL_AGENTS, REGIONS, REGION_SHORT_CODES, MODERATOR_CHAT_ID, \
+from keyboards.callbacks import FormCallback, FormAction, RankCallback, RoleCallback, AgentCallback, \
+    RegionCallback, ServerCallback, DeleteApplicationCallback, SearchPageCallback, SearchScope, \
+    ExtendApplicationCallback, LanguageCallback
+from handlers.routing import CallbackRouter
+from handlers.search import save_query, get_saved_query, render_search_page
+from services.assignment import assignment, moderator_name
+from services.audit import audit_log
+from services.channel import remove_from_channel
+from services.moderation_rules import moderation_rules, format_verdict_tags
+from templates.cards import get_cards, LOCALE_NAMES, DEFAULT_LOCALE
+from config import RANKS, ROLES, ALL_AGENTS, REGIONS, REGION_SHORT_CODES, MODERATOR_CHAT_ID, \
     MAX_AGENTS_SELECTION, MAX_ROLES_SELECTION, BOT_OWNER_ID, \
     MAX_BIO_LENGTH, MAX_CONTACT_LENGTH, PUBLIC_CHANNEL_ID, \
-    MAX_RIOT_ID_LENGTH, MAX_RANK_LENGTH, MAX_ROLE_LENGTH
+    MAX_RIOT_ID_LENGTH, MAX_RANK_LENGTH, MAX_ROLE_LENGTH, MODERATION_RULES
 
 logger = logging.getLogger(__name__)
-router = Router()
+router = CallbackRouter()
+
+# Повна назва регіону за коротким кодом
+REGION_NAMES_BY_CODE = {short_code: full_name for full_name, short_code in REGION_SHORT_CODES.items()}
 
 
 class ApplicationForm(StatesGroup):
@@ -58,7 +73,9 @@ async def cmd_start(message: Message, state: FSMContext):
     welcome_text = (
         "👋 Вітаю в боті для пошуку напарників у Valorant!\n\n"
         "Тут ти можеш створити анкету для пошуку гравців твого рівня. "
-        "Після модерації твоя анкета з'явиться в нашому каналі.\n\n"
+        "Після модерації твоя анкета з'явиться в нашому каналі.\n"
+        "🔎 Шукати гравців: /search <текст>\n"
+        "🌐 Мова карток анкет: /language\n\n"
         "💡 Оберіть дію з меню нижче:"
     )
 
@@ -105,28 +122,21 @@ async def start_application(message: Message, state: FSMContext):
     await state.clear()
 
     # Перевіряємо наявність активних анкет
-    user_applications = await get_user_applications(message.from_user.id)
-    if user_applications:
-        # Фільтруємо тільки активні анкети
-        active_applications = [app for app in user_applications if app.status in ['pending', 'approved']]
-
-        if active_applications:
-            latest_app = active_applications[0]
-
-            if latest_app.status == 'pending':
-                await message.answer(
-                    "⏳ У вас вже є анкета, яка очікує на модерацію.\n"
-                    "Зачекайте, поки її перевірять, або видаліть її перед створенням нової.",
-                    reply_markup=get_main_menu()
-                )
-                return
-            elif latest_app.status == 'approved':
-                await message.answer(
-                    "✅ У вас вже є активна опублікована анкета.\n"
-                    "Видаліть її перед створенням нової.",
-                    reply_markup=get_main_menu()
-                )
-                return
+    latest_app = await get_latest_application(message.from_user.id)
+    if latest_app and latest_app.status == 'pending':
+        await message.answer(
+            "⏳ У вас вже є анкета, яка очікує на модерацію.\n"
+            "Зачекайте, поки її перевірять, або видаліть її перед створенням нової.",
+            reply_markup=get_main_menu()
+        )
+        return
+    elif latest_app and latest_app.status == 'approved':
+        await message.answer(
+            "✅ У вас вже є активна опублікована анкета.\n"
+            "Видаліть її перед створенням нової.",
+            reply_markup=get_main_menu()
+        )
+        return
 
     await state.set_state(ApplicationForm.riot_id)
     await message.answer(
@@ -204,6 +214,13 @@ async def process_riot_id(message: Message, state: FSMContext):
         )
         return
 
+    # Рання перевірка: чи не вказано цей Riot ID в активній анкеті іншого акаунта
+    if await find_riot_id_duplicate(riot_id, message.from_user.id):
+        await message.answer(
+            "⚠️ Цей Riot ID вже вказано в іншій активній анкеті.\n"
+            "Якщо це ваш акаунт - продовжуйте, модератори перевірять анкету."
+        )
+
     await state.update_data(riot_id=riot_id)
     await state.set_state(ApplicationForm.age)
     await message.answer(
@@ -253,17 +270,13 @@ async def process_age(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(F.data.startswith("r_"), ApplicationForm.rank)
-async def process_rank(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(RankCallback.filter(), ApplicationForm.rank)
+async def process_rank(callback: CallbackQuery, callback_data: RankCallback, state: FSMContext):
     """Обробка вибору рангу"""
-    try:
-        rank_index = int(callback.data.replace("r_", ""))
-        if rank_index < 0 or rank_index >= len(RANKS):
-            raise ValueError("Invalid rank index")
-        rank = RANKS[rank_index]
-    except (ValueError, IndexError):
+    if not 0 <= callback_data.index < len(RANKS):
         await callback.answer("❌ Помилка обробки даних!", show_alert=True)
         return
+    rank = RANKS[callback_data.index]
 
     # Перевірка довжини рангу
     if len(rank) > MAX_RANK_LENGTH:
@@ -282,10 +295,13 @@ async def process_rank(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("role_"), ApplicationForm.roles)
-async def process_role_selection(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(RoleCallback.filter(), ApplicationForm.roles)
+async def process_role_selection(callback: CallbackQuery, callback_data: RoleCallback, state: FSMContext):
     """Обробка вибору ролей"""
-    role = callback.data.replace("role_", "")
+    if not 0 <= callback_data.index < len(ROLES):
+        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
+        return
+    role = ROLES[callback_data.index]
 
     data = await state.get_data()
     selected_roles = data.get("roles", [])
@@ -307,7 +323,7 @@ async def process_role_selection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data == "roles_confirm", ApplicationForm.roles)
+@router.callback_query(FormCallback.filter(F.action == FormAction.ROLES_CONFIRM), ApplicationForm.roles)
 async def confirm_roles(callback: CallbackQuery, state: FSMContext):
     """Підтвердження вибору ролей"""
     data = await state.get_data()
@@ -334,23 +350,13 @@ async def confirm_roles(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("a_"), ApplicationForm.agents)
-async def process_agent_selection(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(AgentCallback.filter(), ApplicationForm.agents)
+async def process_agent_selection(callback: CallbackQuery, callback_data: AgentCallback, state: FSMContext):
     """Обробка вибору агентів"""
-    agent_data = callback.data.replace("a_", "")
-
-    if agent_data == "confirm":
-        await confirm_agents(callback, state)
-        return
-
-    try:
-        agent_index = int(agent_data)
-        if agent_index < 0 or agent_index >= len(ALL_AGENTS):
-            raise ValueError("Invalid agent index")
-        agent = ALL_AGENTS[agent_index]
-    except (ValueError, IndexError):
+    if not 0 <= callback_data.index < len(ALL_AGENTS):
         await callback.answer("❌ Помилка обробки даних!", show_alert=True)
         return
+    agent = ALL_AGENTS[callback_data.index]
 
     data = await state.get_data()
     selected_agents = data.get("agents", [])
@@ -372,6 +378,7 @@ async def process_agent_selection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@router.callback_query(FormCallback.filter(F.action == FormAction.AGENTS_CONFIRM), ApplicationForm.agents)
 async def confirm_agents(callback: CallbackQuery, state: FSMContext):
     """Підтвердження вибору агентів"""
     data = await state.get_data()
@@ -390,19 +397,14 @@ async def confirm_agents(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML",
         reply_markup=get_regions_keyboard()
     )
+    await callback.answer()
 
 
-@router.callback_query(F.data.startswith("reg_"), ApplicationForm.server_region)
-async def process_region(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(RegionCallback.filter(), ApplicationForm.server_region)
+async def process_region(callback: CallbackQuery, callback_data: RegionCallback, state: FSMContext):
     """Обробка вибору регіону"""
-    region_code = callback.data.replace("reg_", "")
-
     # Знаходимо повну назву регіону по коду
-    region_name = None
-    for full_name, short_code in REGION_SHORT_CODES.items():
-        if short_code == region_code:
-            region_name = full_name
-            break
+    region_name = REGION_NAMES_BY_CODE.get(callback_data.code)
 
     if not region_name:
         await callback.answer("❌ Помилка вибору регіону!", show_alert=True)
@@ -420,7 +422,7 @@ async def process_region(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data == "back_regions", ApplicationForm.server)
+@router.callback_query(FormCallback.filter(F.action == FormAction.BACK_TO_REGIONS), ApplicationForm.server)
 async def back_to_regions(callback: CallbackQuery, state: FSMContext):
     """Повернення до вибору регіону"""
     await state.set_state(ApplicationForm.server_region)
@@ -433,16 +435,10 @@ async def back_to_regions(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("s_"), ApplicationForm.server)
-async def process_server_selection(callback: CallbackQuery, state: FSMContext):
+@router.callback_query(ServerCallback.filter(), ApplicationForm.server)
+async def process_server_selection(callback: CallbackQuery, callback_data: ServerCallback, state: FSMContext):
     """Обробка вибору серверів"""
-    server_data = callback.data.replace("s_", "")
-
-    if server_data == "confirm":
-        await confirm_servers(callback, state)
-        return
-
-    server_code = server_data
+    server_code = callback_data.code
     data = await state.get_data()
     selected_servers = data.get("servers", [])
     region_name = data.get("server_region")
@@ -461,6 +457,7 @@ async def process_server_selection(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
+@router.callback_query(FormCallback.filter(F.action == FormAction.SERVERS_CONFIRM), ApplicationForm.server)
 async def confirm_servers(callback: CallbackQuery, state: FSMContext):
     """Підтвердження вибору серверів"""
     data = await state.get_data()
@@ -493,6 +490,7 @@ async def confirm_servers(callback: CallbackQuery, state: FSMContext):
         "<i>Для скасування створення анкети натисніть кнопку 'Скасувати'</i>",
         parse_mode="HTML"
     )
+    await callback.answer()
 
 
 @router.message(ApplicationForm.bio)
@@ -567,7 +565,7 @@ async def process_contact_info(message: Message, state: FSMContext):
 
     # Формуємо попередній перегляд анкети
     data = await state.get_data()
-    preview_text = format_application_preview(data)
+    preview_text = format_application_preview(data, await get_user_locale(message.from_user.id))
 
     await state.set_state(ApplicationForm.confirmation)
     await message.answer(
@@ -578,7 +576,7 @@ async def process_contact_info(message: Message, state: FSMContext):
     )
 
 
-@router.callback_query(F.data == "confirm_app", ApplicationForm.confirmation)
+@router.callback_query(FormCallback.filter(F.action == FormAction.SEND), ApplicationForm.confirmation)
 async def confirm_application(callback: CallbackQuery, state: FSMContext):
     """Підтвердження та відправлення анкети на модерацію"""
     data = await state.get_data()
@@ -608,19 +606,54 @@ async def confirm_application(callback: CallbackQuery, state: FSMContext):
         await state.clear()
         return
 
+    # Автоперевірка: очевидні порушення відхиляються без модераторів, сумнівні - позначаються на картці
+    verdict = moderation_rules.evaluate(data['riot_id'], data['bio'], data['contact_info']) if MODERATION_RULES else None
+    if verdict and verdict.reject and await delete_application(
+            application.id, status='rejected', reasons=verdict.reasons, only_status='pending', auto=True):
+        audit_log.record(application.id, "auto_reject", None, verdict.reasons)
+        logger.info(f"Анкету #{application.id} відхилено автоперевіркою: {', '.join(verdict.reject)}")
+        reasons_text = "\n• ".join(verdict.reasons)
+        await callback.message.edit_text(
+            f"❌ Анкету відхилено автоматичною перевіркою з наступних причин:\n\n• {reasons_text}\n\n"
+            f"Ви можете створити нову анкету, враховуючи зауваження.",
+            reply_markup=None
+        )
+        await callback.message.answer(
+            "Оберіть дію:",
+            reply_markup=get_main_menu()
+        )
+        await state.clear()
+        await callback.answer()
+        return
+
     # Відправлення в чат модераторів
     from keyboards.inline import get_moderation_keyboard
 
     moderation_text = f"🆕 Нова анкета на модерацію:\n\n{format_application_preview(data)}"
+    if verdict:
+        moderation_text += format_verdict_tags(verdict)
+
+    # Позначка для модераторів, якщо Riot ID вже використовується іншим акаунтом
+    duplicate = await find_riot_id_duplicate(data['riot_id'], callback.from_user.id)
+    if duplicate:
+        moderation_text += format_duplicate_warning(duplicate)
+        logger.info(f"Анкета #{application.id}: Riot ID збігається з анкетою #{duplicate.id}")
+
+    # Анкета одразу закріплюється за найменш завантаженим активним модератором або стає в чергу
+    moderator = await assignment.assign(application.id, application.created_at)
+    holder = moderator_name(moderator) if moderator else None
+    if holder:
+        moderation_text += f"\n\n👤 Призначено: {html.escape(holder)}"
 
     if MODERATOR_CHAT_ID:
         try:
-            await callback.bot.send_message(
+            card = await callback.bot.send_message(
                 MODERATOR_CHAT_ID,
                 moderation_text,
                 parse_mode="HTML",
-                reply_markup=get_moderation_keyboard(application.id)
+                reply_markup=get_moderation_keyboard(application.id, holder)
             )
+            await set_moderation_message(application.id, card.message_id)
             logger.info(
                 f"Анкета #{application.id} створена користувачем {callback.from_user.id} (@{callback.from_user.username or 'немає username'}) та відправлена на модерацію")
         except Exception as e:
@@ -640,7 +673,7 @@ async def confirm_application(callback: CallbackQuery, state: FSMContext):
     await callback.answer()
 
 
-@router.callback_query(F.data == "cancel_app")
+@router.callback_query(FormCallback.filter(F.action == FormAction.CANCEL))
 async def cancel_application_callback(callback: CallbackQuery, state: FSMContext):
     """Скасування створення анкети через інлайн-кнопку"""
     await callback.message.edit_text(
@@ -663,18 +696,31 @@ async def show_my_application(message: Message):
     if is_moderator_chat(message.chat.id):
         return
 
-    user_applications = await get_user_applications(message.from_user.id)
+    latest_application = await get_latest_application(message.from_user.id)
 
-    if not user_applications:
-        await message.answer(
-            "📭 У вас ще немає активних анкет.\n"
-            "Створіть нову анкету за допомогою кнопки 'Подати анкету'.",
-            reply_markup=get_main_menu()
-        )
+    if not latest_application:
+        # Активної анкети немає - пояснюємо, що сталося з попередньою
+        archived = await get_latest_archived_application(message.from_user.id)
+        if archived and archived.status == 'rejected':
+            await message.answer(
+                "❌ Ваша остання анкета була відхилена модератором.\n"
+                "Ви можете створити нову анкету, враховуючи зауваження.",
+                reply_markup=get_main_menu()
+            )
+        elif archived and archived.status == 'expired':
+            await message.answer(
+                "⌛ Вашу останню анкету знято з публікації через давність.\n"
+                "Створіть нову анкету за допомогою кнопки 'Подати анкету'.",
+                reply_markup=get_main_menu()
+            )
+        else:
+            await message.answer(
+                "📭 У вас ще немає активних анкет.\n"
+                "Створіть нову анкету за допомогою кнопки 'Подати анкету'.",
+                reply_markup=get_main_menu()
+            )
         return
 
-    latest_application = user_applications[0]
-
     if latest_application.status == 'pending':
         await message.answer(
             "⏳ Ваша анкета ще на перевірці модераторами.\n"
@@ -682,28 +728,18 @@ async def show_my_application(message: Message):
             reply_markup=get_main_menu()
         )
     elif latest_application.status == 'approved':
-        application_text = format_application_for_channel(latest_application)
+        application_text = latest_application.card(await get_user_locale(message.from_user.id) or DEFAULT_LOCALE)
         await message.answer(
             f"✅ Ваша анкета опублікована:\n\n{application_text}",
             parse_mode="HTML",
             reply_markup=get_application_management_keyboard(latest_application.id)
         )
-    elif latest_application.status == 'rejected':
-        await message.answer(
-            "❌ Ваша остання анкета була відхилена модератором.\n"
-            "Ви можете створити нову анкету, враховуючи зауваження.",
-            reply_markup=get_main_menu()
-        )
 
 
-@router.callback_query(F.data.startswith("del_"))
-async def handle_delete_application(callback: CallbackQuery):
+@router.callback_query(DeleteApplicationCallback.filter())
+async def handle_delete_application(callback: CallbackQuery, callback_data: DeleteApplicationCallback):
     """Видалення анкети"""
-    try:
-        application_id = int(callback.data.replace("del_", ""))
-    except ValueError:
-        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
-        return
+    application_id = callback_data.application_id
 
     # Отримуємо анкету перед видаленням, щоб отримати ID повідомлення в каналі
     application = await get_application_by_id(application_id)
@@ -712,24 +748,20 @@ async def handle_delete_application(callback: CallbackQuery):
         await callback.answer("❌ Анкету не знайдено!", show_alert=True)
         return
 
-    # Видаляємо повідомлення з каналу, якщо воно існує
+    # Прибираємо анкету з каналу: окремий пост видаляється, дайджест редагується
     if application.status == 'approved' and application.channel_message_id and PUBLIC_CHANNEL_ID:
-        try:
-            await callback.bot.delete_message(
-                chat_id=PUBLIC_CHANNEL_ID,
-                message_id=application.channel_message_id
-            )
-            logger.info(f"Повідомлення анкети #{application_id} видалено з каналу")
-        except Exception as e:
-            logger.warning(f"Не вдалося видалити повідомлення з каналу для анкети #{application_id}: {e}")
+        await remove_from_channel(callback.bot, [(application_id, application.channel_message_id)])
+        logger.info(f"Анкету #{application_id} прибрано з каналу")
 
-    # Видаляємо анкету з бази даних
+    # Прибираємо анкету з активних (вона переноситься в архів)
     success = await delete_application(application_id)
 
     if success:
-        logger.info(f"Анкета #{application_id} повністю видалена користувачем {callback.from_user.id}")
+        assignment.release(application_id)
+        audit_log.record(application_id, "delete", application.user_id)
+        logger.info(f"Анкета #{application_id} видалена користувачем {callback.from_user.id}")
         await callback.message.edit_text(
-            "✅ Ваша анкета повністю видалена з бази даних!",
+            "✅ Вашу анкету видалено!",
             reply_markup=None
         )
         # Відправляємо головне меню
@@ -747,83 +779,90 @@ async def handle_delete_application(callback: CallbackQuery):
     await callback.answer()
 
 
-def format_application_preview(data: dict) -> str:
-    """Форматування попереднього перегляду анкети"""
-    # Отримуємо назви серверів
-    server_names = []
-    region_servers = REGIONS.get(data.get('server_region', ''), {})
-    for server_code in data.get('servers', []):
-        for name, code in region_servers.items():
-            if code == server_code:
-                server_names.append(name)
-                break
+@router.callback_query(ExtendApplicationCallback.filter())
+async def handle_extend_application(callback: CallbackQuery, callback_data: ExtendApplicationCallback):
+    """Продовження публікації анкети після попередження"""
+    application_id = callback_data.application_id
+
+    if await extend_application(application_id, callback.from_user.id):
+        logger.info(f"Публікацію анкети #{application_id} продовжено користувачем {callback.from_user.id}")
+        await callback.message.edit_text(
+            "✅ Публікацію анкети продовжено!",
+            reply_markup=None
+        )
+    else:
+        await callback.message.edit_text(
+            "❌ Анкета вже не опублікована. Ви можете подати нову.",
+            reply_markup=None
+        )
 
-    # Екрануємо всі текстові поля
-    riot_id = html.escape(data['riot_id'])
-    age = html.escape(str(data['age']))
-    rank = html.escape(data['rank'])
-    roles = html.escape(', '.join(data['roles']))
-    agents = html.escape(', '.join(data['agents']))
-    servers = html.escape(', '.join(server_names))
-    bio = html.escape(data['bio'])
-    contact_info = html.escape(data['contact_info'])
+    await callback.answer()
 
-    return (
-        f"🎮 <b>Riot ID:</b> {riot_id}\n"
-        f"📅 <b>Вік:</b> {age}\n"
-        f"🏆 <b>Ранг:</b> {rank}\n"
-        f"🎯 <b>Ролі:</b> {roles}\n"
-        f"🦸 <b>Агенти:</b> {agents}\n"
-        f"🌍 <b>Сервери:</b> {servers}\n"
-        f"💬 <b>Про себе:</b> {bio}\n"
-        f"📞 <b>Контакт:</b> {contact_info}"
+
+@router.message(Command("search"), F.chat.id != MODERATOR_CHAT_ID)
+async def cmd_search(message: Message, command: CommandObject):
+    """Пошук серед опублікованих анкет"""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(
+            "🔎 Використання: /search <текст>\n\n"
+            "Наприклад: /search Jett Франкфурт",
+            reply_markup=get_main_menu()
+        )
+        return
+
+    text, keyboard = await render_search_page(query, save_query(query), 0, SearchScope.USER)
+    await message.answer(text, parse_mode="HTML", reply_markup=keyboard)
+
+
+@router.message(Command("language"), F.chat.id != MODERATOR_CHAT_ID)
+async def cmd_language(message: Message):
+    """Вибір мови карток анкет"""
+    await add_user(message.from_user.id, message.from_user.username)
+    locale = await get_user_locale(message.from_user.id) or DEFAULT_LOCALE
+    await message.answer(
+        "🌐 Оберіть мову карток анкет (перегляд вашої анкети та публікація):",
+        reply_markup=get_language_keyboard(locale)
     )
 
 
-def format_application_for_channel(application: Application) -> str:
-    """Форматування анкети для публікації в каналі"""
-    try:
-        agents = json.loads(application.agents)
-        servers = json.loads(application.server)
-    except (json.JSONDecodeError, TypeError):
-        # Fallback на порожні списки якщо JSON не валідний
-        agents = []
-        servers = []
-
-    # Отримуємо назви серверів
-    server_names = []
-    for server_code in servers:
-        for region_name, region_servers in REGIONS.items():
-            for name, code in region_servers.items():
-                if code == server_code:
-                    server_names.append(name)
-                    break
-
-    # Екрануємо всі текстові поля
-    riot_id = html.escape(application.riot_id)
-    rank = html.escape(application.rank)
-    role = html.escape(application.role)
-    agents_str = html.escape(', '.join(agents))
-    servers_str = html.escape(', '.join(server_names))
-    bio = html.escape(application.bio)
-    contact_info = html.escape(application.contact_info)
-
-    # Формуємо окремі хештеги для кожної ролі
-    roles_list = [r.strip() for r in application.role.split(',')]
-    role_hashtags = ' '.join([f"#{html.escape(role.lower().replace(' ', '_'))}" for role in roles_list])
-
-    # Хештег для рангу (тільки перше слово)
-    rank_words = application.rank.split()
-    rank_hashtag = f"#{html.escape(rank_words[0].lower())}" if rank_words else "#rank"
+@router.callback_query(LanguageCallback.filter())
+async def select_language(callback: CallbackQuery, callback_data: LanguageCallback):
+    """Збереження обраної мови"""
+    if callback_data.locale not in LOCALE_NAMES:
+        await callback.answer("❌ Помилка обробки даних!", show_alert=True)
+        return
 
+    await set_user_locale(callback.from_user.id, callback_data.locale)
+    await callback.message.edit_text(
+        f"✅ Мову карток змінено: {LOCALE_NAMES[callback_data.locale]}",
+        reply_markup=None
+    )
+    await callback.answer()
+
+
+@router.callback_query(SearchPageCallback.filter(F.scope == SearchScope.USER))
+async def search_page(callback: CallbackQuery, callback_data: SearchPageCallback):
+    """Гортання сторінок результатів пошуку"""
+    query = get_saved_query(callback_data.token)
+    if query is None:
+        await callback.answer("⌛ Результати пошуку застаріли, повторіть /search", show_alert=True)
+        return
+
+    text, keyboard = await render_search_page(query, callback_data.token, callback_data.page, SearchScope.USER)
+    await callback.message.edit_text(text, parse_mode="HTML", reply_markup=keyboard)
+    await callback.answer()
+
+
+def format_application_preview(data: dict, locale: Optional[str] = None) -> str:
+    """Форматування попереднього перегляду анкети"""
+    return get_cards(locale).preview_card(data)
+
+
+def format_duplicate_warning(duplicate: Application) -> str:
+    """Позначка можливого дубліката для картки модерації"""
+    status_text = "опублікована" if duplicate.status == 'approved' else "на модерації"
     return (
-        f"🎮 <b>Шукаю напарника в Valorant!</b>\n\n"
-        f"👤 <b>Гравець:</b> {riot_id}\n"
-        f"🏆 <b>Ранг:</b> {rank}\n"
-        f"🎯 <b>Ролі:</b> {role}\n"
-        f"🦸 <b>Агенти:</b> {agents_str}\n"
-        f"🌍 <b>Сервери:</b> {servers_str}\n"
-        f"💬 <b>Стиль гри:</b> {bio}\n"
-        f"📞 <b>Зв'язок:</b> {contact_info}\n\n"
-        f"#valorant {role_hashtags} {rank_hashtag}"
-    )
\ No newline at end of file
+        f"\n\n⚠️ <b>Можливий дублікат:</b> цей Riot ID вже вказано в анкеті "
+        f"#{duplicate.id} іншого акаунта ({status_text})"
+    )
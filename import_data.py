@@ -0,0 +1,333 @@
+# Масовий імпорт користувачів та анкет з JSONL або CSV (міграція зі старої Google-форми)
+#
+# Запуск (бот має бути зупинений):
+#   python import_data.py applications.jsonl
+#   python import_data.py export.csv.gz --status pending --dry-run
+#
+# Формат полів збігається з /export, тож вивантаження можна імпортувати назад.
+# Рядок без riot_id лише додає/оновлює користувача.
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from sqlalchemy import select, delete, text, func
+from sqlalchemy.dialects.sqlite import insert
+
+from config import MAX_RIOT_ID_LENGTH, MAX_ROLE_LENGTH, MAX_BIO_LENGTH, MAX_CONTACT_LENGTH, \
+    MAX_USERNAME_LENGTH, MAX_AGENTS_SELECTION, MAX_ROLES_SELECTION, RANKS, ROLES, ALL_AGENTS, REGIONS
+from db.models import User, Application, ArchivedApplication, StatCounter
+from db.requests import engine, create_tables, normalize_riot_id, ACTIVE_STATUSES
+from db.search import setup_search, FTS_TRIGGERS_DDL
+from db.stats import rebuild_stats
+
+# Рядків за одну транзакцію
+IMPORT_BATCH_SIZE = 5000
+# Скільки помилок валідації виводити
+MAX_REPORTED_ERRORS = 50
+
+IMPORT_STATUSES = ACTIVE_STATUSES + ('rejected', 'deleted', 'expired')
+# Ті самі обмеження, що й у формі анкети
+MIN_AGE, MAX_AGE = 13, 100
+RIOT_ID_PATTERN = re.compile(r'^[^#]+#[^#\s]+$')
+
+# Сервер можна вказати кодом або назвою
+_SERVER_CODES = {}
+for _servers in REGIONS.values():
+    for _name, _code in _servers.items():
+        _SERVER_CODES[_code.casefold()] = _code
+        _SERVER_CODES[_name.casefold()] = _code
+
+
+def read_records(path: Path, fmt: Optional[str] = None) -> Iterator[dict]:
+    """Записи файлу по одному (підтримуються .gz файли)"""
+    suffixes = [suffix.lstrip(".") for suffix in path.suffixes]
+    if fmt is None:
+        fmt = next((suffix for suffix in reversed(suffixes) if suffix in ("csv", "jsonl")), "jsonl")
+
+    opener = gzip.open if suffixes and suffixes[-1] == "gz" else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        if fmt == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _text(record: dict, field: str) -> str:
+    value = record.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def _list(value) -> list:
+    """Список з JSON-масиву, списку або рядка через кому"""
+    if isinstance(value, list):
+        return [str(item).strip() for item in value]
+    value = "" if value is None else str(value).strip()
+    if value.startswith("["):
+        return [str(item).strip() for item in json.loads(value)]
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).strip())
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def validate_record(record: dict, default_status: str) -> tuple:
+    """Перевірка запису за обмеженнями config. Повертає (користувач, анкета або None)"""
+    try:
+        telegram_id = int(_text(record, "telegram_id"))
+    except ValueError:
+        raise ValueError("telegram_id має бути числом")
+
+    username = _text(record, "username").lstrip("@") or None
+    if username and len(username) > MAX_USERNAME_LENGTH:
+        raise ValueError(f"username довший за {MAX_USERNAME_LENGTH} символів")
+    user = {"telegram_id": telegram_id, "username": username}
+
+    riot_id = " ".join(_text(record, "riot_id").split())
+    if not riot_id:
+        return user, None
+    if not RIOT_ID_PATTERN.match(riot_id):
+        raise ValueError(f"неправильний Riot ID: {riot_id}")
+    if len(riot_id) > MAX_RIOT_ID_LENGTH:
+        raise ValueError(f"Riot ID довший за {MAX_RIOT_ID_LENGTH} символів")
+
+    status = _text(record, "status") or default_status
+    if status not in IMPORT_STATUSES:
+        raise ValueError(f"невідомий статус: {status}")
+
+    try:
+        age = int(_text(record, "age"))
+    except ValueError:
+        raise ValueError("вік має бути числом")
+    if not MIN_AGE <= age <= MAX_AGE:
+        raise ValueError(f"вік поза межами {MIN_AGE}-{MAX_AGE}")
+
+    rank = _text(record, "rank")
+    if rank not in RANKS:
+        raise ValueError(f"невідомий ранг: {rank}")
+
+    roles = _list(record.get("role"))
+    unknown = [role for role in roles if role not in ROLES]
+    if not roles or unknown or len(roles) > MAX_ROLES_SELECTION:
+        raise ValueError(f"ролі мають бути з ROLES (1-{MAX_ROLES_SELECTION}): {', '.join(roles)}")
+    role = ", ".join(roles)
+    if len(role) > MAX_ROLE_LENGTH:
+        raise ValueError(f"ролі довші за {MAX_ROLE_LENGTH} символів")
+
+    agents = _list(record.get("agents"))
+    unknown = [agent for agent in agents if agent not in ALL_AGENTS]
+    if not agents or unknown or len(agents) > MAX_AGENTS_SELECTION:
+        raise ValueError(f"агенти мають бути з ALL_AGENTS (1-{MAX_AGENTS_SELECTION}): {', '.join(agents)}")
+
+    servers = [_SERVER_CODES.get(server.casefold()) for server in _list(record.get("server"))]
+    if not servers or None in servers:
+        raise ValueError(f"невідомий сервер: {record.get('server')}")
+
+    bio = _text(record, "bio") or "Не вказано"
+    if len(bio) > MAX_BIO_LENGTH:
+        raise ValueError(f"опис довший за {MAX_BIO_LENGTH} символів")
+
+    contact_info = _text(record, "contact_info")
+    if not contact_info or len(contact_info) > MAX_CONTACT_LENGTH:
+        raise ValueError(f"контакт порожній або довший за {MAX_CONTACT_LENGTH} символів")
+
+    now = datetime.now(timezone.utc)
+    try:
+        created_at = _datetime(record.get("created_at")) or now
+        updated_at = _datetime(record.get("updated_at")) or created_at
+    except ValueError:
+        raise ValueError("дата має бути у форматі ISO 8601")
+
+    return user, {
+        "status": status,
+        "riot_id": riot_id,
+        "age": age,
+        "rank": rank,
+        "role": role,
+        "agents": json.dumps(agents),
+        "server": json.dumps(servers),
+        "bio": bio,
+        "contact_info": contact_info,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+class Importer:
+    """Завантаження пакетами: executemany в окремій транзакції на кожен пакет"""
+
+    def __init__(self, default_status: str, batch_size: int = IMPORT_BATCH_SIZE, dry_run: bool = False):
+        self.default_status = default_status
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.users = 0
+        self.applications = 0
+        self.errors = 0
+        # Користувачі з активною анкетою: друга активна анкета не імпортується
+        self._active_users: set = set()
+
+    def _error(self, line: int, message: str) -> None:
+        self.errors += 1
+        if self.errors <= MAX_REPORTED_ERRORS:
+            print(f"Рядок {line}: {message}", file=sys.stderr)
+
+    def prepare(self, conn) -> None:
+        """Вимкнення похідних структур на час завантаження.
+
+        FTS-індекси, вторинні індекси та лічильники перебудовуються в finish(); якщо імпорт
+        перерветься, їх так само відновить create_tables() при наступному запуску бота."""
+        self._active_users = set(conn.execute(select(Application.user_id)).scalars())
+        if self.dry_run:
+            return
+        for ddl in FTS_TRIGGERS_DDL:
+            trigger = ddl.split("EXISTS ", 1)[1].split()[0]
+            conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS applications_fts"))
+        conn.execute(text("DROP TABLE IF EXISTS applications_archive_fts"))
+        for table in (Application.__table__, ArchivedApplication.__table__):
+            for index in table.indexes:
+                index.drop(conn, checkfirst=True)
+        conn.execute(delete(StatCounter))
+        # Скидання відбитка схеми: бот не пропустить перевірку, якщо імпорт перерветься
+        conn.execute(text("PRAGMA user_version = 0"))
+        conn.commit()
+
+    def load_batch(self, conn, batch: list) -> None:
+        """Upsert користувачів за telegram_id та вставка їх анкет"""
+        users = {}
+        for _, user, _ in batch:
+            # Порожній username у файлі не затирає відомий
+            if user["telegram_id"] not in users or user["username"]:
+                users[user["telegram_id"]] = user
+        self.users += len(users)
+        if self.dry_run:
+            user_ids = {telegram_id: -telegram_id for telegram_id in users}
+        else:
+            statement = insert(User)
+            statement = statement.on_conflict_do_update(
+                index_elements=[User.telegram_id],
+                set_={"username": func.coalesce(statement.excluded.username, User.username)}
+            )
+            conn.execute(statement, list(users.values()))
+            user_ids = dict(conn.execute(
+                select(User.telegram_id, User.id).where(User.telegram_id.in_(list(users)))
+            ).all())
+
+        active, archived = [], []
+        for line, user, application in batch:
+            if application is None:
+                continue
+            user_id = user_ids[user["telegram_id"]]
+            if application["status"] in ACTIVE_STATUSES:
+                if user_id in self._active_users:
+                    self._error(line, f"користувач {user['telegram_id']} вже має активну анкету")
+                    continue
+                self._active_users.add(user_id)
+                active.append({**application, "user_id": user_id,
+                               "riot_id_norm": normalize_riot_id(application["riot_id"])})
+            else:
+                # Анкета, що одразу потрапила в архів, не мала ID в applications
+                row = {name: value for name, value in application.items() if name != "updated_at"}
+                archived.append({**row, "user_id": user_id, "application_id": 0,
+                                 "archived_at": application["updated_at"]})
+
+        self.applications += len(active) + len(archived)
+        if self.dry_run:
+            return
+        if active:
+            conn.execute(insert(Application), active)
+        if archived:
+            conn.execute(insert(ArchivedApplication), archived)
+        conn.commit()
+
+    def load(self, conn, records: Iterator[dict]) -> None:
+        """Валідація та завантаження всіх записів"""
+        self.prepare(conn)
+        batch = []
+        for line, record in enumerate(records, start=1):
+            try:
+                user, application = validate_record(record, self.default_status)
+            except (ValueError, TypeError, json.JSONDecodeError) as e:
+                self._error(line, str(e))
+                continue
+            batch.append((line, user, application))
+            if len(batch) >= self.batch_size:
+                self.load_batch(conn, batch)
+                batch = []
+        if batch:
+            self.load_batch(conn, batch)
+        if not self.dry_run:
+            self.finish(conn)
+
+    @staticmethod
+    def finish(conn) -> None:
+        """Перебудова індексів, FTS та лічильників статистики"""
+        for table in (Application.__table__, ArchivedApplication.__table__):
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+        setup_search(conn)
+        rebuild_stats(conn)
+        conn.commit()
+
+
+async def run_import(path: Path, fmt: Optional[str], default_status: str,
+                     batch_size: int, dry_run: bool) -> Importer:
+    """Імпорт файлу в БД з DATABASE_URL"""
+    # Лог кожного пакета SQL лише сповільнить імпорт
+    engine.echo = False
+    await create_tables()
+    importer = Importer(default_status, batch_size, dry_run)
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+        if not dry_run:
+            # WAL та synchronous=NORMAL: один fsync на контрольну точку замість кожної транзакції
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
+
+    try:
+        async with engine.connect() as conn:
+            if not dry_run:
+                await conn.execute(text("PRAGMA synchronous=NORMAL"))
+            await conn.run_sync(importer.load, read_records(path, fmt))
+    finally:
+        if not dry_run and journal_mode != "wal":
+            async with engine.connect() as conn:
+                conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+                await conn.execute(text(f"PRAGMA journal_mode={journal_mode}"))
+        await engine.dispose()
+    return importer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Імпорт користувачів та анкет з JSONL або CSV")
+    parser.add_argument("path", type=Path, help="Файл .jsonl або .csv (можна стиснений .gz)")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="Формат (за замовчуванням - за розширенням)")
+    parser.add_argument("--status", choices=IMPORT_STATUSES, default="approved",
+                        help="Статус анкет, для яких його не вказано у файлі")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="Лише перевірити файл, без запису в БД")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    importer = asyncio.run(run_import(args.path, args.format, args.status, args.batch_size, args.dry_run))
+    action = "Перевірено" if args.dry_run else "Імпортовано"
+    print(f"{action} {importer.users} користувачів та {importer.applications} анкет "
+          f"за {time.perf_counter() - started:.1f} с, помилок: {importer.errors}")
+
+
+if __name__ == "__main__":
+    main()
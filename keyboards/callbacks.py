@@ -0,0 +1,120 @@
+# Типізовані callback-дані інлайн-кнопок
+#
+# Кожна схема має короткий унікальний префікс: за ним CallbackRouter
+# одразу знаходить потрібні обробники, а aiogram сам розбирає та валідує поля.
+from enum import Enum
+
+from aiogram.filters.callback_data import CallbackData
+
+
+class FormAction(str, Enum):
+    """Дії кнопок форми анкети"""
+    ROLES_CONFIRM = "rc"
+    AGENTS_CONFIRM = "ac"
+    SERVERS_CONFIRM = "sc"
+    BACK_TO_REGIONS = "br"
+    SEND = "send"
+    CANCEL = "cancel"
+
+
+class ModerationAction(str, Enum):
+    """Дії модератора під карткою анкети"""
+    APPROVE = "ok"
+    REJECT = "rej"
+    CLAIM = "cl"
+
+
+class RejectionAction(str, Enum):
+    """Дії в процесі відхилення анкети"""
+    CONFIRM = "ok"
+    CANCEL = "cancel"
+    BACK_TO_REASONS = "back"
+
+
+class BroadcastAction(str, Enum):
+    """Керування розсилкою"""
+    CONFIRM = "ok"
+    CANCEL = "cancel"
+    STOP = "stop"
+
+
+class FormCallback(CallbackData, prefix="f"):
+    """Кнопки керування формою (підтвердження кроків, скасування)"""
+    action: FormAction
+
+
+class RankCallback(CallbackData, prefix="r"):
+    """Вибір рангу (індекс в RANKS)"""
+    index: int
+
+
+class RoleCallback(CallbackData, prefix="ro"):
+    """Перемикання ролі (індекс в ROLES)"""
+    index: int
+
+
+class AgentCallback(CallbackData, prefix="a"):
+    """Перемикання агента (індекс в ALL_AGENTS)"""
+    index: int
+
+
+class RegionCallback(CallbackData, prefix="rg"):
+    """Вибір регіону (короткий код з REGION_SHORT_CODES)"""
+    code: str
+
+
+class ServerCallback(CallbackData, prefix="s"):
+    """Перемикання сервера (код сервера з REGIONS)"""
+    code: str
+
+
+class ModerationCallback(CallbackData, prefix="m"):
+    """Схвалення, початок відхилення або взяття анкети в роботу"""
+    action: ModerationAction
+    application_id: int
+
+
+class RejectReasonCallback(CallbackData, prefix="rr"):
+    """Вибір причини відхилення (код з REJECTION_REASONS)"""
+    application_id: int
+    reason: str
+
+
+class RejectionCallback(CallbackData, prefix="rj"):
+    """Підтвердження, скасування відхилення або повернення до причин"""
+    action: RejectionAction
+    application_id: int
+
+
+class DeleteApplicationCallback(CallbackData, prefix="d"):
+    """Видалення власної анкети користувачем"""
+    application_id: int
+
+
+class ExtendApplicationCallback(CallbackData, prefix="ex"):
+    """Продовження публікації анкети після попередження про зняття"""
+    application_id: int
+
+
+class LanguageCallback(CallbackData, prefix="lg"):
+    """Вибір мови карток анкет"""
+    locale: str
+
+
+class BroadcastCallback(CallbackData, prefix="bc"):
+    """Підтвердження, скасування або зупинка розсилки"""
+    action: BroadcastAction
+    broadcast_id: int
+
+
+class SearchScope(str, Enum):
+    """Хто виконує пошук: користувач (лише опубліковані) чи модератор (також анкети на модерації)"""
+    USER = "u"
+    MODERATOR = "m"
+
+
+class SearchPageCallback(CallbackData, prefix="sp"):
+    """Перехід між сторінками результатів пошуку"""
+    scope: SearchScope
+    token: int
+    page: int
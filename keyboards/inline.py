@@ -1,20 +1,28 @@
 # Інлайн клавіатури
+from functools import lru_cache
+from typing import Optional
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 from config import RANKS, ROLES, ALL_AGENTS, REGIONS, REGION_SHORT_CODES, MAX_AGENTS_SELECTION, MAX_ROLES_SELECTION, REJECTION_REASONS
+from keyboards.callbacks import FormCallback, FormAction, RankCallback, RoleCallback, AgentCallback, \
+    RegionCallback, ServerCallback, ModerationCallback, ModerationAction, RejectReasonCallback, \
+    RejectionCallback, RejectionAction, DeleteApplicationCallback, SearchPageCallback, SearchScope, \
+    ExtendApplicationCallback, LanguageCallback, BroadcastCallback, BroadcastAction
+from templates.cards import LOCALES, LOCALE_NAMES
 
 
+# Клавіатури без параметрів будуються один раз і далі повертаються з кешу
+@lru_cache(maxsize=None)
 def get_ranks_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для вибору рангу"""
     builder = InlineKeyboardBuilder()
 
     # Додаємо всі кнопки рангів
-    for rank in RANKS:
-        rank_index = RANKS.index(rank)
-        builder.button(text=rank, callback_data=f"r_{rank_index}")
+    for rank_index, rank in enumerate(RANKS):
+        builder.button(text=rank, callback_data=RankCallback(index=rank_index))
 
     # Додаємо кнопку скасування
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     
     # Налаштовуємо розміщення: ранги по 3 в ряд, кнопка скасування окремо
     # adjust() з параметрами означає: перші len(RANKS) кнопок по 3 в ряд, остання 1 кнопка окремо
@@ -35,13 +43,13 @@ def get_roles_keyboard(selected_roles: list = None) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
     # Додаємо всі ролі
-    for role in ROLES:
+    for role_index, role in enumerate(ROLES):
         prefix = "✅" if role in selected_roles else "☐"
-        builder.button(text=f"{prefix} {role}", callback_data=f"role_{role}")
+        builder.button(text=f"{prefix} {role}", callback_data=RoleCallback(index=role_index))
 
     # Кнопки підтвердження та скасування
-    builder.button(text=f"🔸 Підтвердити вибір (до {MAX_ROLES_SELECTION})", callback_data="roles_confirm")
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text=f"🔸 Підтвердити вибір (до {MAX_ROLES_SELECTION})", callback_data=FormCallback(action=FormAction.ROLES_CONFIRM))
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     
     # Налаштовуємо розміщення: ролі по 2 в ряд, потім дві кнопки по одній в рядку
     num_roles = len(ROLES)
@@ -60,14 +68,13 @@ def get_agents_keyboard(selected_agents: list = None) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
     # Додаємо всіх агентів
-    for agent in ALL_AGENTS:
+    for agent_index, agent in enumerate(ALL_AGENTS):
         prefix = "✅" if agent in selected_agents else "☐"
-        agent_index = ALL_AGENTS.index(agent)
-        builder.button(text=f"{prefix} {agent}", callback_data=f"a_{agent_index}")
+        builder.button(text=f"{prefix} {agent}", callback_data=AgentCallback(index=agent_index))
 
     # Кнопки підтвердження та скасування
-    builder.button(text=f"🔸 Підтвердити вибір (до {MAX_AGENTS_SELECTION})", callback_data="a_confirm")
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text=f"🔸 Підтвердити вибір (до {MAX_AGENTS_SELECTION})", callback_data=FormCallback(action=FormAction.AGENTS_CONFIRM))
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     
     # Налаштовуємо розміщення: агенти по 3 в ряд, потім дві кнопки по одній в рядку
     num_agents = len(ALL_AGENTS)
@@ -78,15 +85,16 @@ def get_agents_keyboard(selected_agents: list = None) -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_regions_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для вибору регіону"""
     builder = InlineKeyboardBuilder()
 
     regions_list = list(REGION_SHORT_CODES.items())
     for region_name, short_code in regions_list:
-        builder.button(text=region_name, callback_data=f"reg_{short_code}")
+        builder.button(text=region_name, callback_data=RegionCallback(code=short_code))
 
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     
     # Налаштовуємо розміщення: регіони по 2 в ряд (якщо можливо), кнопка скасування окремо
     num_regions = len(regions_list)
@@ -112,12 +120,12 @@ def get_servers_keyboard(region_name: str, selected_servers: list = None) -> Inl
     # Додаємо всі сервери
     for server_name, server_code in region_servers.items():
         prefix = "✅" if server_code in selected_servers else "☐"
-        builder.button(text=f"{prefix} {server_name}", callback_data=f"s_{server_code}")
+        builder.button(text=f"{prefix} {server_name}", callback_data=ServerCallback(code=server_code))
 
     # Кнопки дій
-    builder.button(text="🔸 Підтвердити вибір серверів", callback_data="s_confirm")
-    builder.button(text="◀️ Назад до регіонів", callback_data="back_regions")
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text="🔸 Підтвердити вибір серверів", callback_data=FormCallback(action=FormAction.SERVERS_CONFIRM))
+    builder.button(text="◀️ Назад до регіонів", callback_data=FormCallback(action=FormAction.BACK_TO_REGIONS))
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     
     # Налаштовуємо розміщення: всі кнопки по одному в рядку (сервери довгі)
     num_servers = len(region_servers)
@@ -128,24 +136,27 @@ def get_servers_keyboard(region_name: str, selected_servers: list = None) -> Inl
     return builder.as_markup()
 
 
+@lru_cache(maxsize=None)
 def get_confirmation_keyboard() -> InlineKeyboardMarkup:
     """Клавіатура для підтвердження анкети"""
     builder = InlineKeyboardBuilder()
 
-    builder.button(text="✅ Все вірно, відправити", callback_data="confirm_app")
-    builder.button(text="❌ Скасувати", callback_data="cancel_app")
+    builder.button(text="✅ Все вірно, відправити", callback_data=FormCallback(action=FormAction.SEND))
+    builder.button(text="❌ Скасувати", callback_data=FormCallback(action=FormAction.CANCEL))
     builder.adjust(1)
 
     return builder.as_markup()
 
 
-def get_moderation_keyboard(application_id: int) -> InlineKeyboardMarkup:
-    """Клавіатура для модерації"""
+def get_moderation_keyboard(application_id: int, holder: Optional[str] = None) -> InlineKeyboardMarkup:
+    """Клавіатура для модерації (holder - підпис модератора, що взяв анкету в роботу)"""
     builder = InlineKeyboardBuilder()
 
-    builder.button(text="✅ Схвалити", callback_data=f"app_{application_id}")
-    builder.button(text="❌ Відхилити", callback_data=f"rej_{application_id}")
-    builder.adjust(2)
+    builder.button(text="✅ Схвалити", callback_data=ModerationCallback(action=ModerationAction.APPROVE, application_id=application_id))
+    builder.button(text="❌ Відхилити", callback_data=ModerationCallback(action=ModerationAction.REJECT, application_id=application_id))
+    builder.button(text=f"🔒 В роботі: {holder}" if holder else "🙋 Взяти в роботу",
+                   callback_data=ModerationCallback(action=ModerationAction.CLAIM, application_id=application_id))
+    builder.adjust(2, 1)
 
     return builder.as_markup()
 
@@ -155,10 +166,10 @@ def get_rejection_reasons_keyboard(application_id: int) -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
 
     for reason_code, reason_text in REJECTION_REASONS.items():
-        builder.button(text=reason_text, callback_data=f"reason_{application_id}_{reason_code}")
+        builder.button(text=reason_text, callback_data=RejectReasonCallback(application_id=application_id, reason=reason_code))
 
-    builder.button(text="🔸 Підтвердити відхилення", callback_data=f"conf_rej_{application_id}")
-    builder.button(text="❌ Скасувати відхилення", callback_data=f"cancel_rejection_{application_id}")
+    builder.button(text="🔸 Підтвердити відхилення", callback_data=RejectionCallback(action=RejectionAction.CONFIRM, application_id=application_id))
+    builder.button(text="❌ Скасувати відхилення", callback_data=RejectionCallback(action=RejectionAction.CANCEL, application_id=application_id))
     builder.adjust(1)
 
     return builder.as_markup()
@@ -168,7 +179,7 @@ def get_custom_reason_keyboard(application_id: int) -> InlineKeyboardMarkup:
     """Клавіатура для введення своєї причини"""
     builder = InlineKeyboardBuilder()
 
-    builder.button(text="◀️ Назад до вибору причин", callback_data=f"cancel_custom_{application_id}")
+    builder.button(text="◀️ Назад до вибору причин", callback_data=RejectionCallback(action=RejectionAction.BACK_TO_REASONS, application_id=application_id))
     builder.adjust(1)
 
     return builder.as_markup()
@@ -178,7 +189,68 @@ def get_application_management_keyboard(application_id: int) -> InlineKeyboardMa
     """Клавіатура для керування анкетою"""
     builder = InlineKeyboardBuilder()
 
-    builder.button(text="🗑️ Видалити анкету", callback_data=f"del_{application_id}")
+    builder.button(text="🗑️ Видалити анкету", callback_data=DeleteApplicationCallback(application_id=application_id))
     builder.adjust(1)
 
-    return builder.as_markup()
\ No newline at end of file
+    return builder.as_markup()
+
+
+def get_expiry_warning_keyboard(application_id: int) -> InlineKeyboardMarkup:
+    """Клавіатура попередження про зняття анкети з публікації"""
+    builder = InlineKeyboardBuilder()
+
+    builder.button(text="🔄 Продовжити публікацію", callback_data=ExtendApplicationCallback(application_id=application_id))
+    builder.button(text="🗑️ Видалити анкету", callback_data=DeleteApplicationCallback(application_id=application_id))
+    builder.adjust(1)
+
+    return builder.as_markup()
+
+
+def get_language_keyboard(current: str) -> InlineKeyboardMarkup:
+    """Клавіатура вибору мови карток"""
+    builder = InlineKeyboardBuilder()
+
+    for locale in LOCALES:
+        text = f"✅ {LOCALE_NAMES[locale]}" if locale == current else LOCALE_NAMES[locale]
+        builder.button(text=text, callback_data=LanguageCallback(locale=locale))
+    builder.adjust(len(LOCALES))
+
+    return builder.as_markup()
+
+
+def get_broadcast_confirm_keyboard(broadcast_id: int) -> InlineKeyboardMarkup:
+    """Клавіатура підтвердження розсилки"""
+    builder = InlineKeyboardBuilder()
+
+    builder.button(text="✅ Надіслати",
+                   callback_data=BroadcastCallback(action=BroadcastAction.CONFIRM, broadcast_id=broadcast_id))
+    builder.button(text="❌ Скасувати",
+                   callback_data=BroadcastCallback(action=BroadcastAction.CANCEL, broadcast_id=broadcast_id))
+    builder.adjust(2)
+
+    return builder.as_markup()
+
+
+def get_broadcast_progress_keyboard(broadcast_id: int) -> InlineKeyboardMarkup:
+    """Кнопка зупинки розсилки під повідомленням з прогресом"""
+    builder = InlineKeyboardBuilder()
+    builder.button(text="⏹ Зупинити",
+                   callback_data=BroadcastCallback(action=BroadcastAction.STOP, broadcast_id=broadcast_id))
+    return builder.as_markup()
+
+
+def get_search_pagination_keyboard(scope: SearchScope, token: int, page: int,
+                                   has_next: bool) -> Optional[InlineKeyboardMarkup]:
+    """Клавіатура для гортання результатів пошуку"""
+    if page == 0 and not has_next:
+        return None
+
+    builder = InlineKeyboardBuilder()
+
+    if page > 0:
+        builder.button(text="◀️ Назад", callback_data=SearchPageCallback(scope=scope, token=token, page=page - 1))
+    if has_next:
+        builder.button(text="Далі ▶️", callback_data=SearchPageCallback(scope=scope, token=token, page=page + 1))
+    builder.adjust(2)
+
+    return builder.as_markup()
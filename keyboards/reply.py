@@ -1,6 +1,8 @@
 # Реплай клавіатури
+from functools import lru_cache
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
 
+@lru_cache(maxsize=None)
 def get_main_menu() -> ReplyKeyboardMarkup:
     """Головне меню"""
     keyboard = [
@@ -9,6 +11,7 @@ def get_main_menu() -> ReplyKeyboardMarkup:
     ]
     return ReplyKeyboardMarkup(keyboard=keyboard, resize_keyboard=True)
 
+@lru_cache(maxsize=None)
 def get_cancel_keyboard() -> ReplyKeyboardMarkup:
     """Клавіатура для скасування під час заповнення анкети"""
     keyboard = [
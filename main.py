@@ -1,14 +1,28 @@
 # Головний файл бота
 import asyncio
 import logging
+import time
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from aiogram import Bot, Dispatcher
 from aiogram.fsm.storage.memory import MemoryStorage
 
-from config import BOT_TOKEN
+from config import BOT_TOKEN, BOT_OWNER_ID, MODERATOR_CHAT_ID, RECORD_UPDATES_PATH, RECORD_UPDATES_SALT, THROTTLING, \
+    THROTTLE_MESSAGE_RATE, THROTTLE_MESSAGE_BURST, THROTTLE_CALLBACK_RATE, THROTTLE_CALLBACK_BURST, \
+    THROTTLE_EVICT_INTERVAL
 from db.requests import create_tables
-from handlers import user_handlers, admin_handlers
+from handlers import user_handlers, admin_handlers, legacy_callbacks
+from keyboards import inline, reply
+from middlewares.recorder import UpdateRecorderMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from middlewares.usernames import UsernameRefreshMiddleware
+from services.scheduler import scheduler
+from services.audit import audit_log
+from services.handoff import handoff
+from services.expiry import schedule_expiry
+from services.maintenance import schedule_maintenance
+from services.channel import schedule_digest
+from services.assignment import assignment, schedule_claims
 
 
 # Налаштування логування
@@ -55,6 +69,94 @@ def setup_logging():
     logging.getLogger("asyncio").setLevel(logging.WARNING)
 
 
+async def start_scheduler(bot: Bot) -> None:
+    """Запуск планувальника та реєстрація періодичних завдань"""
+    await scheduler.start(bot=bot)
+    await schedule_expiry()
+    await schedule_maintenance()
+    await schedule_digest()
+    await schedule_claims()
+
+
+async def is_privileged(telegram_id: int) -> bool:
+    """Власник або модератор (не підпадають під обмеження частоти)"""
+    return await admin_handlers.is_owner(telegram_id) or await admin_handlers.is_moderator(telegram_id)
+
+
+def warm_keyboards() -> None:
+    """Побудова статичних клавіатур до першого апдейту"""
+    inline.get_ranks_keyboard()
+    inline.get_regions_keyboard()
+    inline.get_confirmation_keyboard()
+    reply.get_main_menu()
+    reply.get_cancel_keyboard()
+
+
+async def warm_up(bot: Bot) -> None:
+    """Паралельний прогрів кешів: профіль бота, модератори, черга модерації, клавіатури"""
+    started = time.perf_counter()
+    await asyncio.gather(
+        bot.me(),
+        admin_handlers.warm_moderator_cache(),
+        assignment.load(),
+        asyncio.to_thread(warm_keyboards),
+    )
+    logging.getLogger(__name__).info(f"Кеші прогріто за {(time.perf_counter() - started) * 1000:.0f} мс")
+
+
+def create_dispatcher() -> Dispatcher:
+    """Створення диспетчера з усіма роутерами"""
+    storage = MemoryStorage()
+    dp = Dispatcher(storage=storage)
+
+    # Облік апдейтів, що обробляються (для плавного перезапуску)
+    dp.update.outer_middleware(handoff.tracker)
+
+    # Запис трафіку для подальшого реплею
+    if RECORD_UPDATES_PATH:
+        recorder = UpdateRecorderMiddleware(
+            RECORD_UPDATES_PATH,
+            RECORD_UPDATES_SALT,
+            meta={"owner_id": BOT_OWNER_ID, "moderator_chat_id": MODERATOR_CHAT_ID}
+        )
+        dp.update.outer_middleware(recorder)
+        dp.shutdown.register(recorder.close)
+
+    # Актуальні username (для /add_moderator @username) пишуться пакетами, а не на кожен апдейт
+    usernames = UsernameRefreshMiddleware()
+    dp.update.outer_middleware(usernames)
+
+    # Ліміти на користувача окремо для повідомлень і кнопок; власник і модератори не обмежуються
+    if THROTTLING:
+        dp.message.outer_middleware(ThrottlingMiddleware(
+            THROTTLE_MESSAGE_RATE, THROTTLE_MESSAGE_BURST, THROTTLE_EVICT_INTERVAL, exempt=is_privileged
+        ))
+        dp.callback_query.outer_middleware(ThrottlingMiddleware(
+            THROTTLE_CALLBACK_RATE, THROTTLE_CALLBACK_BURST, THROTTLE_EVICT_INTERVAL, exempt=is_privileged
+        ))
+
+    # Фонові завдання запускаються разом з polling
+    dp.startup.register(warm_up)
+    dp.startup.register(start_scheduler)
+    dp.startup.register(audit_log.start)
+    dp.startup.register(usernames.start)
+    # Стан попереднього процесу відновлюється останнім, безпосередньо перед polling
+    dp.startup.register(handoff.restore)
+    # Спочатку дочікуємось апдейтів, що обробляються: вони ще можуть ставити завдання та писати журнал
+    dp.shutdown.register(handoff.drain)
+    dp.shutdown.register(scheduler.stop)
+    dp.shutdown.register(usernames.close)
+    # Журнал пишеться останнім, щоб зберегти події зупинених завдань
+    dp.shutdown.register(audit_log.close)
+    dp.shutdown.register(handoff.save)
+
+    dp.include_router(user_handlers.router)
+    dp.include_router(admin_handlers.router)
+    # Кнопки старого формату - останніми, після всіх актуальних обробників
+    dp.include_router(legacy_callbacks.router)
+    return dp
+
+
 async def main():
     """Головна функція запуску бота"""
     # Налаштовуємо логування перед запуском
@@ -66,16 +168,18 @@ async def main():
 
     # Створюємо бота та диспетчер
     bot = Bot(token=BOT_TOKEN)
-    storage = MemoryStorage()
-    dp = Dispatcher(storage=storage)
-
-    # Створюємо таблиці в базі даних
-    await create_tables()
-    logger.info("Таблиці бази даних перевірено/створено")
-
-    # Реєструємо роутери
-    dp.include_router(user_handlers.router)
-    dp.include_router(admin_handlers.router)
+    dp = create_dispatcher()
+
+    # Створюємо таблиці в базі даних (якщо схема не змінилась - лише читання її версії)
+    started = time.perf_counter()
+    migrated = await create_tables()
+    elapsed = (time.perf_counter() - started) * 1000
+    if migrated:
+        logger.info(f"Таблиці бази даних перевірено/створено за {elapsed:.0f} мс")
+    else:
+        logger.info(f"Схема бази даних актуальна, перевірку пропущено ({elapsed:.0f} мс)")
+
+    # Роутери реєструються в create_dispatcher()
     logger.info("Роутери зареєстровано")
 
     # Запускаємо бота
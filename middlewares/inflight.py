@@ -0,0 +1,59 @@
+# Middleware обліку апдейтів, що обробляються, для плавного перезапуску
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Ключ у data, яким позначаються апдейти, повторені з попереднього процесу
+REPLAY_KEY = "handoff_replay"
+
+
+class InFlightMiddleware(BaseMiddleware):
+    """Відстежує незавершені апдейти та відкидає ті, що вже оброблені попереднім процесом"""
+
+    def __init__(self):
+        self._in_flight: Dict[int, Update] = {}
+        self._idle = asyncio.Event()
+        self._idle.set()
+        # Найбільший отриманий update_id
+        self.last_update_id = 0
+        # Апдейти з ID не більше цього вже оброблено (або збережено) попереднім процесом.
+        # Telegram повторює їх, бо зсув getUpdates підтверджується лише наступним запитом
+        self.skip_through = 0
+
+    @property
+    def in_flight(self) -> list:
+        """Апдейти, обробка яких ще не завершилась"""
+        return list(self._in_flight.values())
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        if event.update_id <= self.skip_through and not data.get(REPLAY_KEY):
+            logger.debug(f"Апдейт {event.update_id} вже оброблено до перезапуску")
+            return None
+
+        self.last_update_id = max(self.last_update_id, event.update_id)
+        self._in_flight[event.update_id] = event
+        self._idle.clear()
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.pop(event.update_id, None)
+            if not self._in_flight:
+                self._idle.set()
+
+    async def drain(self, timeout: float) -> list:
+        """Очікування завершення обробки; повертає апдейти, що не встигли завершитись"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.in_flight
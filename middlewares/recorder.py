@@ -0,0 +1,100 @@
+# Middleware для запису вхідного трафіку апдейтів
+import gzip
+import hashlib
+import hmac
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+logger = logging.getLogger(__name__)
+
+# Ключі, під якими в апдейті лежать користувачі та чати
+PERSON_KEYS = {"from", "user", "chat", "sender_chat", "forward_from", "new_chat_member", "old_chat_member"}
+# Поля, які замінюються псевдонімами
+NAME_FIELDS = ("username", "first_name", "last_name")
+# Скидати буфер gzip на диск кожні N записів
+FLUSH_EVERY = 50
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """Записує апдейти у стиснений JSONL з послідовною псевдонімізацією користувачів"""
+
+    def __init__(self, path: str, salt: str, meta: dict = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._key = salt.encode()
+        self._pseudonyms: Dict[int, int] = {}
+        self._pending = 0
+        # Новий gzip-член дописується в кінець файлу, тому запис можна продовжувати після рестарту
+        self._file = gzip.open(self.path, "at", encoding="utf-8")
+        self._write_line({"meta": {"started_at": time.time(), **self.pseudonymize_meta(meta or {})}})
+
+    def pseudonym(self, telegram_id: int) -> int:
+        """Стабільний псевдонім для ID користувача (HMAC від солі)"""
+        pseudonym = self._pseudonyms.get(telegram_id)
+        if pseudonym is None:
+            digest = hmac.new(self._key, str(telegram_id).encode(), hashlib.sha256).digest()
+            pseudonym = int.from_bytes(digest[:6], "big") + 1
+            self._pseudonyms[telegram_id] = pseudonym
+        return pseudonym
+
+    def pseudonymize_meta(self, meta: dict) -> dict:
+        """ID власника теж псевдонімізується, щоб реплей впізнав його команди"""
+        if meta.get("owner_id"):
+            meta = {**meta, "owner_id": self.pseudonym(meta["owner_id"])}
+        return meta
+
+    def _scrub(self, value: Any, parent_key: str = "") -> Any:
+        """Рекурсивна заміна ID та імен користувачів (групові чати з від'ємними ID не змінюються)"""
+        if isinstance(value, dict):
+            result = {key: self._scrub(item, key) for key, item in value.items()}
+            if parent_key in PERSON_KEYS:
+                person_id = result.get("id")
+                if isinstance(person_id, int) and person_id > 0:
+                    pseudonym = self.pseudonym(person_id)
+                    result["id"] = pseudonym
+                    for field in NAME_FIELDS:
+                        if field in result:
+                            result[field] = f"u{pseudonym}"
+            return result
+        if isinstance(value, list):
+            return [self._scrub(item, parent_key) for item in value]
+        return value
+
+    def _write_line(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+
+    def record(self, update: Update) -> None:
+        """Запис одного апдейту з часовою міткою"""
+        payload = update.model_dump(mode="json", exclude_none=True, by_alias=True)
+        self._write_line({"ts": round(time.time(), 3), "update": self._scrub(payload)})
+
+        self._pending += 1
+        if self._pending >= FLUSH_EVERY:
+            self._file.flush()
+            self._pending = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        try:
+            self.record(event)
+        except Exception as e:
+            # Запис трафіку ніколи не повинен ламати обробку апдейтів
+            logger.warning(f"Не вдалося записати апдейт {event.update_id}: {e}")
+        return await handler(event, data)
+
+    async def close(self) -> None:
+        """Закриття файлу запису"""
+        if not self._file.closed:
+            self._file.close()
+            logger.info(f"Запис апдейтів збережено в {self.path}")
@@ -0,0 +1,88 @@
+# Middleware захисту від флуду: ліміт частоти апдейтів на користувача
+#
+# Для кожного користувача - відро токенів (burst токенів, поповнення rate за секунду).
+# Апдейт без вільного токена відкидається ще до FSM та обробників. Відра зберігаються
+# у звичайному словнику; повні відра (користувач давно нічого не надсилав) періодично видаляються.
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.exceptions import TelegramAPIError
+from aiogram.types import CallbackQuery, Message, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+THROTTLED_TEXT = "⏳ Занадто швидко, зачекайте секунду"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Token bucket на користувача для одного типу апдейтів (повідомлення або callback-запити)"""
+
+    def __init__(self, rate: float, burst: int, evict_interval: float,
+                 exempt: Optional[Callable[[int], Awaitable[bool]]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.evict_interval = evict_interval
+        # Перевірка винятку (модератори) - викликається лише для користувачів без вільних токенів
+        self.exempt = exempt
+        # user_id -> [токени, час останнього поповнення, чи вже попереджено про ліміт]
+        self._buckets: Dict[int, list] = {}
+        self._evicted_at = time.monotonic()
+        self.dropped = 0
+
+    def _take(self, user_id: int, now: float) -> bool:
+        """Списання токена; False - ліміт вичерпано"""
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            self._buckets[user_id] = [self.burst - 1, now, False]
+            return True
+
+        bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True
+        return False
+
+    def _evict(self, now: float) -> None:
+        """Видалення відер, що вже поповнились до повного (стан не відрізняється від відсутнього)"""
+        idle = self.burst / self.rate
+        stale = [user_id for user_id, bucket in self._buckets.items() if now - bucket[1] >= idle]
+        for user_id in stale:
+            del self._buckets[user_id]
+        self._evicted_at = now
+
+    async def _notify(self, event: TelegramObject, bucket: list) -> None:
+        """Одна підказка за серію відкинутих апдейтів; callback-запит завжди закривається"""
+        warn = not bucket[2]
+        bucket[2] = True
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(THROTTLED_TEXT if warn else None)
+            elif warn and isinstance(event, Message):
+                await event.answer(THROTTLED_TEXT)
+        except TelegramAPIError as e:
+            logger.debug(f"Не вдалося повідомити про ліміт: {e}")
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        now = time.monotonic()
+        if now - self._evicted_at >= self.evict_interval:
+            self._evict(now)
+
+        if self._take(user.id, now) or (self.exempt and await self.exempt(user.id)):
+            return await handler(event, data)
+
+        self.dropped += 1
+        await self._notify(event, self._buckets[user.id])
+        return None
@@ -0,0 +1,79 @@
+# Middleware оновлення username користувачів
+#
+# Username з кожного апдейту порівнюється з останнім відомим у пам'яті; змінені збираються
+# в буфер і пишуться одним пакетним UPDATE за інтервалом, а не окремим запитом на апдейт.
+# Незареєстровані користувачі (не натискали /start) в таблицю users не додаються.
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from config import USERNAME_FLUSH_INTERVAL, USERNAME_CACHE_SIZE
+from db.requests import update_usernames
+
+logger = logging.getLogger(__name__)
+
+
+class UsernameRefreshMiddleware(BaseMiddleware):
+    """Збирає зміни username з апдейтів і періодично записує їх пакетом"""
+
+    def __init__(self, flush_interval: float = USERNAME_FLUSH_INTERVAL, cache_size: int = USERNAME_CACHE_SIZE):
+        self.flush_interval = flush_interval
+        self.cache_size = cache_size
+        # telegram_id -> останній записаний (або поставлений у чергу) username
+        self._known: Dict[int, Optional[str]] = {}
+        # telegram_id -> username, що ще не записано в БД
+        self._pending: Dict[int, Optional[str]] = {}
+        self._worker: Optional[asyncio.Task] = None
+
+    def observe(self, telegram_id: int, username: Optional[str]) -> None:
+        """Облік username з апдейту; в чергу потрапляють лише нові для процесу значення"""
+        if telegram_id in self._known and self._known[telegram_id] == username:
+            return
+        if len(self._known) >= self.cache_size:
+            # Після очищення кожен користувач один раз піде в пакет, UPDATE не перезапише незмінені рядки
+            self._known.clear()
+        self._known[telegram_id] = username
+        self._pending[telegram_id] = username
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is not None and not user.is_bot:
+            self.observe(user.id, user.username)
+        return await handler(event, data)
+
+    async def flush(self) -> int:
+        """Запис накопичених змін (повертає кількість змінених рядків); при помилці зміни повертаються в буфер"""
+        usernames, self._pending = self._pending, {}
+        if not usernames:
+            return 0
+        try:
+            changed = await update_usernames(usernames)
+        except Exception as e:
+            logger.error(f"Помилка при оновленні {len(usernames)} username: {e}", exc_info=True)
+            # Новіші значення, що надійшли під час запису, мають пріоритет
+            self._pending = {**usernames, **self._pending}
+            return 0
+        return changed
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        """Запуск періодичного запису (startup-хук диспетчера)"""
+        self._worker = asyncio.create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Зупинка та запис залишку буфера (shutdown-хук диспетчера)"""
+        if self._worker:
+            self._worker.cancel()
+        await self.flush()
@@ -0,0 +1,182 @@
+# Розподіл анкет на модерації між модераторами
+#
+# Нова анкета одразу віддається в оренду найменш завантаженому активному модератору
+# (той, хто модерував протягом MODERATOR_ACTIVE_MINUTES), інакше стає в чергу. Черга - купа
+# за часом подачі, тож /next видає анкету, що чекає найдовше. Оренда діє CLAIM_LEASE_MINUTES:
+# поки вона не минула, рішення щодо анкети може прийняти лише модератор, що її взяв.
+# Прострочені оренди періодично повертаються в чергу. Джерело істини - колонки claimed_by та
+# claim_expires_at (умовне оновлення), купа та лічильники в пам'яті - лише індекс для вибору.
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from config import CLAIM_LEASE_MINUTES, CLAIM_CHECK_INTERVAL, MODERATOR_ACTIVE_MINUTES, MAX_CLAIMS_PER_MODERATOR, \
+    MODERATOR_CHAT_ID
+from db.models import User
+from db.requests import get_pending_applications, claim_application, release_expired_claims
+from keyboards.inline import get_moderation_keyboard
+from services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+CLAIMS_JOB = "release_expired_claims"
+
+
+def _timestamp(value: datetime) -> float:
+    """SQLite повертає дати без часового поясу - вважаємо їх UTC"""
+    return (value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value).timestamp()
+
+
+def moderator_name(moderator: User) -> str:
+    """Підпис модератора на картці анкети"""
+    return f"@{moderator.username}" if moderator.username else f"ID {moderator.telegram_id}"
+
+
+class Assignment:
+    """Черга анкет на модерації та оренди модераторів"""
+
+    def __init__(self, lease_minutes: float = CLAIM_LEASE_MINUTES, active_minutes: float = MODERATOR_ACTIVE_MINUTES,
+                 max_claims: int = MAX_CLAIMS_PER_MODERATOR):
+        self.lease = timedelta(minutes=lease_minutes)
+        self.active_window = active_minutes * 60
+        self.max_claims = max_claims
+        # Купа (час подачі, ID анкети) вільних анкет; видалені з черги записи пропускаються при витяганні
+        self._heap: list = []
+        self._queued: set = set()
+        # ID анкети -> users.id модератора, що її орендує
+        self._claims: Dict[int, int] = {}
+        # users.id -> (модератор, час останньої дії)
+        self._active: Dict[int, tuple] = {}
+
+    async def load(self) -> None:
+        """Відновлення черги та оренд з БД при старті"""
+        now = time.time()
+        self._heap, self._queued, self._claims = [], set(), {}
+        for application in await get_pending_applications():
+            if application.claimed_by and application.claim_expires_at and \
+                    _timestamp(application.claim_expires_at) > now:
+                self._claims[application.id] = application.claimed_by
+            else:
+                self._push(application.id, application.created_at)
+        logger.info(f"Черга модерації: {len(self._queued)} вільних анкет, {len(self._claims)} в роботі")
+
+    def _push(self, application_id: int, created_at: datetime) -> None:
+        if application_id in self._queued:
+            return
+        self._queued.add(application_id)
+        heapq.heappush(self._heap, (_timestamp(created_at), application_id))
+
+    def load_of(self, moderator_id: int) -> int:
+        """Кількість анкет в оренді модератора"""
+        return sum(1 for holder in self._claims.values() if holder == moderator_id)
+
+    def touch(self, moderator: User) -> None:
+        """Позначка активності модератора (будь-яка дія з анкетами)"""
+        self._active[moderator.id] = (moderator, time.monotonic())
+
+    def forget_moderator(self, moderator_id: int) -> None:
+        """Модератор втратив права: нові анкети йому не призначаються"""
+        self._active.pop(moderator_id, None)
+
+    def active_moderators(self) -> list:
+        """Модератори, що діяли протягом MODERATOR_ACTIVE_MINUTES"""
+        threshold = time.monotonic() - self.active_window
+        return [moderator for moderator, seen in self._active.values() if seen >= threshold]
+
+    def pick_moderator(self) -> Optional[User]:
+        """Найменш завантажений активний модератор з вільним місцем (None - всі зайняті або неактивні)"""
+        candidates = [(self.load_of(moderator.id), moderator) for moderator in self.active_moderators()]
+        candidates = [(load, moderator) for load, moderator in candidates if load < self.max_claims]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda item: item[0])[1]
+
+    def holder(self, application_id: int) -> Optional[int]:
+        """users.id модератора, що орендує анкету (None - вільна)"""
+        return self._claims.get(application_id)
+
+    async def claim(self, application_id: int, moderator: User) -> bool:
+        """Оренда анкети модератором; False - анкету вже взяв інший модератор або її опрацьовано"""
+        self.touch(moderator)
+        if not await claim_application(application_id, moderator.id,
+                                       datetime.now(timezone.utc) + self.lease):
+            return False
+        self._queued.discard(application_id)
+        self._claims[application_id] = moderator.id
+        return True
+
+    async def assign(self, application_id: int, created_at: datetime) -> Optional[User]:
+        """Нова анкета: оренда найменш завантаженому активному модератору або постановка в чергу"""
+        moderator = self.pick_moderator()
+        if moderator and await claim_application(application_id, moderator.id,
+                                                 datetime.now(timezone.utc) + self.lease):
+            self._claims[application_id] = moderator.id
+            logger.info(f"Анкету #{application_id} призначено модератору {moderator.telegram_id}")
+            return moderator
+        self._push(application_id, created_at)
+        return None
+
+    async def next_for(self, moderator: User) -> Optional[int]:
+        """Оренда анкети, що чекає найдовше; None - черга порожня"""
+        self.touch(moderator)
+        while self._heap:
+            _, application_id = heapq.heappop(self._heap)
+            if application_id not in self._queued:
+                continue
+            self._queued.discard(application_id)
+            if await self.claim(application_id, moderator):
+                return application_id
+        return None
+
+    def queue_size(self) -> int:
+        """Кількість вільних анкет у черзі"""
+        return len(self._queued)
+
+    def oldest_wait(self) -> Optional[float]:
+        """Скільки секунд чекає найстаріша вільна анкета"""
+        while self._heap and self._heap[0][1] not in self._queued:
+            heapq.heappop(self._heap)
+        return time.time() - self._heap[0][0] if self._heap else None
+
+    def release(self, application_id: int) -> None:
+        """Анкету опрацьовано або видалено: вона зникає з черги та оренд"""
+        self._queued.discard(application_id)
+        self._claims.pop(application_id, None)
+
+    async def release_expired(self, bot: Bot) -> int:
+        """Повернення прострочених оренд у чергу з оновленням кнопок на картках"""
+        rows = await release_expired_claims(datetime.now(timezone.utc))
+        for row in rows:
+            self._claims.pop(row.id, None)
+            self._push(row.id, row.created_at)
+            if row.moderation_message_id and MODERATOR_CHAT_ID:
+                try:
+                    await bot.edit_message_reply_markup(
+                        chat_id=MODERATOR_CHAT_ID,
+                        message_id=row.moderation_message_id,
+                        reply_markup=get_moderation_keyboard(row.id)
+                    )
+                except TelegramAPIError as e:
+                    logger.debug(f"Не вдалося оновити картку анкети #{row.id}: {e}")
+        if rows:
+            logger.info(f"Повернуто в чергу модерації {len(rows)} анкет з минулою орендою")
+        return len(rows)
+
+
+assignment = Assignment()
+
+
+@scheduler.task(CLAIMS_JOB)
+async def claims_job(bot: Bot) -> None:
+    """Періодичне повернення прострочених оренд"""
+    await assignment.release_expired(bot)
+
+
+async def schedule_claims() -> None:
+    """Реєстрація періодичної перевірки оренд"""
+    await scheduler.schedule(CLAIMS_JOB, key=CLAIMS_JOB, interval=CLAIM_CHECK_INTERVAL)
@@ -0,0 +1,80 @@
+# Журнал рішень модерації з пакетним записом
+#
+# Обробники лише додають подію в буфер (без звернення до БД), а запис відбувається
+# одним INSERT на пакет: за інтервалом або при накопиченні AUDIT_BATCH_SIZE подій.
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from config import AUDIT_FLUSH_INTERVAL, AUDIT_BATCH_SIZE
+from db.requests import add_moderation_events
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """Буфер подій moderation_events"""
+
+    def __init__(self, flush_interval: float = AUDIT_FLUSH_INTERVAL, batch_size: int = AUDIT_BATCH_SIZE):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._buffer: list = []
+        self._flushing: Optional[asyncio.Task] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def record(self, application_id: int, action: str, actor_id: Optional[int] = None,
+               reasons: Optional[list] = None) -> None:
+        """Додавання події (actor_id - users.id, None для дій системи)"""
+        self._buffer.append({
+            "application_id": application_id,
+            "actor_id": actor_id,
+            "action": action,
+            "reasons": json.dumps(reasons, ensure_ascii=False) if reasons else None,
+            "created_at": datetime.now(timezone.utc),
+        })
+        if len(self._buffer) >= self.batch_size and not (self._flushing and not self._flushing.done()):
+            self._flushing = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """Запис накопичених подій; при помилці вони повертаються в буфер"""
+        events, self._buffer = self._buffer, []
+        if not events:
+            return 0
+        try:
+            await add_moderation_events(events)
+        except Exception as e:
+            logger.error(f"Помилка при записі {len(events)} подій журналу модерації: {e}", exc_info=True)
+            self._buffer[:0] = events
+            return 0
+        return len(events)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self) -> None:
+        """Запуск періодичного запису (startup-хук диспетчера)"""
+        self._worker = asyncio.create_task(self._flush_loop())
+
+    def snapshot(self) -> list:
+        """Забирає незаписані події у JSON-сумісному вигляді (для передачі наступному процесу)"""
+        events, self._buffer = self._buffer, []
+        return [{**event, "created_at": event["created_at"].isoformat()} for event in events]
+
+    def restore(self, events: list) -> None:
+        """Повернення подій зі знімка в буфер (будуть записані наступним пакетом)"""
+        self._buffer[:0] = [{**event, "created_at": datetime.fromisoformat(event["created_at"])} for event in events]
+
+    async def close(self) -> None:
+        """Зупинка та запис залишку буфера (shutdown-хук диспетчера)"""
+        if self._worker:
+            self._worker.cancel()
+        if self._flushing:
+            await asyncio.gather(self._flushing, return_exceptions=True)
+        await self.flush()
+
+
+audit_log = AuditLog()
@@ -0,0 +1,135 @@
+# Розсилка власника всім користувачам бота
+#
+# Отримувачі читаються сторінками за users.id (keyset), відправка йде через кілька
+# паралельних воркерів під спільним обмеженням швидкості. Результати пишуться пакетами
+# разом з курсором, тому після падіння чи перезапуску завдання продовжує з місця зупинки
+# (повторно може отримати повідомлення лише останній незаписаний пакет). Кожна сторінка -
+# окремий запуск завдання, тож між сторінками воркер планувальника дістається іншим завданням.
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramForbiddenError
+
+from config import BROADCAST_RATE, BROADCAST_WORKERS, BROADCAST_BATCH_SIZE
+from db.requests import get_broadcast, get_broadcast_recipients, record_broadcast_deliveries, finish_broadcast
+from keyboards.inline import get_broadcast_progress_keyboard
+from services.rate_limit import RateLimiter
+from services.scheduler import scheduler, Continuation
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_JOB = "broadcast"
+BROADCAST_PAGE_SIZE = 500     # Отримувачів на одну сторінку з БД
+PROGRESS_INTERVAL = 3         # Мінімум секунд між оновленнями повідомлення з прогресом
+
+broadcast_limiter = RateLimiter(BROADCAST_RATE)
+
+
+def broadcast_key(broadcast_id: int) -> str:
+    """Ключ завдання розсилки (одне завдання на розсилку)"""
+    return f"{BROADCAST_JOB}:{broadcast_id}"
+
+
+def format_progress(broadcast, done: bool = False) -> str:
+    """Текст повідомлення з прогресом розсилки"""
+    processed = broadcast.sent + broadcast.blocked + broadcast.failed
+    if done and broadcast.status == 'cancelled':
+        title = f"⏹ Розсилку #{broadcast.id} зупинено"
+    elif done:
+        title = f"✅ Розсилку #{broadcast.id} завершено"
+    else:
+        title = f"📣 Розсилка #{broadcast.id}"
+    return (
+        f"{title}: {processed}/{broadcast.total}\n"
+        f"✅ Доставлено: {broadcast.sent}, 🚫 заблокували бота: {broadcast.blocked}, ❌ помилок: {broadcast.failed}"
+    )
+
+
+async def _report_progress(bot: Bot, broadcast, done: bool = False) -> None:
+    if not broadcast.message_id:
+        return
+    try:
+        await bot.edit_message_text(
+            format_progress(broadcast, done),
+            chat_id=broadcast.chat_id,
+            message_id=broadcast.message_id,
+            reply_markup=None if done else get_broadcast_progress_keyboard(broadcast.id)
+        )
+    except TelegramAPIError as e:
+        logger.warning(f"Не вдалося оновити прогрес розсилки #{broadcast.id}: {e}")
+
+
+async def _deliver(bot: Bot, semaphore: asyncio.Semaphore, telegram_id: int, text: str) -> str:
+    """Відправка одному користувачу. Повертає статус доставки: sent, blocked або failed"""
+    async with semaphore:
+        try:
+            await broadcast_limiter.call(bot.send_message, telegram_id, text, parse_mode=None)
+            return 'sent'
+        except TelegramForbiddenError:
+            # Бота заблоковано або акаунт видалено
+            return 'blocked'
+        except TelegramAPIError as e:
+            logger.warning(f"Помилка розсилки користувачу {telegram_id}: {e}")
+            return 'failed'
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int) -> bool:
+    """Відправка однієї сторінки отримувачів з місця, на якому розсилка зупинилась.
+
+    Повертає True, якщо залишились отримувачі для наступного запуску."""
+    broadcast = await get_broadcast(broadcast_id)
+    if not broadcast or broadcast.status != 'running':
+        return False
+
+    semaphore = asyncio.Semaphore(BROADCAST_WORKERS)
+    cursor = broadcast.cursor
+    reported_at = 0.0
+    logger.debug(f"Розсилка #{broadcast_id}: сторінка з курсора {cursor}")
+
+    recipients = await get_broadcast_recipients(cursor, BROADCAST_PAGE_SIZE)
+    for start in range(0, len(recipients), BROADCAST_BATCH_SIZE):
+        # Зупинку власником перевіряємо перед кожним пакетом
+        broadcast = await get_broadcast(broadcast_id)
+        if broadcast.status != 'running':
+            logger.info(f"Розсилку #{broadcast_id} зупинено на курсорі {cursor}")
+            await _report_progress(bot, broadcast, done=True)
+            return False
+
+        chunk = recipients[start:start + BROADCAST_BATCH_SIZE]
+        statuses = await asyncio.gather(
+            *(_deliver(bot, semaphore, recipient.telegram_id, broadcast.text) for recipient in chunk)
+        )
+        cursor = chunk[-1].id
+        await record_broadcast_deliveries(
+            broadcast_id, [(recipient.id, status) for recipient, status in zip(chunk, statuses)], cursor
+        )
+
+        if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+            reported_at = time.monotonic()
+            await _report_progress(bot, await get_broadcast(broadcast_id))
+
+    if len(recipients) == BROADCAST_PAGE_SIZE:
+        return True
+
+    await finish_broadcast(broadcast_id)
+    broadcast = await get_broadcast(broadcast_id)
+    logger.info(f"Розсилку #{broadcast_id} завершено: доставлено {broadcast.sent}, "
+                f"заблокували {broadcast.blocked}, помилок {broadcast.failed}")
+    await _report_progress(bot, broadcast, done=True)
+    return False
+
+
+@scheduler.task(BROADCAST_JOB)
+async def broadcast_job(bot: Bot, broadcast_id: int) -> Optional[Continuation]:
+    """Завдання розсилки: одна сторінка за запуск, курсор зберігається в broadcasts"""
+    if await run_broadcast(bot, broadcast_id):
+        return Continuation({"broadcast_id": broadcast_id})
+    return None
+
+
+async def schedule_broadcast(broadcast_id: int) -> None:
+    """Постановка розсилки в чергу фонових завдань"""
+    await scheduler.schedule(BROADCAST_JOB, {"broadcast_id": broadcast_id}, key=broadcast_key(broadcast_id))
@@ -0,0 +1,246 @@
+# Публікація анкет у публічному каналі: окремі пости та дайджести
+#
+# У режимі дайджесту схвалені анкети чекають у черзі (publish_queued_at) і виходять
+# спільними повідомленнями кожні DIGEST_INTERVAL секунд або після DIGEST_MAX_ITEMS анкет.
+# Кожна анкета зберігає ID свого повідомлення, тож при її видаленні дайджест редагується.
+#
+# Хеш тексту поста зберігається разом з анкетою, тому /resync_channel редагує лише
+# пости, текст яких змінився, а перерваний прохід після повтору пропускає вже оновлені.
+# Прохід іде сторінками: кожна - окремий запуск завдання, щоб не займати воркер планувальника годинами.
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+
+from config import PUBLIC_CHANNEL_ID, CHANNEL_RATE, DIGEST_MODE, DIGEST_INTERVAL, DIGEST_MAX_ITEMS, \
+    MESSAGE_MAX_LENGTH, CHANNEL_LOCALE
+from db.models import Application
+from db.requests import queue_publication, count_queued_publications, get_queued_publications, mark_published, \
+    get_channel_entries, set_channel_content_hash, count_channel_messages, get_channel_message_ids
+from services.rate_limit import RateLimiter
+from services.scheduler import scheduler, Continuation
+from templates.cards import get_cards
+
+logger = logging.getLogger(__name__)
+
+DIGEST_JOB = "publish_digest"
+# Позачерговий дайджест при накопиченні DIGEST_MAX_ITEMS анкет
+DIGEST_FLUSH_KEY = "publish_digest_now"
+DIGEST_HEADER = get_cards(CHANNEL_LOCALE).digest_header + "\n\n"
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+# Анкет за одну вибірку з черги
+DIGEST_FETCH_LIMIT = 100
+
+RESYNC_JOB = "resync_channel"
+# Постів за одну сторінку обходу (після кожної оновлюється прогрес)
+RESYNC_PAGE_SIZE = 50
+
+# Bot API дозволяє видалити до 100 повідомлень одним запитом
+DELETE_MESSAGES_LIMIT = 100
+
+channel_limiter = RateLimiter(CHANNEL_RATE)
+# Дайджест публікується одним виконавцем, інакше анкета могла б вийти двічі
+_publish_lock = asyncio.Lock()
+
+
+def format_application_for_channel(application: Application, locale: str = CHANNEL_LOCALE) -> str:
+    """Картка анкети для публікації в каналі"""
+    return get_cards(locale).channel_card(application)
+
+
+def content_hash(text: str) -> str:
+    """Короткий хеш тексту поста"""
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def format_digest(applications: list) -> str:
+    """Текст поста з анкетами (одна анкета виглядає як звичайний пост)"""
+    if len(applications) == 1:
+        return format_application_for_channel(applications[0])
+    return DIGEST_HEADER + DIGEST_SEPARATOR.join(format_application_for_channel(a) for a in applications)
+
+
+def split_digest(applications: list) -> list:
+    """Розбиття анкет на групи, текст кожної з яких вміщується в одне повідомлення"""
+    groups, current, length = [], [], len(DIGEST_HEADER)
+    for application in applications:
+        entry_length = len(format_application_for_channel(application))
+        extra = entry_length + (len(DIGEST_SEPARATOR) if current else 0)
+        if current and length + extra > MESSAGE_MAX_LENGTH:
+            groups.append(current)
+            current, length = [], len(DIGEST_HEADER)
+            extra = entry_length
+        current.append(application)
+        length += extra
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def queue_for_digest(application_id: int) -> None:
+    """Постановка схваленої анкети в чергу; при заповненні черги дайджест виходить одразу"""
+    await queue_publication(application_id)
+    if await count_queued_publications() >= DIGEST_MAX_ITEMS:
+        await scheduler.schedule(DIGEST_JOB, key=DIGEST_FLUSH_KEY)
+
+
+async def publish_digest(bot: Bot) -> int:
+    """Публікація всіх анкет з черги; повертає кількість опублікованих"""
+    published = 0
+    async with _publish_lock:
+        while True:
+            applications = await get_queued_publications(DIGEST_FETCH_LIMIT)
+            for group in split_digest(applications):
+                text = format_digest(group)
+                message = await channel_limiter.call(bot.send_message, PUBLIC_CHANNEL_ID, text, parse_mode="HTML")
+                # Позначаємо одразу: при помилці наступної групи ці анкети не вийдуть повторно
+                await mark_published([application.id for application in group], message.message_id,
+                                     content_hash(text))
+                published += len(group)
+
+            if len(applications) < DIGEST_FETCH_LIMIT:
+                break
+
+    if published:
+        logger.info(f"Дайджест: опубліковано {published} анкет в канал {PUBLIC_CHANNEL_ID}")
+    return published
+
+
+@scheduler.task(DIGEST_JOB)
+async def digest_job(bot: Bot) -> None:
+    """Періодичне (та позачергове) завдання публікації дайджесту"""
+    await publish_digest(bot)
+
+
+async def schedule_digest() -> None:
+    """Реєстрація (або скасування) періодичного дайджесту відповідно до DIGEST_MODE"""
+    if DIGEST_MODE and PUBLIC_CHANNEL_ID:
+        await scheduler.schedule(DIGEST_JOB, key=DIGEST_JOB, interval=DIGEST_INTERVAL)
+        logger.info(f"Режим дайджесту увімкнено: кожні {DIGEST_INTERVAL // 60} хв або {DIGEST_MAX_ITEMS} анкет")
+        return
+
+    await scheduler.cancel(DIGEST_JOB)
+    # Анкети, що залишились у черзі після вимкнення режиму, публікуємо останнім дайджестом
+    if PUBLIC_CHANNEL_ID and await count_queued_publications():
+        await scheduler.schedule(DIGEST_JOB, key=DIGEST_FLUSH_KEY)
+
+
+async def delete_channel_messages(bot: Bot, message_ids: list) -> None:
+    """Видалення постів з каналу пакетами в межах ліміту"""
+    for start in range(0, len(message_ids), DELETE_MESSAGES_LIMIT):
+        batch = message_ids[start:start + DELETE_MESSAGES_LIMIT]
+        try:
+            await channel_limiter.call(bot.delete_messages, PUBLIC_CHANNEL_ID, batch)
+        except TelegramAPIError as e:
+            logger.warning(f"Не вдалося видалити {len(batch)} повідомлень з каналу: {e}")
+
+
+async def remove_from_channel(bot: Bot, applications: list) -> None:
+    """Прибирання анкет з каналу перед їх архівацією.
+
+    applications - пари (ID анкети, ID повідомлення). Повідомлення, в якому не залишилось
+    інших анкет, видаляється, а дайджест з іншими анкетами редагується без прибраних."""
+    removed_ids = [application_id for application_id, _ in applications]
+    message_ids = list({message_id for _, message_id in applications if message_id})
+    if not message_ids:
+        return
+
+    remaining = await get_channel_entries(message_ids, removed_ids)
+    await delete_channel_messages(bot, [message_id for message_id in message_ids if message_id not in remaining])
+
+    for message_id, entries in remaining.items():
+        try:
+            await channel_limiter.call(_edit_post, bot, message_id, entries)
+        except TelegramAPIError as e:
+            logger.warning(f"Не вдалося оновити дайджест {message_id} у каналі: {e}")
+
+
+async def _edit_post(bot: Bot, message_id: int, entries: Optional[list] = None) -> bool:
+    """Редагування поста за поточними анкетами; False, якщо текст не змінився.
+
+    Без entries анкети читаються безпосередньо перед запитом, щоб не повернути в пост
+    анкету, яку прибрали, поки запит чекав на слот ліміту."""
+    if entries is None:
+        entries = (await get_channel_entries([message_id], [])).get(message_id)
+        if not entries:
+            return False
+
+    text = format_digest(entries)
+    try:
+        await bot.edit_message_text(text, chat_id=PUBLIC_CHANNEL_ID, message_id=message_id, parse_mode="HTML")
+        edited = True
+    except TelegramBadRequest as e:
+        if "message is not modified" not in str(e):
+            raise
+        edited = False
+    await set_channel_content_hash([application.id for application in entries], content_hash(text))
+    return edited
+
+
+async def _report_progress(bot: Bot, chat_id: Optional[int], message_id: Optional[int], text: str) -> None:
+    if not chat_id or not message_id:
+        return
+    try:
+        await bot.edit_message_text(text, chat_id=chat_id, message_id=message_id)
+    except TelegramAPIError as e:
+        logger.warning(f"Не вдалося оновити прогрес оновлення постів: {e}")
+
+
+async def resync_page(bot: Bot, chat_id: Optional[int] = None, message_id: Optional[int] = None, after: int = 0,
+                      processed: int = 0, total: Optional[int] = None, counts: Optional[dict] = None) -> Optional[dict]:
+    """Перерендер однієї сторінки постів після after з прогресом у повідомленні message_id.
+
+    Повертає стан обходу для наступної сторінки (None - всі пости пройдено)."""
+    if total is None:
+        total = await count_channel_messages()
+    counts = counts or {"edited": 0, "unchanged": 0, "failed": 0}
+
+    message_ids = await get_channel_message_ids(after, RESYNC_PAGE_SIZE)
+    if message_ids:
+        entries = await get_channel_entries(message_ids, [])
+        for post_id in message_ids:
+            post_entries = entries.get(post_id)
+            processed += 1
+            if not post_entries:
+                continue
+            # Незмінені пости не витрачають запитів до Telegram
+            new_hash = content_hash(format_digest(post_entries))
+            if all(application.channel_content_hash == new_hash for application in post_entries):
+                counts["unchanged"] += 1
+                continue
+            try:
+                edited = await channel_limiter.call(_edit_post, bot, post_id)
+            except TelegramAPIError as e:
+                logger.warning(f"Не вдалося оновити пост {post_id} у каналі: {e}")
+                counts["failed"] += 1
+                continue
+            counts["edited" if edited else "unchanged"] += 1
+
+    if len(message_ids) == RESYNC_PAGE_SIZE:
+        await _report_progress(
+            bot, chat_id, message_id,
+            f"🔄 Оновлення постів: {processed}/{total}\n"
+            f"✏️ Змінено: {counts['edited']}, без змін: {counts['unchanged']}, помилок: {counts['failed']}"
+        )
+        return {"chat_id": chat_id, "message_id": message_id, "after": message_ids[-1],
+                "processed": processed, "total": total, "counts": counts}
+
+    logger.info(f"Оновлення постів у каналі завершено: {counts}")
+    await _report_progress(
+        bot, chat_id, message_id,
+        f"✅ Оновлення постів завершено ({total})\n"
+        f"✏️ Змінено: {counts['edited']}, без змін: {counts['unchanged']}, помилок: {counts['failed']}"
+    )
+    return None
+
+
+@scheduler.task(RESYNC_JOB)
+async def resync_job(bot: Bot, **progress) -> Optional[Continuation]:
+    """Завдання /resync_channel: одна сторінка постів за запуск, далі - продовження з курсора after"""
+    state = await resync_page(bot, **progress)
+    if state is not None:
+        return Continuation(state)
+    return None
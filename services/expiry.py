@@ -0,0 +1,114 @@
+# Автоматичне зняття з публікації застарілих анкет
+import logging
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
+
+from config import APPLICATION_TTL_DAYS, APPLICATION_EXPIRY_WARNING_DAYS, EXPIRY_CHECK_INTERVAL, \
+    EXPIRY_BATCH_SIZE, USER_NOTIFY_RATE, PUBLIC_CHANNEL_ID
+from db.requests import get_applications_to_warn, mark_expiry_warned, get_expired_applications, \
+    expire_applications
+from keyboards.inline import get_expiry_warning_keyboard
+from services.rate_limit import RateLimiter
+from services.scheduler import scheduler
+from services.audit import audit_log
+from services.channel import remove_from_channel
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_JOB = "expire_applications"
+
+notify_limiter = RateLimiter(USER_NOTIFY_RATE)
+
+
+async def _notify(bot: Bot, telegram_id: int, text: str, **kwargs) -> None:
+    """Особисте повідомлення власнику анкети (помилки лише логуються)"""
+    try:
+        await notify_limiter.call(bot.send_message, telegram_id, text, **kwargs)
+    except TelegramAPIError as e:
+        logger.warning(f"Помилка при сповіщенні користувача {telegram_id} про зняття анкети: {e}")
+
+
+async def warn_expiring(bot: Bot, now: datetime) -> int:
+    """Попередження власників анкет, які незабаром буде знято з публікації"""
+    cutoff = now - timedelta(days=APPLICATION_TTL_DAYS - APPLICATION_EXPIRY_WARNING_DAYS)
+    warned = 0
+
+    while True:
+        rows = await get_applications_to_warn(cutoff, EXPIRY_BATCH_SIZE)
+        if not rows:
+            return warned
+
+        for row in rows:
+            await _notify(
+                bot,
+                row.telegram_id,
+                f"⏰ Вашу анкету буде знято з публікації через {APPLICATION_EXPIRY_WARNING_DAYS} дн.\n"
+                f"Якщо ви ще шукаєте команду, продовжіть публікацію.",
+                reply_markup=get_expiry_warning_keyboard(row.id)
+            )
+        await mark_expiry_warned([row.id for row in rows])
+        warned += len(rows)
+
+        if len(rows) < EXPIRY_BATCH_SIZE:
+            return warned
+
+
+async def expire_stale(bot: Bot, now: datetime) -> int:
+    """Зняття з публікації анкет, старших за APPLICATION_TTL_DAYS"""
+    cutoff = now - timedelta(days=APPLICATION_TTL_DAYS)
+    # Без попередження анкету не знімаємо: власник має отримати його щонайменше за WARNING_DAYS
+    warned_before = now - timedelta(days=APPLICATION_EXPIRY_WARNING_DAYS) if APPLICATION_EXPIRY_WARNING_DAYS else None
+    expired = 0
+    seen = set()
+
+    while True:
+        rows = [row for row in await get_expired_applications(cutoff, warned_before, EXPIRY_BATCH_SIZE)
+                if row.id not in seen]
+        if not rows:
+            return expired
+        seen.update(row.id for row in rows)
+
+        # Спочатку пости: якщо процес впаде, наступний прохід повторить видалення
+        if PUBLIC_CHANNEL_ID:
+            await remove_from_channel(bot, [(row.id, row.channel_message_id) for row in rows])
+
+        expired += await expire_applications([row.id for row in rows])
+
+        for row in rows:
+            audit_log.record(row.id, "expire")
+            await _notify(
+                bot,
+                row.telegram_id,
+                f"⌛ Вашу анкету знято з публікації, бо вона не оновлювалась {APPLICATION_TTL_DAYS} дн.\n"
+                f"Ви можете подати нову анкету будь-коли."
+            )
+
+        if len(rows) < EXPIRY_BATCH_SIZE:
+            return expired
+
+
+async def run_expiry(bot: Bot) -> dict:
+    """Один прохід: попередження та зняття з публікації"""
+    now = datetime.now(timezone.utc)
+    warned = await warn_expiring(bot, now) if APPLICATION_EXPIRY_WARNING_DAYS else 0
+    expired = await expire_stale(bot, now)
+    if warned or expired:
+        logger.info(f"Застарілі анкети: попереджено {warned}, знято з публікації {expired}")
+    return {"warned": warned, "expired": expired}
+
+
+@scheduler.task(EXPIRY_JOB)
+async def expiry_job(bot: Bot) -> None:
+    """Періодичне завдання планувальника"""
+    await run_expiry(bot)
+
+
+async def schedule_expiry() -> None:
+    """Реєстрація (або скасування) періодичної перевірки відповідно до APPLICATION_TTL_DAYS"""
+    if APPLICATION_TTL_DAYS:
+        await scheduler.schedule(EXPIRY_JOB, key=EXPIRY_JOB, interval=EXPIRY_CHECK_INTERVAL)
+        logger.info(f"Зняття анкет старших за {APPLICATION_TTL_DAYS} дн. увімкнено")
+    else:
+        await scheduler.cancel(EXPIRY_JOB)
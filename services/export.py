@@ -0,0 +1,100 @@
+# Потоковий експорт анкет у стиснений CSV або JSONL
+#
+# Рядки читаються сторінками та одразу пишуться у gzip-файл на диску,
+# тому пам'ять не залежить від розміру таблиці.
+import csv
+import gzip
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Optional
+
+from db.requests import stream_applications
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_STATUSES = ("pending", "approved", "rejected", "deleted", "expired")
+EXPORT_FIELDS = ("id", "status", "telegram_id", "username", "riot_id", "age", "rank", "role", "agents",
+                 "server", "bio", "contact_info", "created_at", "updated_at")
+# Bot API приймає документи від бота до 50 МБ
+EXPORT_MAX_FILE_SIZE = 50 * 1024 * 1024
+
+
+class ExportArgs:
+    """Параметри /export: формат, статуси та проміжок дат подачі"""
+
+    def __init__(self, fmt: str = "csv", statuses: Optional[list] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.fmt = fmt
+        self.statuses = statuses
+        self.since = since
+        self.until = until
+
+
+def parse_export_args(args: Optional[str]) -> ExportArgs:
+    """Розбір аргументів: [csv|jsonl] [статуси через кому] [з YYYY-MM-DD] [по YYYY-MM-DD]"""
+    result = ExportArgs()
+    dates = []
+    for token in (args or "").split():
+        if token.lower() in EXPORT_FORMATS:
+            result.fmt = token.lower()
+        elif token[:1].isdigit():
+            try:
+                dates.append(datetime.strptime(token, "%Y-%m-%d"))
+            except ValueError:
+                raise ValueError(f"Невірна дата: {token} (очікується YYYY-MM-DD)")
+        else:
+            statuses = [status.strip().lower() for status in token.split(",") if status.strip()]
+            unknown = [status for status in statuses if status not in EXPORT_STATUSES]
+            if unknown:
+                raise ValueError(f"Невідомий статус: {', '.join(unknown)}")
+            result.statuses = statuses
+
+    if len(dates) > 2:
+        raise ValueError("Вкажіть не більше двох дат: початок і кінець проміжку")
+    if dates:
+        result.since = dates[0]
+    if len(dates) == 2:
+        # Кінцева дата включно
+        result.until = dates[1] + timedelta(days=1)
+    return result
+
+
+def _export_row(row) -> dict:
+    """Рядок БД у словник полів експорту"""
+    values = {field: getattr(row, field) for field in EXPORT_FIELDS}
+    for field in ("created_at", "updated_at"):
+        if values[field] is not None:
+            values[field] = values[field].isoformat()
+    return values
+
+
+async def write_export(args: ExportArgs) -> tuple:
+    """Запис експорту в тимчасовий .gz файл. Повертає (шлях, кількість рядків)"""
+    fd, path = tempfile.mkstemp(suffix=f".{args.fmt}.gz")
+    os.close(fd)
+    count = 0
+    try:
+        with gzip.open(path, "wt", encoding="utf-8", newline="") as file:
+            writer = None
+            if args.fmt == "csv":
+                writer = csv.DictWriter(file, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+
+            async for row in stream_applications(args.statuses, args.since, args.until):
+                values = _export_row(row)
+                if writer:
+                    writer.writerow(values)
+                else:
+                    # agents та server зберігаються як JSON - віддаємо їх списками
+                    for field in ("agents", "server"):
+                        try:
+                            values[field] = json.loads(values[field])
+                        except (json.JSONDecodeError, TypeError):
+                            pass
+                    file.write(json.dumps(values, ensure_ascii=False) + "\n")
+                count += 1
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, count
@@ -0,0 +1,130 @@
+# Передача стану наступному процесу бота при перезапуску (деплой, SIGTERM)
+#
+# Після сигналу aiogram припиняє отримувати апдейти, а shutdown-хуки чекають на завершення
+# їх обробки (не довше HANDOFF_DRAIN_TIMEOUT) і зберігають у стиснений файл стан FSM,
+# незавершені апдейти та незаписані події журналу. Новий процес відновлює їх у startup-хуку,
+# до початку polling, і пише в лог час від зупинки попереднього процесу до готовності.
+import asyncio
+import dataclasses
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Update
+
+from config import HANDOFF_PATH, HANDOFF_DRAIN_TIMEOUT
+from middlewares.inflight import InFlightMiddleware, REPLAY_KEY
+from services.audit import audit_log
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+def _dump_fsm(storage) -> list:
+    """Непорожні записи MemoryStorage як [ключ, стан, дані]"""
+    if not isinstance(storage, MemoryStorage):
+        return []
+    records = []
+    for key, record in storage.storage.items():
+        if record.state is None and not record.data:
+            continue
+        entry = [dataclasses.asdict(key), record.state, record.data]
+        try:
+            json.dumps(entry)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Стан FSM {key.chat_id}/{key.user_id} не збережено: {e}")
+            continue
+        records.append(entry)
+    return records
+
+
+def _load_fsm(storage, records: list) -> int:
+    if not isinstance(storage, MemoryStorage):
+        return 0
+    for key, state, data in records:
+        record = storage.storage[StorageKey(**key)]
+        record.state = state
+        record.data = data
+    return len(records)
+
+
+class Handoff:
+    """Знімок стану процесу для наступного запуску"""
+
+    def __init__(self, path: str = HANDOFF_PATH, drain_timeout: float = HANDOFF_DRAIN_TIMEOUT):
+        self.path = Path(path)
+        self.drain_timeout = drain_timeout
+        self.tracker = InFlightMiddleware()
+        self._stopped_at: Optional[float] = None
+        self._unfinished: list = []
+        self._replays: set = set()
+
+    async def drain(self) -> None:
+        """Перший shutdown-хук: очікування апдейтів, що ще обробляються"""
+        self._stopped_at = time.time()
+        self._unfinished = await self.tracker.drain(self.drain_timeout)
+        if self._unfinished:
+            logger.warning(f"Не завершено обробку {len(self._unfinished)} апдейтів, вони будуть повторені після старту")
+
+    async def save(self, dispatcher: Dispatcher) -> None:
+        """Останній shutdown-хук: запис знімка (після зупинки завдань і запису журналу)"""
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "stopped_at": self._stopped_at or time.time(),
+            "last_update_id": self.tracker.last_update_id,
+            "fsm": _dump_fsm(dispatcher.storage),
+            "updates": [update.model_dump(mode="json", exclude_none=True, by_alias=True)
+                        for update in self._unfinished],
+            "audit": audit_log.snapshot(),
+        }
+
+        # Запис через тимчасовий файл: перерваний запис не зіпсує попередній знімок
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with gzip.open(temporary, "wt", encoding="utf-8") as file:
+            json.dump(snapshot, file, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temporary, self.path)
+        logger.info(f"Стан збережено для перезапуску: FSM {len(snapshot['fsm'])}, "
+                    f"апдейтів {len(snapshot['updates'])}, подій журналу {len(snapshot['audit'])}")
+
+    async def restore(self, dispatcher: Dispatcher, bot: Bot) -> None:
+        """Останній startup-хук: відновлення знімка попереднього процесу"""
+        if not self.path.exists():
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.error(f"Не вдалося прочитати знімок стану {self.path}: {e}")
+            return
+        finally:
+            # Знімок одноразовий: повторне відновлення після наступного падіння дублювало б апдейти
+            self.path.unlink(missing_ok=True)
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.warning(f"Знімок стану версії {snapshot.get('version')} не підтримується")
+            return
+
+        restored = _load_fsm(dispatcher.storage, snapshot["fsm"])
+        self.tracker.skip_through = snapshot["last_update_id"]
+        audit_log.restore(snapshot["audit"])
+
+        for payload in snapshot["updates"]:
+            update = Update.model_validate(payload, context={"bot": bot})
+            task = asyncio.create_task(dispatcher.feed_update(bot, update, **{REPLAY_KEY: True}))
+            self._replays.add(task)
+            task.add_done_callback(self._replays.discard)
+
+        logger.info(f"Відновлено стан попереднього процесу: FSM {restored}, апдейтів {len(snapshot['updates'])}, "
+                    f"подій журналу {len(snapshot['audit'])}. Від зупинки до готовності: "
+                    f"{time.time() - snapshot['stopped_at']:.1f} с")
+
+
+handoff = Handoff()
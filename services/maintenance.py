@@ -0,0 +1,25 @@
+# Періодичне обслуговування бази даних
+import logging
+
+from aiogram import Bot
+
+from config import VACUUM_INTERVAL, VACUUM_PAGES
+from db.requests import incremental_vacuum
+from services.scheduler import scheduler
+
+logger = logging.getLogger(__name__)
+
+VACUUM_JOB = "incremental_vacuum"
+
+
+@scheduler.task(VACUUM_JOB)
+async def vacuum_job(bot: Bot) -> None:
+    """Повернення вільних сторінок після архівації анкет"""
+    freed = await incremental_vacuum(VACUUM_PAGES)
+    if freed:
+        logger.info(f"Інкрементальний VACUUM: звільнено {freed} сторінок")
+
+
+async def schedule_maintenance() -> None:
+    """Реєстрація періодичних завдань обслуговування"""
+    await scheduler.schedule(VACUUM_JOB, key=VACUUM_JOB, interval=VACUUM_INTERVAL)
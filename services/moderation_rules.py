@@ -0,0 +1,188 @@
+# Автоперевірка анкет перед модерацією
+#
+# Заборонені терміни компілюються в автомат Ахо-Корасік, тож Riot ID, біо та контакт
+# перевіряються одним проходом незалежно від кількості термінів. Разом зі структурними
+# перевірками (формат Riot ID, спам посиланнями, капс, флуд символами) це дає вердикт:
+# коди причин з REJECTION_REASONS для автоматичного відхилення та позначки для картки модерації.
+import html
+import logging
+import re
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+from config import MODERATION_TERMS, MODERATION_TERMS_PATH, REJECTION_REASONS
+
+logger = logging.getLogger(__name__)
+
+# Riot ID: ім'я 3-16 символів, тег до 5 літер або цифр будь-якої абетки (Riot дозволяє, наприклад, #УКР).
+# Коротший за 3 символи тег підозрілий, але не відхиляється
+RIOT_NAME_LENGTH = (3, 16)
+RIOT_TAG_PATTERN = re.compile(r'[^\W_]{1,5}')
+RIOT_TAG_MIN_LENGTH = 3
+# Приклади з підказки форми - справжніми Riot ID не бувають
+PLACEHOLDER_RIOT_IDS = {"nickname#tag", "player123#euw"}
+
+# Одне посилання - один збіг: https://t.me/... не рахується двічі за схемою та доменом
+LINK_PATTERN = re.compile(r'(?:https?://|www\.)\S+|(?:t\.me|discord\.gg|bit\.ly)/\S+', re.IGNORECASE)
+MAX_LINKS = 2                  # Більше посилань в анкеті - спам, автоматичне відхилення
+REPEATED_CHARS = re.compile(r'(.)\1{5,}')
+CAPS_MIN_LETTERS = 20          # Капс перевіряється лише в достатньо довгому біо
+CAPS_RATIO = 0.7
+
+
+class TermMatcher:
+    """Автомат Ахо-Корасік: всі терміни за один прохід по тексту"""
+
+    def __init__(self, terms: dict):
+        # Вузли бору: переходи, суфіксні посилання, терміни, що закінчуються у вузлі (з урахуванням суфіксів)
+        self._goto: list = [{}]
+        self._fail: list = [0]
+        self._output: list = [()]
+        self.size = len(terms)
+        for term, code in terms.items():
+            self._add(term.casefold(), (term, code))
+        self._build()
+
+    def _add(self, term: str, entry: tuple) -> None:
+        node = 0
+        for char in term:
+            following = self._goto[node].get(char)
+            if following is None:
+                following = len(self._goto)
+                self._goto[node][char] = following
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = following
+        self._output[node] += (entry,)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, following in self._goto[node].items():
+                queue.append(following)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[following] = self._goto[fail].get(char, 0)
+                self._output[following] += self._output[self._fail[following]]
+
+    def find(self, text: str) -> set:
+        """Знайдені терміни як пари (термін, код причини або None)"""
+        goto, fail, output = self._goto, self._fail, self._output
+        root = goto[0]
+        found = set()
+        node = 0
+        for char in text.casefold():
+            if node:
+                while node and char not in goto[node]:
+                    node = fail[node]
+                node = goto[node].get(char, 0)
+            else:
+                # Більшість символів тексту не починає жодного терміна
+                node = root.get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+
+def load_terms(path: str = MODERATION_TERMS_PATH) -> dict:
+    """Терміни з конфігурації та файлу MODERATION_TERMS_PATH: {термін: код причини або None}"""
+    terms = {term: code for code, values in MODERATION_TERMS.items() for term in values}
+    if not path:
+        return terms
+    try:
+        lines = Path(path).read_text(encoding="utf-8").splitlines()
+    except OSError as e:
+        logger.error(f"Не вдалося прочитати терміни автоперевірки {path}: {e}")
+        return terms
+
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        code, _, term = line.partition(" ")
+        term = term.strip()
+        if not term or (code != "tag" and code not in REJECTION_REASONS):
+            logger.warning(f"{path}:{number}: рядок пропущено, очікується '<код причини або tag> <термін>'")
+            continue
+        terms[term] = None if code == "tag" else code
+    return terms
+
+
+class Verdict:
+    """Результат автоперевірки анкети"""
+
+    __slots__ = ('reject', 'tags')
+
+    def __init__(self):
+        # Коди причин з REJECTION_REASONS (непорожній список - анкета відхиляється автоматично)
+        self.reject: list = []
+        # Позначки для модераторів
+        self.tags: list = []
+
+    def add_reject(self, code: str) -> None:
+        if code not in self.reject:
+            self.reject.append(code)
+
+    @property
+    def reasons(self) -> list:
+        """Тексти причин відхилення (як у модераторів)"""
+        return [REJECTION_REASONS[code] for code in self.reject]
+
+
+class ModerationRules:
+    """Набір правил автоперевірки"""
+
+    def __init__(self, terms: dict):
+        self.matcher = TermMatcher(terms)
+
+    def _check_riot_id(self, riot_id: str, verdict: Verdict) -> None:
+        name, _, tag = riot_id.rpartition("#")
+        if riot_id.casefold() in PLACEHOLDER_RIOT_IDS or \
+                not RIOT_NAME_LENGTH[0] <= len(name.strip()) <= RIOT_NAME_LENGTH[1] or \
+                not RIOT_TAG_PATTERN.fullmatch(tag):
+            verdict.add_reject("bad_id")
+        elif len(tag) < RIOT_TAG_MIN_LENGTH:
+            verdict.tags.append("короткий тег Riot ID")
+
+    def _check_bio(self, bio: str, verdict: Verdict) -> None:
+        if LINK_PATTERN.search(bio):
+            verdict.tags.append("посилання в біо")
+        if REPEATED_CHARS.search(bio):
+            verdict.tags.append("флуд символами")
+        if len(bio) >= CAPS_MIN_LETTERS:
+            upper = sum(map(str.isupper, bio))
+            if upper >= CAPS_MIN_LETTERS and upper > CAPS_RATIO * sum(map(str.isalpha, bio)):
+                verdict.tags.append("капс")
+
+    def evaluate(self, riot_id: str, bio: Optional[str], contact_info: str) -> Verdict:
+        """Перевірка полів анкети"""
+        verdict = Verdict()
+        bio = bio or ""
+        self._check_riot_id(riot_id, verdict)
+        self._check_bio(bio, verdict)
+
+        # Поля розділені переносом рядка, щоб термін не знайшовся на стику двох полів
+        text = f"{riot_id}\n{bio}\n{contact_info}"
+        if len(LINK_PATTERN.findall(text)) > MAX_LINKS:
+            verdict.add_reject("rules")
+
+        for term, code in sorted(self.matcher.find(text), key=lambda item: item[0]):
+            if code:
+                verdict.add_reject(code)
+            else:
+                verdict.tags.append(f"«{term}»")
+        return verdict
+
+
+def format_verdict_tags(verdict: Verdict) -> str:
+    """Позначки автоперевірки для картки модерації (порожній рядок - позначок немає)"""
+    if not verdict.tags:
+        return ""
+    return f"\n\n🏷 <b>Автоперевірка:</b> {html.escape(', '.join(verdict.tags))}"
+
+
+moderation_rules = ModerationRules(load_terms())
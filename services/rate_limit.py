@@ -0,0 +1,40 @@
+# Обмеження частоти запитів до Telegram Bot API
+import asyncio
+import logging
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+# Скільки разів повторювати запит після flood control
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+
+class RateLimiter:
+    """Рівномірний ліміт: не більше rate запитів за секунду на всіх споживачів"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        """Резервує наступний вільний слот і чекає на нього"""
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def call(self, method, *args, **kwargs):
+        """Виклик методу бота в межах ліміту з повтором після TelegramRetryAfter"""
+        for attempt in range(MAX_RETRY_AFTER_ATTEMPTS):
+            await self.acquire()
+            try:
+                return await method(*args, **kwargs)
+            except TelegramRetryAfter as e:
+                if attempt == MAX_RETRY_AFTER_ATTEMPTS - 1:
+                    raise
+                logger.warning(f"Flood control: очікування {e.retry_after} с перед повтором")
+                # Всі наступні запити також мають почекати
+                self._next_slot = max(self._next_slot, time.monotonic() + e.retry_after)
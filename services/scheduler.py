@@ -0,0 +1,182 @@
+# Планувальник відкладених і періодичних завдань з таблицею jobs
+#
+# Завдання спершу зберігається в БД, а видаляється лише після успішного виконання,
+# тому після перезапуску бота незавершені завдання виконаються ще раз (at-least-once).
+# Найближчий запуск береться з купи, а цикл спить до нього або до появи нового завдання.
+# Довгі завдання виконуються частинами: обробник повертає Continuation, і завдання з тим самим
+# ключем повертається в чергу з новим payload, звільняючи воркер для інших завдань, що настали.
+import asyncio
+import heapq
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from config import SCHEDULER_WORKERS, SCHEDULER_RETRY_BACKOFF, SCHEDULER_MAX_BACKOFF
+from db.requests import add_job, get_pending_jobs, update_job, delete_job, delete_job_by_key
+
+logger = logging.getLogger(__name__)
+
+
+def _utc(value: datetime) -> datetime:
+    """SQLite повертає дати без часового поясу - приводимо до UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class Continuation:
+    """Результат обробника: завдання не завершене, наступна частина - з payload через delay секунд"""
+
+    __slots__ = ('payload', 'delay')
+
+    def __init__(self, payload: dict, delay: float = 0):
+        self.payload = payload
+        self.delay = delay
+
+
+class Scheduler:
+    """Планувальник з обмеженим пулом виконавців"""
+
+    def __init__(self, workers: int = SCHEDULER_WORKERS):
+        self._handlers: Dict[str, Callable] = {}
+        # Купа (час запуску, ID завдання) та самі завдання за ID
+        self._heap: list = []
+        self._jobs: Dict[int, object] = {}
+        self._running: Dict[int, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._workers = asyncio.Semaphore(workers)
+        self._loop_task: Optional[asyncio.Task] = None
+        # Спільні аргументи обробників (наприклад, bot)
+        self._context: dict = {}
+
+    def task(self, name: str) -> Callable:
+        """Декоратор реєстрації обробника: async def handler(bot, **payload)"""
+        def decorator(handler: Callable) -> Callable:
+            self._handlers[name] = handler
+            return handler
+        return decorator
+
+    async def schedule(self, name: str, payload: Optional[dict] = None, *, run_at: Optional[datetime] = None,
+                       delay: float = 0, key: Optional[str] = None, interval: Optional[int] = None,
+                       max_retries: int = 5) -> int:
+        """Додавання завдання; з тим самим key повторно не створюється. Повертає ID завдання"""
+        if name not in self._handlers:
+            raise ValueError(f"Невідоме завдання: {name}")
+
+        run_at = run_at or datetime.now(timezone.utc) + timedelta(seconds=delay)
+        job = await add_job(name, payload or {}, run_at, key=key, interval=interval, max_retries=max_retries)
+        if interval and job.interval != interval:
+            # Період змінився в конфігурації з часу попереднього запуску
+            await update_job(job.id, interval=interval)
+            job.interval = interval
+        if job.id not in self._jobs:
+            self._push(job)
+        return job.id
+
+    async def cancel(self, key: str) -> bool:
+        """Скасування завдання за ключем (виконання, що вже почалося, не переривається)"""
+        job_id = await delete_job_by_key(key)
+        if job_id is None:
+            return False
+        # Запис у купі залишається і буде пропущений при витяганні
+        self._jobs.pop(job_id, None)
+        return True
+
+    def _push(self, job) -> None:
+        self._jobs[job.id] = job
+        heapq.heappush(self._heap, (_utc(job.run_at).timestamp(), job.id))
+        self._wakeup.set()
+
+    async def start(self, **context) -> None:
+        """Завантаження незавершених завдань з БД та запуск циклу"""
+        self._context = context
+        for job in await get_pending_jobs():
+            if job.id not in self._jobs:
+                self._push(job)
+        self._loop_task = asyncio.create_task(self._loop())
+        logger.info(f"Планувальник запущено, завдань у черзі: {len(self._jobs)}")
+
+    async def stop(self) -> None:
+        """Зупинка циклу; перервані завдання залишаються в БД і виконаються після старту"""
+        if self._loop_task:
+            self._loop_task.cancel()
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def _loop(self) -> None:
+        while True:
+            now = datetime.now(timezone.utc).timestamp()
+            while self._heap and self._heap[0][0] <= now:
+                run_at, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                # Скасоване або переплановане завдання (актуальний запис лежить у купі окремо)
+                if job is None or _utc(job.run_at).timestamp() != run_at or job_id in self._running:
+                    continue
+                # Не більше SCHEDULER_WORKERS завдань одночасно
+                await self._workers.acquire()
+                self._running[job_id] = asyncio.create_task(self._run(job))
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run(self, job) -> None:
+        try:
+            handler = self._handlers.get(job.name)
+            if handler is None:
+                # Модуль з обробником не імпортовано - залишаємо завдання в БД
+                logger.warning(f"Завдання #{job.id}: обробник '{job.name}' не зареєстровано")
+                self._jobs.pop(job.id, None)
+                return
+
+            try:
+                result = await handler(**self._context, **json.loads(job.payload))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Завдання '{job.name}' #{job.id} завершилось помилкою: {e}", exc_info=True)
+                await self._retry(job, e)
+                return
+
+            if isinstance(result, Continuation):
+                # Наступна частина стає в кінець черги завдань, що вже настали
+                await self._reschedule(job, timedelta(seconds=result.delay), attempts=0, last_error=None,
+                                       payload=json.dumps(result.payload))
+            elif job.interval:
+                await self._reschedule(job, timedelta(seconds=job.interval), attempts=0, last_error=None)
+            else:
+                await delete_job(job.id)
+                self._jobs.pop(job.id, None)
+        finally:
+            self._running.pop(job.id, None)
+            self._workers.release()
+
+    async def _retry(self, job, error: Exception) -> None:
+        attempts = job.attempts + 1
+        if attempts <= job.max_retries:
+            backoff = min(SCHEDULER_RETRY_BACKOFF * 2 ** (attempts - 1), SCHEDULER_MAX_BACKOFF)
+            await self._reschedule(job, timedelta(seconds=backoff), attempts=attempts, last_error=str(error))
+        elif job.interval:
+            # Повторюване завдання не вимикаємо - чекаємо наступного періоду
+            await self._reschedule(job, timedelta(seconds=job.interval), attempts=0, last_error=str(error))
+        else:
+            logger.error(f"Завдання '{job.name}' #{job.id} вичерпало {job.max_retries} спроб")
+            await update_job(job.id, attempts=attempts, last_error=str(error), failed_at=datetime.now(timezone.utc))
+            self._jobs.pop(job.id, None)
+
+    async def _reschedule(self, job, delay: timedelta, **values) -> None:
+        if job.id not in self._jobs:
+            # Завдання скасували під час виконання
+            return
+        run_at = datetime.now(timezone.utc) + delay
+        await update_job(job.id, run_at=run_at, **values)
+        job.run_at = run_at
+        for name, value in values.items():
+            setattr(job, name, value)
+        self._push(job)
+
+
+scheduler = Scheduler()
@@ -0,0 +1,221 @@
+# Шаблони карток анкет для кожної мови
+#
+# Форматер мови компілюється один раз при імпорті: підписи вже вставлені в шаблон,
+# а значення фіксованих словників (ранги, ролі, агенти, сервери) заздалегідь екрановані.
+# Рендер картки зводиться до кількох join та одного str.format.
+import html
+import json
+from functools import lru_cache
+from typing import Optional
+
+from config import RANKS, ROLES, ALL_AGENTS, REGIONS
+
+# Скільки різних значень полів-словників (JSON агентів, серверів, ролей) кешувати на мову
+RENDER_CACHE_SIZE = 4096
+
+LOCALES = ("uk", "en")
+DEFAULT_LOCALE = "uk"
+LOCALE_NAMES = {"uk": "🇺🇦 Українська", "en": "🇬🇧 English"}
+
+ROLE_NAMES_EN = {
+    "Дуелянт": "Duelist",
+    "Захисник": "Sentinel",
+    "Контролер": "Controller",
+    "Ініціатор": "Initiator",
+}
+
+SERVER_NAMES_EN = {
+    "na_oregon": "🇺🇸 Oregon (Portland)",
+    "na_california": "🇺🇸 Northern California (San Jose)",
+    "na_texas": "🇺🇸 Texas (Dallas)",
+    "na_georgia": "🇺🇸 Georgia (Atlanta)",
+    "na_virginia": "🇺🇸 Virginia (Ashburn)",
+    "na_illinois": "🇺🇸 Illinois (Chicago)",
+    "eu_london": "🇬🇧 London (United Kingdom)",
+    "eu_paris": "🇫🇷 Paris (France)",
+    "eu_frankfurt": "🇩🇪 Frankfurt (Germany)",
+    "eu_stockholm": "🇸🇪 Stockholm (Sweden)",
+    "eu_istanbul": "🇹🇷 Istanbul (Turkey)",
+    "eu_warsaw": "🇵🇱 Warsaw (Poland)",
+    "eu_madrid": "🇪🇸 Madrid (Spain)",
+    "eu_bahrain": "🇧🇭 Bahrain (Manama)",
+    "ap_tokyo": "🇯🇵 Tokyo (Japan)",
+    "ap_singapore": "🇸🇬 Singapore",
+    "ap_sydney": "🇦🇺 Sydney (Australia)",
+    "ap_mumbai": "🇮🇳 Mumbai (India)",
+    "ap_hongkong": "🇭🇰 Hong Kong (China)",
+    "ap_seoul": "🇰🇷 Seoul (South Korea)",
+    "latam_santiago": "🇨🇱 Santiago (Chile)",
+    "latam_mexico": "🇲🇽 Mexico City (Mexico)",
+    "latam_miami": "🇺🇸 Miami (USA)",
+    "br_saopaulo": "🇧🇷 São Paulo (Brazil)",
+    "kr_seoul": "🇰🇷 Seoul (South Korea)",
+    "cn_guangzhou": "🇨🇳 Guangzhou",
+    "cn_nanjing": "🇨🇳 Nanjing",
+    "cn_chongqing": "🇨🇳 Chongqing",
+    "cn_tianjin": "🇨🇳 Tianjin",
+}
+
+_STRINGS = {
+    "uk": {
+        "channel_title": "🎮 <b>Шукаю напарника в Valorant!</b>",
+        "player": "Гравець",
+        "rank": "Ранг",
+        "roles": "Ролі",
+        "agents": "Агенти",
+        "servers": "Сервери",
+        "style": "Стиль гри",
+        "contact": "Зв'язок",
+        "riot_id": "Riot ID",
+        "age": "Вік",
+        "about": "Про себе",
+        "preview_contact": "Контакт",
+        "digest_header": "📋 <b>Нові анкети</b>",
+    },
+    "en": {
+        "channel_title": "🎮 <b>Looking for a Valorant teammate!</b>",
+        "player": "Player",
+        "rank": "Rank",
+        "roles": "Roles",
+        "agents": "Agents",
+        "servers": "Servers",
+        "style": "Play style",
+        "contact": "Contact",
+        "riot_id": "Riot ID",
+        "age": "Age",
+        "about": "About",
+        "preview_contact": "Contact",
+        "digest_header": "📋 <b>New applications</b>",
+    },
+}
+
+
+def _template(text: str) -> str:
+    """Підпис у шаблоні str.format (фігурні дужки підписів не є полями)"""
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _tag(word: str) -> str:
+    return "#" + html.escape(word.lower().replace(" ", "_"))
+
+
+def _lookup(table: dict, value: str) -> str:
+    """Екранований переклад значення; невідоме значення (стара анкета) екранується на льоту"""
+    escaped = table.get(value)
+    return escaped if escaped is not None else html.escape(value)
+
+
+class CardTemplates:
+    """Скомпільовані форматери карток однієї мови"""
+
+    def __init__(self, locale: str):
+        strings = {key: _template(value) for key, value in _STRINGS[locale].items()}
+        self.locale = locale
+        self.digest_header = _STRINGS[locale]["digest_header"]
+
+        server_names = {code: name for servers in REGIONS.values() for name, code in servers.items()}
+        if locale == "en":
+            server_names.update(SERVER_NAMES_EN)
+        role_names = ROLE_NAMES_EN if locale == "en" else {}
+
+        self.ranks = {rank: html.escape(rank) for rank in RANKS}
+        self.rank_tags = {rank: _tag(rank.split()[0]) for rank in RANKS}
+        self.roles = {role: html.escape(role_names.get(role, role)) for role in ROLES}
+        self.role_tags = {role: _tag(role_names.get(role, role)) for role in ROLES}
+        self.agents = {agent: html.escape(agent) for agent in ALL_AGENTS}
+        self.servers = {code: html.escape(name) for code, name in server_names.items()}
+
+        self._channel = (
+            f"{strings['channel_title']}\n\n"
+            f"👤 <b>{strings['player']}:</b> {{riot_id}}\n"
+            f"🏆 <b>{strings['rank']}:</b> {{rank}}\n"
+            f"🎯 <b>{strings['roles']}:</b> {{roles}}\n"
+            f"🦸 <b>{strings['agents']}:</b> {{agents}}\n"
+            f"🌍 <b>{strings['servers']}:</b> {{servers}}\n"
+            f"💬 <b>{strings['style']}:</b> {{bio}}\n"
+            f"📞 <b>{strings['contact']}:</b> {{contact_info}}\n\n"
+            f"#valorant {{role_tags}} {{rank_tag}}"
+        ).format
+        self._preview = (
+            f"🎮 <b>{strings['riot_id']}:</b> {{riot_id}}\n"
+            f"📅 <b>{strings['age']}:</b> {{age}}\n"
+            f"🏆 <b>{strings['rank']}:</b> {{rank}}\n"
+            f"🎯 <b>{strings['roles']}:</b> {{roles}}\n"
+            f"🦸 <b>{strings['agents']}:</b> {{agents}}\n"
+            f"🌍 <b>{strings['servers']}:</b> {{servers}}\n"
+            f"💬 <b>{strings['about']}:</b> {{bio}}\n"
+            f"📞 <b>{strings['preview_contact']}:</b> {{contact_info}}"
+        ).format
+
+        # Поля зі словників повторюються між анкетами - рендеримо кожне значення один раз
+        self._agents_json = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_agents_json)
+        self._servers_json = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_servers_json)
+        self._role_text = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_role)
+        self._rank_text = lru_cache(maxsize=RENDER_CACHE_SIZE)(self._render_rank)
+
+    def _servers(self, codes: list) -> str:
+        # Невідомі коди (сервер прибрали з REGIONS) пропускаємо
+        servers = self.servers
+        return ", ".join(servers[code] for code in codes if code in servers)
+
+    def _render_agents_json(self, agents_json: str) -> str:
+        try:
+            agents = json.loads(agents_json)
+        except (json.JSONDecodeError, TypeError):
+            return ""
+        return ", ".join(_lookup(self.agents, agent) for agent in agents)
+
+    def _render_servers_json(self, servers_json: str) -> str:
+        try:
+            return self._servers(json.loads(servers_json))
+        except (json.JSONDecodeError, TypeError):
+            return ""
+
+    def _render_role(self, role: str) -> tuple:
+        """(ролі через кому, хештеги ролей) з рядка role анкети"""
+        roles = [name.strip() for name in role.split(",")]
+        return (", ".join(_lookup(self.roles, name) for name in roles),
+                " ".join(self.role_tags.get(name) or _tag(name) for name in roles))
+
+    def _render_rank(self, rank: str) -> tuple:
+        """(ранг, хештег рангу)"""
+        words = rank.split()
+        return (_lookup(self.ranks, rank),
+                self.rank_tags.get(rank) or (_tag(words[0]) if words else "#rank"))
+
+    def channel_card(self, application) -> str:
+        """Картка анкети для публікації в каналі"""
+        roles, role_tags = self._role_text(application.role)
+        rank, rank_tag = self._rank_text(application.rank)
+        return self._channel(
+            riot_id=html.escape(application.riot_id),
+            rank=rank,
+            roles=roles,
+            agents=self._agents_json(application.agents),
+            servers=self._servers_json(application.server),
+            bio=html.escape(application.bio or ""),
+            contact_info=html.escape(application.contact_info),
+            role_tags=role_tags,
+            rank_tag=rank_tag,
+        )
+
+    def preview_card(self, data: dict) -> str:
+        """Попередній перегляд анкети (дані форми: roles, agents, servers - списки)"""
+        return self._preview(
+            riot_id=html.escape(data['riot_id']),
+            age=data['age'],
+            rank=_lookup(self.ranks, data['rank']),
+            roles=", ".join(_lookup(self.roles, role) for role in data['roles']),
+            agents=", ".join(_lookup(self.agents, agent) for agent in data['agents']),
+            servers=self._servers(data.get('servers', [])),
+            bio=html.escape(data['bio']),
+            contact_info=html.escape(data['contact_info']),
+        )
+
+
+_TEMPLATES = {locale: CardTemplates(locale) for locale in LOCALES}
+
+
+def get_cards(locale: Optional[str] = None) -> CardTemplates:
+    """Форматери для мови (невідома або не задана - мова за замовчуванням)"""
+    return _TEMPLATES.get(locale) or _TEMPLATES[DEFAULT_LOCALE]